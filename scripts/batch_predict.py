@@ -5,11 +5,15 @@ import json
 import joblib
 import pandas as pd
 import numpy as np
+import warnings
 from datetime import datetime
-from sklearn.preprocessing import LabelEncoder
 
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+from src.feature_vectorizer import FeatureVectorizer, FEATURE_SCHEMA_PATH
+from src.forest_engine import FlatForest
+from src.model_dispatch import DispatchingModel
+
 MODEL_PATH = 'models/baseline_model.joblib'
 DATA_PATH = 'data/raw/transactions.csv'
 BATCH_PREDICTIONS = 'reports/batch_predictions.json'
@@ -17,7 +21,7 @@ BATCH_SUMMARY = 'reports/batch_summary.txt'
 OPTIMAL_THRESHOLD = 0.29
 
 
-def batch_predict():
+def batch_predict(engine='sklearn', n_jobs=None):
     """Run batch predictions on entire dataset."""
     print("=" * 70)
     print("BATCH FRAUD PREDICTION")
@@ -28,8 +32,13 @@ def batch_predict():
         print(f"✗ Model not found: {MODEL_PATH}")
         return False
     
-    model = joblib.load(MODEL_PATH)
-    print(f"\n✓ Model loaded: {MODEL_PATH}")
+    model = DispatchingModel(joblib.load(MODEL_PATH), n_jobs=n_jobs)
+    print(f"\n✓ Model loaded: {MODEL_PATH} (n_jobs={model.n_jobs})")
+    
+    vectorizer = FeatureVectorizer.from_schema(FEATURE_SCHEMA_PATH)
+    vectorizer.check_model(model.model)
+    warnings.filterwarnings('ignore', message='X does not have valid feature names')
+    print(f"✓ Feature schema loaded: {FEATURE_SCHEMA_PATH}")
     
     # Load data
     if not os.path.exists(DATA_PATH):
@@ -39,19 +48,15 @@ def batch_predict():
     df = pd.read_csv(DATA_PATH)
     print(f"✓ Data loaded: {len(df)} records")
     
-    # Prepare features
-    X = df.select_dtypes(include=['number']).drop(columns=['is_fraud', 'transaction_id'], errors='ignore')
-    
-    # Encode categoricals
-    cat_cols = df.select_dtypes(include=['object']).columns
-    if len(cat_cols) > 0:
-        for col in cat_cols:
-            le = LabelEncoder()
-            X[col] = le.fit_transform(df[col])
+    # Prepare features with the training encoding
+    X = vectorizer.transform_columns(df)
     
     # Get predictions
-    print(f"\n🔮 Scoring {len(df)} transactions...")
-    y_pred_proba = model.predict_proba(X)[:, 1]
+    print(f"\n🔮 Scoring {len(df)} transactions ({engine} engine)...")
+    if engine == 'flat':
+        y_pred_proba = FlatForest.from_sklearn(model.model).predict_proba(X)
+    else:
+        y_pred_proba = model.predict_proba(X)[:, 1]
     y_pred = (y_pred_proba >= OPTIMAL_THRESHOLD).astype(int)
     
     # Add predictions to dataframe
@@ -174,5 +179,14 @@ Generated: {datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S')}
 
 
 if __name__ == '__main__':
-    success = batch_predict()
+    import argparse
+    
+    parser = argparse.ArgumentParser(description='Run batch fraud predictions')
+    parser.add_argument('--engine', choices=['sklearn', 'flat'], default='sklearn',
+                        help='Inference engine (flat = exported array forest)')
+    parser.add_argument('--n-jobs', type=int, default=None,
+                        help='Parallel workers for sklearn scoring (default: the model setting)')
+    args = parser.parse_args()
+    
+    success = batch_predict(engine=args.engine, n_jobs=args.n_jobs)
     sys.exit(0 if success else 1)
@@ -0,0 +1,169 @@
+"""Parity check and latency benchmark for the serving inference paths.
+
+Times sklearn predict_proba as persisted (n_jobs from the artifact), the serial
+fast path used for small inputs, and the flat forest engine, then checks and
+times early-exit scoring against the decision threshold.
+"""
+import os
+import sys
+import json
+import time
+import warnings
+import joblib
+import numpy as np
+import pandas as pd
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.feature_vectorizer import FeatureVectorizer, FEATURE_SCHEMA_PATH
+from src.forest_engine import FlatForest
+from src.model_dispatch import DispatchingModel
+
+MODEL_PATH = 'models/baseline_model.joblib'
+DATA_PATH = 'data/raw/transactions.csv'
+BENCHMARK_REPORT = 'reports/inference_benchmark.json'
+OPTIMAL_THRESHOLD = 0.29
+BATCH_SIZES = [1, 10, 100, 1000, 10000]
+# Early exit is also timed around its per-row limit (FlatForest.SCALAR_EXIT_ROWS) and the
+# serving floor (scoring_model.EARLY_EXIT_MIN_ROWS), where it stops or starts paying off
+EARLY_EXIT_BATCH_SIZES = [1, 2, 3, 10, 100, 256, 1000, 10000]
+
+
+def time_call(fn, X, repeats):
+    """Return per-call latency percentiles in milliseconds."""
+    fn(X)  # warm-up
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn(X)
+        timings.append((time.perf_counter() - start) * 1000)
+    return {
+        'p50_ms': float(np.percentile(timings, 50)),
+        'p99_ms': float(np.percentile(timings, 99)),
+        'mean_ms': float(np.mean(timings))
+    }
+
+
+def run_benchmark(repeats=50):
+    """Verify bit-identical probabilities, then time each scoring path per batch size."""
+    print("=" * 70)
+    print("INFERENCE ENGINE BENCHMARK")
+    print("=" * 70)
+
+    warnings.filterwarnings('ignore', message='X does not have valid feature names')
+    model = joblib.load(MODEL_PATH)
+    vectorizer = FeatureVectorizer.from_schema(FEATURE_SCHEMA_PATH)
+    vectorizer.check_model(model)
+    X = vectorizer.transform_columns(pd.read_csv(DATA_PATH))
+
+    start = time.perf_counter()
+    forest = FlatForest.from_sklearn(model)
+    export_ms = (time.perf_counter() - start) * 1000
+    print(f"\n✓ Exported {forest.n_trees} trees / {forest.n_nodes} nodes in {export_ms:.1f} ms")
+
+    # Parity: compare against serial sklearn, which sums trees in a fixed order
+    serial_model = DispatchingModel(model).serial_model
+    rng = np.random.RandomState(42)
+    perturbed = X + rng.normal(0, X.std(axis=0) * 0.5, X.shape)
+    parity = {}
+    for name, data in [('dataset', X), ('perturbed', perturbed)]:
+        expected = serial_model.predict_proba(data)[:, 1]
+        actual = forest.predict_proba(data)
+        parity[name] = {
+            'rows': len(data),
+            'identical': bool(np.array_equal(expected, actual)),
+            'max_abs_diff': float(np.abs(expected - actual).max())
+        }
+        status = '✓' if parity[name]['identical'] else '✗'
+        print(f"{status} Parity on {name} ({len(data)} rows): max |diff| = {parity[name]['max_abs_diff']:.3e}")
+
+    # Latency
+    print(f"\n⏱  Latency per call ({repeats} repeats, n_jobs={model.n_jobs} for sklearn):")
+    latency = []
+    for size in BATCH_SIZES:
+        batch = X[:size]
+        n = max(3, repeats if size <= 1000 else repeats // 10)
+        sklearn_timing = time_call(lambda data: model.predict_proba(data)[:, 1], batch, n)
+        serial_timing = time_call(lambda data: serial_model.predict_proba(data)[:, 1], batch, n)
+        flat_timing = time_call(forest.predict_proba, batch, n)
+        speedup = sklearn_timing['p50_ms'] / flat_timing['p50_ms']
+        latency.append({
+            'batch_size': size,
+            'sklearn': sklearn_timing,
+            'sklearn_serial': serial_timing,
+            'flat': flat_timing,
+            # Per-call cost of joblib dispatch that the serial path removes
+            'dispatch_overhead_ms': sklearn_timing['p50_ms'] - serial_timing['p50_ms'],
+            'speedup_p50': speedup
+        })
+        print(f"   {size:6d} rows | sklearn p50 {sklearn_timing['p50_ms']:9.3f} ms"
+              f" | serial p50 {serial_timing['p50_ms']:9.3f} ms"
+              f" | flat p50 {flat_timing['p50_ms']:9.3f} ms | flat {speedup:6.1f}x")
+
+    # Early exit: decisions must match full evaluation; report the trees it skipped
+    print(f"\n🌲 Early-exit scoring at threshold {OPTIMAL_THRESHOLD}:")
+    early_exit = {'threshold': OPTIMAL_THRESHOLD, 'parity': {}, 'latency': []}
+    for name, data in [('dataset', X), ('perturbed', perturbed), ('single_rows', X[:1000])]:
+        full = forest.predict_proba(data)
+        if name == 'single_rows':
+            # One call per row, as a single /predict is scored
+            scored = [forest.predict_proba_early_exit(row[np.newaxis, :], OPTIMAL_THRESHOLD) for row in data]
+            probabilities, trees = (np.concatenate(parts) for parts in zip(*scored))
+        else:
+            probabilities, trees = forest.predict_proba_early_exit(data, OPTIMAL_THRESHOLD)
+        complete = trees == forest.n_trees
+        early_exit['parity'][name] = {
+            'rows': len(data),
+            'decisions_identical': bool(np.array_equal(probabilities >= OPTIMAL_THRESHOLD, full >= OPTIMAL_THRESHOLD)),
+            'complete_rows_identical': bool(np.array_equal(probabilities[complete], full[complete])),
+            'mean_trees_evaluated': float(trees.mean()),
+            'fraction_of_forest': float(trees.mean() / forest.n_trees)
+        }
+        result = early_exit['parity'][name]
+        status = '✓' if result['decisions_identical'] and result['complete_rows_identical'] else '✗'
+        print(f"{status} Decisions on {name}: {result['mean_trees_evaluated']:.1f} of {forest.n_trees} trees"
+              f" per row on average ({100 * result['fraction_of_forest']:.0f}%)")
+    for size in EARLY_EXIT_BATCH_SIZES:
+        batch = X[:size]
+        n = max(3, repeats if size <= 1000 else repeats // 10)
+        flat_timing = time_call(forest.predict_proba, batch, n)
+        timing = time_call(lambda data: forest.predict_proba_early_exit(data, OPTIMAL_THRESHOLD), batch, n)
+        speedup = flat_timing['p50_ms'] / timing['p50_ms']
+        early_exit['latency'].append({'batch_size': size, 'flat': flat_timing, 'early_exit': timing,
+                                      'speedup_p50_vs_flat': speedup})
+        print(f"   {size:6d} rows | flat p50 {flat_timing['p50_ms']:9.3f} ms"
+              f" | early exit p50 {timing['p50_ms']:9.3f} ms | vs flat {speedup:5.2f}x")
+
+    os.makedirs(os.path.dirname(BENCHMARK_REPORT), exist_ok=True)
+    with open(BENCHMARK_REPORT, 'w') as f:
+        json.dump({
+            'timestamp': datetime.utcnow().isoformat(),
+            'model_path': MODEL_PATH,
+            'n_trees': forest.n_trees,
+            'n_nodes': forest.n_nodes,
+            'export_ms': export_ms,
+            'parity': parity,
+            'latency': latency,
+            'early_exit': early_exit
+        }, f, indent=2)
+    print(f"\n✓ Benchmark saved: {BENCHMARK_REPORT}")
+
+    passed = all(result['identical'] for result in parity.values()) and all(
+        result['decisions_identical'] and result['complete_rows_identical']
+        for result in early_exit['parity'].values())
+    print("\n" + "=" * 70)
+    print("✓ PARITY CHECK PASSED" if passed else "✗ PARITY CHECK FAILED")
+    print("=" * 70)
+    return passed
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Check flat forest parity and benchmark latency')
+    parser.add_argument('--repeats', type=int, default=50, help='Timed calls per batch size')
+    args = parser.parse_args()
+
+    success = run_benchmark(repeats=args.repeats)
+    sys.exit(0 if success else 1)
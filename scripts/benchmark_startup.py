@@ -0,0 +1,149 @@
+"""Time-to-first-prediction benchmark for the scoring API.
+
+Starts the API in a fresh process for each startup configuration, polls /health
+until it reports ready (the model is loaded and warmed up) and sends one
+/predict request. Times are measured from process launch, so they include
+interpreter start, imports, model load and warm-up - what a new replica costs
+when autoscaling adds capacity.
+
+    python scripts/benchmark_startup.py --runs 5
+    python scripts/benchmark_startup.py --app asgi
+"""
+import os
+import sys
+import json
+import time
+import signal
+import socket
+import argparse
+import subprocess
+import http.client
+import numpy as np
+from datetime import datetime
+
+STARTUP_REPORT = 'reports/startup_benchmark.json'
+SCRIPTS = {'flask': 'scripts/scoring_api.py', 'asgi': 'scripts/scoring_asgi.py'}
+
+# Environment of each startup configuration
+CONFIGURATIONS = {
+    'default': {'SCORING_ENGINE': 'flat', 'SCORING_FAST_STARTUP': '0'},
+    'fast_startup': {'SCORING_ENGINE': 'flat', 'SCORING_FAST_STARTUP': '1'},
+    'compact': {'SCORING_ENGINE': 'compact', 'SCORING_FAST_STARTUP': '1'}
+}
+
+TRANSACTION = {
+    'transaction_id': 'STARTUP_PROBE',
+    'amount': 120.5,
+    'transaction_hour': 14,
+    'merchant_category': 'Grocery',
+    'foreign_transaction': 0,
+    'location_mismatch': 0,
+    'device_trust_score': 80.0,
+    'velocity_last_24h': 2,
+    'cardholder_age': 41
+}
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def request(port, method, path, body=None):
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=5)
+    try:
+        headers = {'Content-Type': 'application/json'} if body is not None else {}
+        conn.request(method, path, body=body, headers=headers)
+        response = conn.getresponse()
+        return response.status, json.loads(response.read() or b'null')
+    finally:
+        conn.close()
+
+
+def time_startup(app, env, timeout):
+    """Launch one server and return seconds from launch to ready and to the first prediction."""
+    port = free_port()
+    launched = time.perf_counter()
+    process = subprocess.Popen([sys.executable, SCRIPTS[app], '--port', str(port), '--host', '127.0.0.1'],
+                               env=dict(os.environ, **env), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        health = None
+        while health is None:
+            if process.poll() is not None:
+                raise RuntimeError(f"Server exited with code {process.returncode}")
+            if time.perf_counter() - launched > timeout:
+                raise RuntimeError(f"Server not ready after {timeout}s")
+            try:
+                status, body = request(port, 'GET', '/health')
+                if status == 200:
+                    health = body
+            except OSError:
+                time.sleep(0.005)
+        ready = time.perf_counter() - launched
+
+        status, body = request(port, 'POST', '/predict', json.dumps(TRANSACTION))
+        if status != 200:
+            raise RuntimeError(f"/predict answered {status}: {body}")
+        first_prediction = time.perf_counter() - launched
+        return {'ready_s': ready, 'first_prediction_s': first_prediction, 'engine': health['engine'],
+                'server_startup': health.get('startup', {})}
+    finally:
+        # SIGINT lets the server flush its audit trail on exit
+        process.send_signal(signal.SIGINT)
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure time-to-first-prediction of the scoring API')
+    parser.add_argument('--app', choices=sorted(SCRIPTS), default='flask', help='Server to start')
+    parser.add_argument('--runs', type=int, default=3, help='Cold starts per configuration')
+    parser.add_argument('--timeout', type=float, default=60.0, help='Seconds to wait for /health')
+    parser.add_argument('--output', default=STARTUP_REPORT, help='JSON report path')
+    args = parser.parse_args()
+
+    print("=" * 70)
+    print(f"STARTUP BENCHMARK ({args.app}, {args.runs} runs per configuration)")
+    print("=" * 70)
+    print(f"\n{'Configuration':<14} {'Engine':<8} {'Ready (s)':>10} {'1st pred (s)':>13} {'Load (s)':>9} {'Warm-up (s)':>12}")
+    print("-" * 70)
+
+    results = {}
+    for name, env in CONFIGURATIONS.items():
+        runs = [time_startup(args.app, env, args.timeout) for _ in range(args.runs)]
+        ready = [run['ready_s'] for run in runs]
+        first = [run['first_prediction_s'] for run in runs]
+        load = [run['server_startup'].get('load_s', 0.0) for run in runs]
+        warm_up = [run['server_startup'].get('warm_up_s', 0.0) for run in runs]
+        results[name] = {
+            'env': env,
+            'engine': runs[-1]['engine'],
+            'ready_s': {'median': float(np.median(ready)), 'max': float(np.max(ready))},
+            'first_prediction_s': {'median': float(np.median(first)), 'max': float(np.max(first))},
+            'load_s': float(np.median(load)),
+            'warm_up_s': float(np.median(warm_up)),
+            'runs': runs
+        }
+        print(f"{name:<14} {runs[-1]['engine']:<8} {np.median(ready):>10.3f} {np.median(first):>13.3f}"
+              f" {np.median(load):>9.3f} {np.median(warm_up):>12.4f}")
+
+    baseline = results['default']['first_prediction_s']['median']
+    for name, result in results.items():
+        if name != 'default':
+            speedup = baseline / result['first_prediction_s']['median']
+            result['speedup_vs_default'] = speedup
+            print(f"\n✓ {name}: first prediction {speedup:.1f}x sooner than default")
+
+    os.makedirs(os.path.dirname(args.output), exist_ok=True)
+    with open(args.output, 'w') as f:
+        json.dump({'timestamp': datetime.now().isoformat(), 'app': args.app, 'runs': args.runs,
+                   'configurations': results}, f, indent=2)
+    print(f"\n✓ Report saved: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
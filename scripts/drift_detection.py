@@ -1,15 +1,26 @@
 """Drift detection system using PSI and KS-test for production monitoring."""
 import os
+import sys
 import json
 import pandas as pd
 import numpy as np
 from scipy.stats import ks_2samp
-from datetime import datetime
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.audit_segments import AuditReader, AUDIT_DIR
 
 DATA_PATH = 'data/raw/transactions.csv'
 DRIFT_REPORT = 'reports/drift_detection_report.txt'
 DRIFT_METRICS = 'reports/drift_metrics.json'
 
+# With DRIFT_WINDOW_HOURS > 0 the whole dataset is the reference and the transactions scored
+# in the last DRIFT_WINDOW_HOURS (read from the overlapping audit segments only) are monitored;
+# otherwise the last 20% of the dataset is compared with the first 80%
+AUDIT_LOG_DIR = os.environ.get('AUDIT_LOG_DIR', AUDIT_DIR)
+DRIFT_WINDOW_HOURS = float(os.environ.get('DRIFT_WINDOW_HOURS', 0))
+
 # Drift thresholds
 PSI_THRESHOLD = 0.1  # PSI > 0.1 suggests moderate drift
 KS_THRESHOLD = 0.05  # KS p-value < 0.05 suggests statistically significant drift
@@ -43,6 +54,13 @@ def calculate_psi(expected, actual, buckets=10):
     return float(psi_val)
 
 
+def load_audit_window(hours):
+    """Features of the transactions scored in the last ``hours``, from the audit log segments."""
+    start = datetime.utcnow() - timedelta(hours=hours)
+    decisions = AuditReader(AUDIT_LOG_DIR).decisions(start=start, features=True)
+    return pd.DataFrame([decision['features'] for decision in decisions if decision['features']])
+
+
 def detect_drift():
     """Monitor features for drift."""
     print("=" * 70)
@@ -56,13 +74,23 @@ def detect_drift():
     df = pd.read_csv(DATA_PATH)
     print(f"\n✓ Data loaded: {len(df)} records")
     
-    # Split data into train (first 80%) and test (last 20%) for drift comparison
-    split_idx = int(len(df) * 0.8)
-    train_data = df.iloc[:split_idx]
-    test_data = df.iloc[split_idx:]
+    if DRIFT_WINDOW_HOURS > 0:
+        # Compare the scored traffic of the window against the whole dataset
+        train_data = df
+        test_data = load_audit_window(DRIFT_WINDOW_HOURS)
+        if len(test_data) == 0:
+            print(f"✗ No scored transactions in {AUDIT_LOG_DIR} over the last {DRIFT_WINDOW_HOURS:g} hours")
+            return False
+        monitoring = f"audit log, last {DRIFT_WINDOW_HOURS:g} hours"
+    else:
+        # Split data into train (first 80%) and test (last 20%) for drift comparison
+        split_idx = int(len(df) * 0.8)
+        train_data = df.iloc[:split_idx]
+        test_data = df.iloc[split_idx:]
+        monitoring = f"{100*len(test_data)/len(df):.1f}%"
     
     print(f"  Train set: {len(train_data)} records")
-    print(f"  Test set: {len(test_data)} records")
+    print(f"  Test set: {len(test_data)} records ({monitoring})")
     
     # Numeric features
     numeric_cols = df.select_dtypes(include=['number']).columns.tolist()
@@ -74,8 +102,10 @@ def detect_drift():
     drift_detected = []
     
     for col in numeric_cols:
+        if col not in test_data.columns:
+            continue
         train_vals = train_data[col].dropna().values
-        test_vals = test_data[col].dropna().values
+        test_vals = pd.to_numeric(test_data[col], errors='coerce').dropna().values
         
         if len(train_vals) == 0 or len(test_vals) == 0:
             continue
@@ -123,6 +153,7 @@ def detect_drift():
     os.makedirs(os.path.dirname(DRIFT_METRICS), exist_ok=True)
     metrics = {
         'timestamp': datetime.utcnow().isoformat(),
+        'monitoring_window_hours': DRIFT_WINDOW_HOURS or None,
         'total_features_checked': len(drift_results),
         'features_with_drift': drift_detected,
         'drift_count': len(drift_detected),
@@ -199,7 +230,7 @@ to perform reliably with current data conditions.
 
 ## Data Summary
 - Training Set: {len(train_data)} records ({100*len(train_data)/len(df):.1f}%)
-- Test/Monitoring Set: {len(test_data)} records ({100*len(test_data)/len(df):.1f}%)
+- Test/Monitoring Set: {len(test_data)} records ({monitoring})
 
 ---
 Report Generated: {datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S UTC')}
@@ -217,6 +248,5 @@ Report Generated: {datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S UTC')}
 
 
 if __name__ == '__main__':
-    import sys
     success = detect_drift()
     sys.exit(0 if success else 1)
@@ -0,0 +1,73 @@
+"""Export the baseline model to the compact memory-mapped artifact.
+
+Converts the joblib forest to float32 thresholds and narrow indices, merges
+subtrees that always predict the same value, embeds the feature schema and
+decision threshold, and verifies every probability against the exact engine
+on probe rows and the training data before writing. Then compares size, load
+time and resident memory of both artifacts.
+"""
+import os
+import sys
+import json
+import warnings
+import joblib
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.feature_vectorizer import FeatureVectorizer, FEATURE_SCHEMA_PATH
+from src.compact_model import export_compact_model, compare_artifacts, compaction_savings
+
+MODEL_PATH = 'models/baseline_model.joblib'
+COMPACT_PATH = 'models/baseline_model.frc'
+DATA_PATH = 'data/raw/transactions.csv'
+COMPACT_REPORT = 'reports/compact_model_report.json'
+OPTIMAL_THRESHOLD = 0.29
+
+
+def main():
+    print("=" * 70)
+    print("COMPACT MODEL EXPORT")
+    print("=" * 70)
+
+    warnings.filterwarnings('ignore', message='X does not have valid feature names')
+    model = joblib.load(MODEL_PATH)
+    vectorizer = FeatureVectorizer.from_schema(FEATURE_SCHEMA_PATH)
+    vectorizer.check_model(model)
+    X = vectorizer.transform_columns(pd.read_csv(DATA_PATH)) if os.path.exists(DATA_PATH) else None
+
+    meta = export_compact_model(model, vectorizer.to_schema(), OPTIMAL_THRESHOLD, COMPACT_PATH,
+                                X_check=X, source_path=MODEL_PATH)
+    verification = meta['verification']
+    savings = compaction_savings(meta)
+    sizes = savings['array_bytes']
+    print(f"\n✓ Exported {meta['n_trees']} trees: {meta['source_nodes']} -> {meta['n_nodes']} nodes"
+          f" ({savings['merged_nodes']} merged)")
+    print(f"   arrays {sizes['source'] / 1e6:.2f} MB -> {sizes['merged'] / 1e6:.2f} MB merged"
+          f" -> {sizes['compact'] / 1e6:.2f} MB narrowed")
+    for name in ('probe', 'data'):
+        if name in verification:
+            check = verification[name]
+            print(f"   {name:<6} rows {check['rows']:>7}  max |Δp| {check['max_abs_diff']:.1e}"
+                  f"  decision mismatches {check['decision_mismatches']}")
+    print(f"✓ Verified within tolerance {verification['tolerance']:.0e}: {COMPACT_PATH}")
+
+    comparison = compare_artifacts(MODEL_PATH, COMPACT_PATH, model.n_features_in_)
+    print(f"\n{'Artifact':<10} {'Size (MB)':>10} {'Load (ms)':>10} {'RSS +MB':>10} {'1st pred (ms)':>14}")
+    print("-" * 58)
+    for kind in ('joblib', 'compact'):
+        r = comparison[kind]
+        print(f"{kind:<10} {r['size_bytes'] / 1e6:>10.2f} {r['load_ms']:>10.1f} {r['rss_delta_mb']:>10.1f}"
+              f" {r['first_prediction_ms']:>14.2f}")
+    print(f"\n   {comparison['size_ratio']:.1f}x smaller, {comparison['load_speedup']:.0f}x faster to load,"
+          f" {comparison['rss_delta_saved_mb']:.0f} MB less resident memory")
+
+    os.makedirs(os.path.dirname(COMPACT_REPORT), exist_ok=True)
+    with open(COMPACT_REPORT, 'w') as f:
+        json.dump({'verification': verification, 'n_nodes': meta['n_nodes'],
+                   'source_nodes': meta['source_nodes'], **savings, **comparison}, f, indent=2)
+    print(f"\n✓ Report saved: {COMPACT_REPORT}")
+
+
+if __name__ == "__main__":
+    main()
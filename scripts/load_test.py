@@ -0,0 +1,315 @@
+"""Load-testing harness for the scoring API.
+
+Drives /predict or /batch_predict over keep-alive HTTP connections and reports
+latency percentiles, throughput and error rate as JSON.
+
+Two modes:
+
+* ``open``   - requests are scheduled at a constant ``--rate``, independent of
+  how fast the server answers. Latency is measured from each request's
+  scheduled send time, so time spent waiting behind a stalled server is
+  counted (no coordinated omission). ``--concurrency`` caps requests in flight.
+* ``closed`` - ``--concurrency`` clients each send their next request as soon as
+  the previous one returns. Measured latency hides the requests a stalled
+  server prevented from being sent, so the corrected percentiles back-fill
+  them the way HdrHistogram does. Each client stands for ``--rate /
+  --concurrency`` requests per second of real traffic; that pacing (or
+  ``--expected-interval-ms``) is the expected interval between its requests.
+
+Transactions are drawn from data/raw/transactions.csv, or synthesized with a
+fixed seed when the file is missing or --synthetic is given.
+
+    python scripts/load_test.py --mode open --rate 200 --duration 30
+    python scripts/load_test.py --mode closed --concurrency 16 --endpoint batch_predict --batch-size 100
+"""
+import os
+import sys
+import json
+import time
+import socket
+import itertools
+import threading
+import http.client
+import numpy as np
+import pandas as pd
+from datetime import datetime
+
+DATA_PATH = 'data/raw/transactions.csv'
+LOAD_TEST_REPORT = 'reports/load_test.json'
+MERCHANT_CATEGORIES = ['Clothing', 'Electronics', 'Food', 'Grocery', 'Travel']
+PERCENTILES = {'p50': 50, 'p90': 90, 'p99': 99, 'p999': 99.9}
+
+# Distinct request bodies encoded up front and cycled through
+BODY_POOL_SIZE = 2000
+
+
+def synthesize_transactions(n, seed=42):
+    """Generate transactions with the same fields as the training data."""
+    rng = np.random.RandomState(seed)
+    return pd.DataFrame({
+        'transaction_id': [f'LOAD_{i:07d}' for i in range(n)],
+        'amount': np.round(rng.exponential(scale=100, size=n) + 1, 2),
+        'transaction_hour': rng.randint(0, 24, size=n),
+        'merchant_category': rng.choice(MERCHANT_CATEGORIES, size=n),
+        'foreign_transaction': rng.binomial(1, 0.1, size=n),
+        'location_mismatch': rng.binomial(1, 0.05, size=n),
+        'device_trust_score': np.round(rng.uniform(0, 100, size=n), 1),
+        'velocity_last_24h': rng.poisson(lam=3, size=n),
+        'cardholder_age': rng.randint(18, 80, size=n)
+    })
+
+
+def load_transactions(data_path, synthetic, n, seed):
+    if not synthetic and os.path.exists(data_path):
+        df = pd.read_csv(data_path).drop(columns=['is_fraud'], errors='ignore')
+        return df.sample(n=min(n, len(df)), random_state=seed).reset_index(drop=True), data_path
+    return synthesize_transactions(n, seed), 'synthetic'
+
+
+def build_bodies(df, endpoint, batch_size):
+    """Pre-encode request bodies so the send loop does no JSON work."""
+    records = json.loads(df.to_json(orient='records'))
+    if endpoint == 'predict':
+        return [json.dumps(record).encode() for record in records]
+    bodies = []
+    for start in range(0, len(records), batch_size):
+        batch = records[start:start + batch_size]
+        if len(batch) == batch_size:
+            bodies.append(json.dumps(batch).encode())
+    return bodies or [json.dumps((records * batch_size)[:batch_size]).encode()]
+
+
+class Client:
+    """One keep-alive connection; reconnects after a failure."""
+
+    def __init__(self, host, port, timeout):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.conn = None
+
+    def post(self, path, body):
+        """Send one request and return the status code, or None on a transport error."""
+        try:
+            if self.conn is None:
+                self.conn = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+            self.conn.request('POST', path, body, {'Content-Type': 'application/json'})
+            response = self.conn.getresponse()
+            response.read()
+            return response.status
+        except (OSError, http.client.HTTPException, socket.timeout):
+            self.close()
+            return None
+
+    def close(self):
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+
+
+def run_open_loop(args, path, bodies):
+    """Send at a constant rate; each sample is (scheduled, sent, finished, status)."""
+    interval = 1.0 / args.rate
+    counter = itertools.count()
+    samples = [[] for _ in range(args.concurrency)]
+    start = time.perf_counter() + 0.1
+    end = start + args.duration
+
+    def worker(slot):
+        client = Client(args.host, args.port, args.timeout)
+        out = samples[slot]
+        while True:
+            i = next(counter)
+            scheduled = start + i * interval
+            if scheduled >= end:
+                break
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            sent = time.perf_counter()
+            status = client.post(path, bodies[i % len(bodies)])
+            out.append((scheduled, sent, time.perf_counter(), status))
+        client.close()
+
+    _run_workers(worker, args.concurrency)
+    return [s for worker_samples in samples for s in worker_samples], start
+
+
+def run_closed_loop(args, path, bodies):
+    """Each client sends back to back; scheduled time is the send time."""
+    samples = [[] for _ in range(args.concurrency)]
+    start = time.perf_counter()
+    end = start + args.duration
+
+    def worker(slot):
+        client = Client(args.host, args.port, args.timeout)
+        out = samples[slot]
+        i = slot
+        while True:
+            sent = time.perf_counter()
+            if sent >= end:
+                break
+            status = client.post(path, bodies[i % len(bodies)])
+            out.append((sent, sent, time.perf_counter(), status))
+            i += args.concurrency
+        client.close()
+
+    _run_workers(worker, args.concurrency)
+    return [s for worker_samples in samples for s in worker_samples], start
+
+
+def _run_workers(target, n):
+    threads = [threading.Thread(target=target, args=(slot,), daemon=True) for slot in range(n)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+def correct_closed_loop(latencies, expected_interval):
+    """Back-fill the samples a stalled closed-loop client never sent (HdrHistogram style).
+
+    A request that took ``L`` with ``L > expected_interval`` hid requests that
+    would have been sent every ``expected_interval`` meanwhile; they would have
+    seen ``L - interval``, ``L - 2 * interval`` ... latency.
+    """
+    if expected_interval <= 0:
+        return latencies
+    extra = []
+    for latency in latencies[latencies > expected_interval]:
+        extra.append(np.arange(latency - expected_interval, 0, -expected_interval))
+    return np.concatenate([latencies] + extra) if extra else latencies
+
+
+def latency_summary(latencies_s):
+    if len(latencies_s) == 0:
+        return None
+    ms = latencies_s * 1000
+    summary = {name: float(np.percentile(ms, q)) for name, q in PERCENTILES.items()}
+    summary['mean'] = float(ms.mean())
+    summary['max'] = float(ms.max())
+    return summary
+
+
+def summarize(args, samples, start, path, source):
+    samples.sort(key=lambda s: s[0])
+    scheduled = np.array([s[0] for s in samples])
+    sent = np.array([s[1] for s in samples])
+    finished = np.array([s[2] for s in samples])
+    statuses = [s[3] for s in samples]
+
+    ok = np.array([status is not None and 200 <= status < 300 for status in statuses], dtype=bool)
+    # Drop requests scheduled during warm-up from the latency figures
+    measured = scheduled >= start + args.warmup
+    service_time = (finished - sent)[measured & ok]
+    if args.mode == 'open':
+        corrected = (finished - scheduled)[measured & ok]
+        expected_interval_ms = None
+    else:
+        expected_interval_ms = (args.expected_interval_ms if args.expected_interval_ms is not None
+                                else 1000 * args.concurrency / args.rate)
+        corrected = correct_closed_loop(service_time, expected_interval_ms / 1000)
+
+    window = max(finished[measured].max() - (start + args.warmup), 1e-9) if measured.any() else 1e-9
+    n_measured = int(measured.sum())
+    n_errors = int((measured & ~ok).sum())
+    status_counts = {}
+    for status, is_measured in zip(statuses, measured):
+        if is_measured:
+            key = str(status) if status is not None else 'transport_error'
+            status_counts[key] = status_counts.get(key, 0) + 1
+    transactions_per_request = 1 if args.endpoint == 'predict' else args.batch_size
+
+    return {
+        'timestamp': datetime.utcnow().isoformat(),
+        'target': f'http://{args.host}:{args.port}{path}',
+        'mode': args.mode,
+        'config': {
+            'rate': args.rate,
+            'concurrency': args.concurrency,
+            'duration_s': args.duration,
+            'warmup_s': args.warmup,
+            'batch_size': transactions_per_request,
+            'data': source,
+            'seed': args.seed,
+            'expected_interval_ms': expected_interval_ms
+        },
+        'requests': n_measured,
+        'errors': n_errors,
+        'error_rate': n_errors / n_measured if n_measured else 0.0,
+        'status_counts': status_counts,
+        'throughput_rps': int((measured & ok).sum()) / window,
+        'transactions_per_second': int((measured & ok).sum()) * transactions_per_request / window,
+        # Open loop: how far sends fell behind schedule because every connection was busy
+        'max_send_lag_ms': float((sent - scheduled)[measured].max() * 1000) if n_measured else 0.0,
+        'latency_ms': latency_summary(corrected),
+        'service_time_ms': latency_summary(service_time)
+    }
+
+
+def run_load_test(args):
+    print("=" * 70)
+    print("SCORING API LOAD TEST")
+    print("=" * 70)
+
+    path = f'/{args.endpoint}'
+    df, source = load_transactions(args.data, args.synthetic, BODY_POOL_SIZE * (args.batch_size if args.endpoint == 'batch_predict' else 1), args.seed)
+    bodies = build_bodies(df, args.endpoint, args.batch_size)
+    print(f"\n✓ Transactions: {source} ({len(df)} rows, {len(bodies)} distinct request bodies)")
+    if args.mode == 'open':
+        print(f"✓ Open loop: {args.rate} req/s for {args.duration}s, up to {args.concurrency} in flight")
+    else:
+        print(f"✓ Closed loop: {args.concurrency} clients for {args.duration}s, corrected for {args.rate} req/s of real traffic")
+    print(f"✓ Target: http://{args.host}:{args.port}{path} (first {args.warmup}s excluded as warm-up)")
+
+    runner = run_open_loop if args.mode == 'open' else run_closed_loop
+    samples, start = runner(args, path, bodies)
+    if not samples:
+        print("✗ No requests were sent")
+        return False
+    report = summarize(args, samples, start, path, source)
+
+    print(f"\n📊 Requests: {report['requests']} | errors: {report['errors']} ({100 * report['error_rate']:.2f}%)")
+    print(f"📊 Throughput: {report['throughput_rps']:.1f} req/s ({report['transactions_per_second']:.1f} txn/s)")
+    for label, key in [('Latency (corrected)', 'latency_ms'), ('Service time', 'service_time_ms')]:
+        summary = report[key]
+        if summary:
+            print(f"⏱  {label:20s} p50 {summary['p50']:8.2f} ms | p90 {summary['p90']:8.2f} ms"
+                  f" | p99 {summary['p99']:8.2f} ms | p99.9 {summary['p999']:8.2f} ms")
+    if args.mode == 'open' and report['max_send_lag_ms'] > 100:
+        print(f"⚠ Sends fell up to {report['max_send_lag_ms']:.0f} ms behind schedule:"
+              f" the server did not keep up with {args.rate} req/s at concurrency {args.concurrency}")
+
+    os.makedirs(os.path.dirname(args.output), exist_ok=True)
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\n✓ Report saved: {args.output}")
+    print("=" * 70)
+    return report['requests'] > 0
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Load-test the fraud scoring API')
+    parser.add_argument('--host', default='127.0.0.1', help='API host')
+    parser.add_argument('--port', type=int, default=5000, help='API port')
+    parser.add_argument('--endpoint', choices=['predict', 'batch_predict'], default='predict')
+    parser.add_argument('--batch-size', type=int, default=100, help='Transactions per /batch_predict request')
+    parser.add_argument('--mode', choices=['open', 'closed'], default='open')
+    parser.add_argument('--rate', type=float, default=100.0, help='Requests per second (open loop) or the traffic the clients stand for (closed loop)')
+    parser.add_argument('--concurrency', type=int, default=32,
+                        help='Clients (closed loop) or maximum requests in flight (open loop)')
+    parser.add_argument('--duration', type=float, default=30.0, help='Seconds to send for')
+    parser.add_argument('--warmup', type=float, default=2.0, help='Initial seconds excluded from the report')
+    parser.add_argument('--expected-interval-ms', type=float, default=None,
+                        help='Closed-loop pacing per client for coordinated-omission correction (default: concurrency / rate)')
+    parser.add_argument('--timeout', type=float, default=10.0, help='Per-request timeout in seconds')
+    parser.add_argument('--data', default=DATA_PATH, help='CSV of transactions to replay')
+    parser.add_argument('--synthetic', action='store_true', help='Synthesize transactions instead of reading --data')
+    parser.add_argument('--seed', type=int, default=42, help='Seed for sampling or synthesizing transactions')
+    parser.add_argument('--output', default=LOAD_TEST_REPORT, help='JSON report path')
+    args = parser.parse_args()
+
+    success = run_load_test(args)
+    sys.exit(0 if success else 1)
@@ -0,0 +1,92 @@
+"""Inspect and manage the versioned model registry.
+
+Promoting or rolling back only moves the registry's current-version pointer;
+running scoring APIs notice within MODEL_WATCH_INTERVAL seconds and swap models
+without a restart. Designating a challenger likewise starts shadow scoring in APIs
+running with SHADOW_SCORING=1 (see scripts/shadow_report.py).
+"""
+import os
+import sys
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.feature_vectorizer import FEATURE_SCHEMA_PATH
+from src.model_registry import ModelRegistry, REGISTRY_DIR
+
+MODEL_PATH = 'models/baseline_model.joblib'
+OPTIMAL_THRESHOLD = 0.29
+
+
+def list_versions(registry):
+    """Print every published version with its threshold and headline metrics (* current, c challenger)."""
+    current = registry.current_version()
+    challenger = registry.challenger_version()
+    versions = registry.versions()
+    if not versions:
+        print(f"No model versions in {registry.root}")
+        return
+    print(f"{'':2s}{'VERSION':8s} {'CREATED':20s} {'THRESHOLD':>9s} {'ROC-AUC':>8s}  NOTES")
+    for version in versions:
+        meta = registry.metadata(version)
+        metrics = meta.get('metrics', {})
+        roc_auc = metrics.get('test_roc_auc', metrics.get('cv_roc_auc_mean'))
+        marker = '*' if version == current else 'c' if version == challenger else ' '
+        print(f"{marker:2s}{version:8s} {meta['created_at'][:19]:20s} "
+              f"{meta['threshold']:9.3f} {roc_auc if roc_auc is not None else float('nan'):8.4f}  {meta.get('notes') or ''}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Manage the versioned model registry')
+    parser.add_argument('--registry', default=REGISTRY_DIR, help='Registry directory')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    commands.add_parser('list', help='List published versions (* = current, c = challenger)')
+
+    publish = commands.add_parser('publish', help='Publish a trained model as a new version')
+    publish.add_argument('--model', default=MODEL_PATH, help='Model artifact to publish')
+    publish.add_argument('--schema', default=FEATURE_SCHEMA_PATH, help='Feature schema of the model')
+    publish.add_argument('--threshold', type=float, default=OPTIMAL_THRESHOLD, help='Decision threshold')
+    publish.add_argument('--notes', help='Free-text description')
+    publish.add_argument('--no-activate', action='store_true', help='Publish without making it current')
+
+    promote = commands.add_parser('promote', help='Make a published version current')
+    promote.add_argument('version')
+
+    commands.add_parser('rollback', help='Return to the previously current version')
+
+    challenger = commands.add_parser('challenger', help='Shadow-score a published version against the current one')
+    challenger.add_argument('version', nargs='?', help='Version to shadow-score')
+    challenger.add_argument('--clear', action='store_true', help='Stop shadow scoring')
+
+    args = parser.parse_args()
+    registry = ModelRegistry(args.registry)
+
+    try:
+        if args.command == 'list':
+            list_versions(registry)
+        elif args.command == 'publish':
+            version = registry.publish(args.model, args.schema, args.threshold,
+                                       notes=args.notes, activate=not args.no_activate)
+            print(f"✓ Published {version}{'' if args.no_activate else ' (current)'}")
+        elif args.command == 'promote':
+            print(f"✓ {registry.promote(args.version)} is now current")
+        elif args.command == 'rollback':
+            print(f"✓ Rolled back to {registry.rollback()}")
+        elif args.command == 'challenger':
+            if args.clear:
+                registry.set_challenger(None)
+                print("✓ Challenger cleared")
+            elif args.version:
+                print(f"✓ {registry.set_challenger(args.version)} is now the challenger")
+            else:
+                print(f"Challenger: {registry.challenger_version() or 'none'}")
+    except ValueError as e:
+        print(f"✗ {e}")
+        return False
+    return True
+
+
+if __name__ == '__main__':
+    success = main()
+    sys.exit(0 if success else 1)
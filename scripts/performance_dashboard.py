@@ -1,31 +1,44 @@
 """Performance monitoring dashboard - generates HTML reports for model performance tracking."""
 import os
+import sys
 import json
 import pandas as pd
 import numpy as np
-from datetime import datetime
+from datetime import datetime, timedelta
 from pathlib import Path
 
-PREDICTIONS_LOG = 'reports/realtime_predictions.log'
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.audit_segments import AuditReader, AUDIT_DIR
+
+AUDIT_LOG_DIR = os.environ.get('AUDIT_LOG_DIR', AUDIT_DIR)
+# Only audit segments overlapping the last DASHBOARD_WINDOW_HOURS are read
+DASHBOARD_WINDOW_HOURS = float(os.environ.get('DASHBOARD_WINDOW_HOURS', 24))
 DASHBOARD_HTML = 'reports/performance_dashboard.html'
 PERFORMANCE_METRICS = 'reports/performance_metrics.json'
+LOAD_TEST_REPORT = 'reports/load_test.json'
 
 
-def parse_predictions_log():
-    """Parse prediction log file."""
-    predictions = []
-    if not os.path.exists(PREDICTIONS_LOG):
-        return []
-    
-    with open(PREDICTIONS_LOG, 'r') as f:
-        for line in f:
-            try:
-                pred = json.loads(line)
-                predictions.append(pred)
-            except:
-                continue
-    
-    return predictions
+def parse_predictions_log(hours=DASHBOARD_WINDOW_HOURS):
+    """Scored transactions of the last ``hours`` from the audit log segments."""
+    start = datetime.utcnow() - timedelta(hours=hours)
+    return list(AuditReader(AUDIT_LOG_DIR).decisions(start=start))
+
+
+def latency_insight():
+    """Describe scoring latency from the last load test (scripts/load_test.py), if any."""
+    if os.path.exists(LOAD_TEST_REPORT):
+        try:
+            with open(LOAD_TEST_REPORT, 'r') as f:
+                report = json.load(f)
+            latency = report['latency_ms']
+            return (f"Measured scoring latency ({report['mode']}-loop load test on {report['target']}, "
+                    f"{report['throughput_rps']:.0f} req/s): p50 {latency['p50']:.1f} ms, "
+                    f"p99 {latency['p99']:.1f} ms, p99.9 {latency['p999']:.1f} ms, "
+                    f"error rate {100 * report['error_rate']:.2f}%.")
+        except (OSError, ValueError, KeyError, TypeError):
+            pass
+    return "Real-time scoring latency: not measured yet (run scripts/load_test.py against the API)."
 
 
 def generate_dashboard():
@@ -41,7 +54,7 @@ def generate_dashboard():
         os.system("python3 scripts/batch_predict.py > /dev/null 2>&1")
         predictions = parse_predictions_log()
     
-    print(f"\n📊 Analyzing {len(predictions)} predictions...")
+    print(f"\n📊 Analyzing {len(predictions)} predictions from the last {DASHBOARD_WINDOW_HOURS:g} hours...")
     
     # Parse predictions data
     df_preds = pd.DataFrame(predictions)
@@ -59,6 +72,7 @@ def generate_dashboard():
     
     metrics = {
         'timestamp': datetime.now().isoformat(),
+        'window_hours': DASHBOARD_WINDOW_HOURS,
         'total_predictions': int(total),
         'blocked_count': int(blocked),
         'approved_count': int(approved),
@@ -351,7 +365,7 @@ def generate_dashboard():
                     <h3>Current Performance</h3>
                     <p>✓ Model is detecting fraud patterns effectively with balanced precision/recall.</p>
                     <p>✓ Decision threshold optimized for business costs ($100/false negative, $5/false positive).</p>
-                    <p>✓ Real-time scoring latency: < 100ms per transaction (acceptable for approval systems).</p>
+                    <p>✓ {latency_insight()}</p>
                     <p>✓ Batch processing: 10,000 transactions/run completion time: ~30 seconds.</p>
                 </div>
                 
@@ -401,6 +415,5 @@ def generate_dashboard():
 
 
 if __name__ == '__main__':
-    import sys
     success = generate_dashboard()
     sys.exit(0 if success else 1)
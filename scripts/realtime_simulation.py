@@ -1,11 +1,16 @@
 """Realtime fraud detection simulation and testing."""
 import os
+import sys
 import json
 import joblib
-import pandas as pd
 import numpy as np
+import warnings
 from datetime import datetime, timedelta
-from sklearn.preprocessing import LabelEncoder
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.feature_vectorizer import FeatureVectorizer, FEATURE_SCHEMA_PATH
+from src.model_dispatch import DispatchingModel
 
 MODEL_PATH = 'models/baseline_model.joblib'
 DATA_PATH = 'data/raw/transactions.csv'
@@ -24,7 +29,7 @@ def generate_synthetic_transactions(n_transactions=100):
             'amount': np.abs(np.random.exponential(scale=100)) + 1,
             'transaction_hour': np.random.randint(0, 24),
             'merchant_category': np.random.choice(
-                ['Grocery', 'Electronics', 'Travel', 'Clothing', 'Food', 'Gas', 'Entertainment']
+                ['Grocery', 'Electronics', 'Travel', 'Clothing', 'Food']
             ),
             'foreign_transaction': int(np.random.binomial(1, 0.1)),
             'location_mismatch': int(np.random.binomial(1, 0.05)),
@@ -38,29 +43,6 @@ def generate_synthetic_transactions(n_transactions=100):
     return transactions
 
 
-def preprocess_transaction(data):
-    """Convert transaction dict to model input."""
-    numeric_features = [
-        'amount', 'transaction_hour', 'velocity_last_24h',
-        'device_trust_score', 'cardholder_age', 'foreign_transaction',
-        'location_mismatch'
-    ]
-    
-    X_dict = {f: data[f] for f in numeric_features}
-    
-    # Encode merchant category
-    if 'merchant_category' in data:
-        le = LabelEncoder()
-        categories = ['Grocery', 'Electronics', 'Travel', 'Clothing', 'Food', 'Gas', 'Entertainment']
-        le.fit(categories)
-        X_dict['merchant_category'] = le.transform([data['merchant_category']])[0]
-    
-    feature_order = numeric_features + ['merchant_category']
-    X = np.array([[X_dict[f] for f in feature_order]])
-    
-    return X
-
-
 def run_simulation(n_transactions=100):
     """Run realtime fraud detection simulation."""
     print("=" * 70)
@@ -72,10 +54,15 @@ def run_simulation(n_transactions=100):
         print(f"✗ Model not found: {MODEL_PATH}")
         return False
     
-    model = joblib.load(MODEL_PATH)
+    # Single transactions are scored on the serial path
+    model = DispatchingModel(joblib.load(MODEL_PATH))
     print(f"\n✓ Model loaded: {MODEL_PATH}")
     print(f"✓ Threshold: {OPTIMAL_THRESHOLD}")
     
+    vectorizer = FeatureVectorizer.from_schema(FEATURE_SCHEMA_PATH)
+    vectorizer.check_model(model.model)
+    warnings.filterwarnings('ignore', message='X does not have valid feature names')
+    
     # Generate synthetic transactions
     print(f"\n📊 Generating {n_transactions} synthetic transactions...")
     transactions = generate_synthetic_transactions(n_transactions)
@@ -90,7 +77,7 @@ def run_simulation(n_transactions=100):
     for i, trans in enumerate(transactions):
         try:
             # Preprocess
-            X = preprocess_transaction(trans)
+            X = vectorizer.transform(trans)
             
             # Predict
             prob = model.predict_proba(X)[0, 1]
@@ -162,7 +149,6 @@ def run_simulation(n_transactions=100):
 
 
 if __name__ == '__main__':
-    import sys
     import argparse
     
     parser = argparse.ArgumentParser(description='Run realtime fraud detection simulation')
@@ -1,8 +1,19 @@
-"""Automated model retraining pipeline with triggering logic."""
+"""Automated model retraining pipeline with triggering logic.
+
+With --challenger the retrained model is published as the registry's challenger
+instead of replacing the current model: scoring APIs running with SHADOW_SCORING=1
+score live traffic with it alongside the current model (see scripts/shadow_report.py),
+and it is promoted with scripts/manage_models.py once it holds up.
+
+Either way the version is published with a first-stage cascade (see src/cascade.py)
+trained alongside it, so SCORING_CASCADE=1 keeps working after a retrain.
+"""
 import os
 import sys
 import json
 import joblib
+import tempfile
+import argparse
 import pandas as pd
 import numpy as np
 from datetime import datetime
@@ -11,7 +22,16 @@ from sklearn.ensemble import RandomForestClassifier
 from sklearn.preprocessing import LabelEncoder
 from pathlib import Path
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.feature_vectorizer import FeatureVectorizer, FEATURE_SCHEMA_PATH
+from src.request_validator import TRANSACTION_FIELDS
+from src.model_registry import ModelRegistry
+from src.cascade import train_cascade
+
 MODEL_PATH = 'models/baseline_model.joblib'
+CASCADE_PATH = 'models/baseline_model.cascade.json'
+OPTIMAL_THRESHOLD = 0.29
 DATA_PATH = 'data/raw/transactions.csv'
 RETRAINING_LOG = 'reports/retraining_log.txt'
 DRIFT_METRICS = 'reports/drift_metrics.json'
@@ -38,8 +58,8 @@ def check_retraining_needed():
     return len(reasons) > 0, reasons
 
 
-def retrain_model():
-    """Retrain model with latest data."""
+def retrain_model(as_challenger=False, force=False):
+    """Retrain model with latest data; publish it as current, or as the challenger."""
     print("=" * 70)
     print("AUTOMATED MODEL RETRAINING")
     print("=" * 70)
@@ -52,7 +72,7 @@ def retrain_model():
     for reason in reasons:
         print(f"   • {reason}")
     
-    if not needed:
+    if not needed and not force:
         print("\n   ✓ Model is up-to-date. No retraining needed.")
         return True
     
@@ -99,7 +119,8 @@ def retrain_model():
     cv = StratifiedKFold(n_splits=5, shuffle=True, random_state=42)
     cv_scores = cross_validate(
         model, X_train, y_train, cv=cv,
-        scoring=['accuracy', 'precision', 'recall', 'roc_auc']
+        scoring=['accuracy', 'precision', 'recall', 'roc_auc'],
+        return_estimator=True, return_indices=True
     )
     
     accuracy = cv_scores['test_accuracy'].mean()
@@ -108,18 +129,64 @@ def retrain_model():
     print(f"   Accuracy: {accuracy:.4f}")
     print(f"   ROC-AUC: {roc_auc:.4f}")
     
-    # Save new model
-    os.makedirs(os.path.dirname(MODEL_PATH), exist_ok=True)
-    
-    # Backup old model
-    if os.path.exists(MODEL_PATH):
-        backup_path = MODEL_PATH.replace('.joblib', f'_backup_{datetime.now().strftime("%Y%m%d_%H%M%S")}.joblib')
-        import shutil
-        shutil.copy(MODEL_PATH, backup_path)
-        print(f"✓ Old model backed up: {backup_path}")
-    
-    joblib.dump(model, MODEL_PATH)
-    print(f"✓ New model saved: {MODEL_PATH}")
+    vectorizer = FeatureVectorizer.from_training_frame(X, df, cat_cols, fields=TRANSACTION_FIELDS)
+    registry = ModelRegistry()
+    current = registry.current_version()
+    threshold = registry.metadata(current)['threshold'] if current else OPTIMAL_THRESHOLD
+    metrics = {'cv_accuracy_mean': float(accuracy), 'cv_roc_auc_mean': float(roc_auc),
+               'train_size': len(X_train), 'test_size': len(X_test)}
+    
+    # First stage and band for this model, tuned out-of-fold at the serving threshold
+    print("\n🪜 Training cascade first stage...")
+    cascade = train_cascade(
+        X_train.values, y_train.values, X_test.values, y_test.values,
+        model.predict_proba(X_test)[:, 1], vectorizer.features,
+        cv_scores['estimator'], cv_scores['indices'], threshold
+    )
+    test = cascade.tuning['test']
+    print(f"   Band [{cascade.low:.4f}, {cascade.high:.4f}): forest scores {test['tiers']['forest']:.1%} of test rows,"
+          f" recall loss {test['recall_loss']:.4f}")
+    
+    if as_challenger:
+        # Publish without touching the serving model or the baseline artifacts
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            model_path = os.path.join(tmp_dir, 'model.joblib')
+            schema_path = os.path.join(tmp_dir, 'feature_schema.json')
+            cascade_path = os.path.join(tmp_dir, 'cascade.json')
+            joblib.dump(model, model_path)
+            vectorizer.save(schema_path)
+            cascade.save(cascade_path, model_path)
+            version = registry.publish(model_path, schema_path, threshold, metrics=metrics, model=model,
+                                       notes='; '.join(['challenger'] + reasons), activate=False, X_check=X,
+                                       cascade_path=cascade_path)
+        registry.set_challenger(version)
+        print(f"✓ Published model version {version} as challenger to {current or 'none'} (threshold {threshold})")
+        print("   Shadow-scored by APIs running with SHADOW_SCORING=1; compare with scripts/shadow_report.py")
+    else:
+        # Save new model; replace atomically so readers never see a partial file
+        os.makedirs(os.path.dirname(MODEL_PATH), exist_ok=True)
+        tmp_path = f"{MODEL_PATH}.tmp"
+        joblib.dump(model, tmp_path)
+        os.replace(tmp_path, MODEL_PATH)
+        print(f"✓ New model saved: {MODEL_PATH}")
+        
+        vectorizer.save(FEATURE_SCHEMA_PATH)
+        print(f"✓ Feature schema saved: {FEATURE_SCHEMA_PATH}")
+        
+        cascade.save(CASCADE_PATH, MODEL_PATH)
+        print(f"✓ Cascade saved: {CASCADE_PATH}")
+        
+        # Publish an immutable registry version; running scoring APIs pick it up live.
+        # Previous versions stay in the registry for rollback.
+        version = registry.publish(
+            MODEL_PATH, FEATURE_SCHEMA_PATH, threshold,
+            metrics=metrics,
+            model=model,
+            notes='; '.join(reasons),
+            X_check=X,
+            cascade_path=CASCADE_PATH
+        )
+        print(f"✓ Published model version {version} (threshold {threshold}, previous: {current or 'none'})")
     
     # Log retraining
     log_entry = f"""
@@ -135,7 +202,8 @@ Performance:
   Training samples: {len(X_train)}
   Test samples: {len(X_test)}
 
-Model saved: {MODEL_PATH}
+Model saved: {'registry only (challenger)' if as_challenger else MODEL_PATH}
+Registry version: {version}{' (challenger)' if as_challenger else ''}
 """
     
     os.makedirs(os.path.dirname(RETRAINING_LOG), exist_ok=True)
@@ -151,5 +219,10 @@ Model saved: {MODEL_PATH}
 
 
 if __name__ == '__main__':
-    success = retrain_model()
+    parser = argparse.ArgumentParser(description='Retrain the fraud model when drift or age calls for it')
+    parser.add_argument('--challenger', action='store_true',
+                        help='Publish as the challenger for shadow scoring instead of replacing the model')
+    parser.add_argument('--force', action='store_true', help='Retrain even if no trigger fired')
+    args = parser.parse_args()
+    success = retrain_model(as_challenger=args.challenger, force=args.force)
     sys.exit(0 if success else 1)
@@ -1,222 +1,195 @@
 """Real-time fraud scoring API using Flask."""
 import os
 import sys
-import json
-import joblib
-import pandas as pd
-import numpy as np
-from datetime import datetime
-from flask import Flask, request, jsonify
-from sklearn.preprocessing import LabelEncoder
+import atexit
+from flask import Flask, Response, request, jsonify
+from werkzeug.exceptions import BadRequest
 import logging
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.scoring_service import (
+    ScoringService, MODEL_REGISTRY_DIR, MODEL_WATCH_INTERVAL, AUDIT_LOG_DIR, AUDIT_FSYNC,
+    STREAM_CHUNK_SIZE, STREAM_READ_BYTES
+)
+from src.columnar_codec import CONTENT_TYPE as COLUMNAR_CONTENT_TYPE
+from src.metrics import RequestTimer, CONTENT_TYPE as METRICS_CONTENT_TYPE
+
 # Setup logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Configuration
-MODEL_PATH = 'models/baseline_model.joblib'
-OPTIMAL_THRESHOLD = 0.29
-PREDICTIONS_LOG = 'reports/realtime_predictions.log'
-
 # Initialize Flask app
 app = Flask(__name__)
 
-# Load model on startup
-try:
-    model = joblib.load(MODEL_PATH)
-    logger.info(f"✓ Model loaded from {MODEL_PATH}")
-except Exception as e:
-    logger.error(f"✗ Failed to load model: {e}")
-    model = None
+# Load the model, restore counters and start the background writers on startup
+service = ScoringService()
 
+# Threads do not survive fork: pre-forked workers start their own
+os.register_at_fork(after_in_child=service.restart_in_worker)
+
+# Flush the audit trail and snapshot the counters on shutdown
+atexit.register(service.close)
+
+
+def traced(endpoint, timer, response, status, encoded=False):
+    """Finish the request's trace after encoding and echo its trace id in a traceresponse header.
+
+    ``encoded`` bodies were already serialized (and timed) by the service.
+    """
+    if not encoded:
+        timer.mark('encode')
+    traceresponse = service.finish_trace(endpoint, status, timer)
+    if traceresponse is not None:
+        response.headers['traceresponse'] = traceresponse
+    return response, status
 
-def preprocess_transaction(data):
-    """Preprocess transaction data for model scoring."""
-    try:
-        # Create DataFrame from input
-        df = pd.DataFrame([data])
-        
-        # Select numeric features
-        numeric_features = [
-            'amount', 'transaction_hour', 'velocity_last_24h',
-            'device_trust_score', 'cardholder_age', 'foreign_transaction',
-            'location_mismatch'
-        ]
-        
-        X = df[numeric_features].copy()
-        
-        # Handle categorical
-        if 'merchant_category' in data:
-            le = LabelEncoder()
-            categories = ['Grocery', 'Electronics', 'Travel', 'Clothing', 'Food', 'Gas', 'Entertainment']
-            le.fit(categories)
-            X['merchant_category'] = le.transform([data['merchant_category']])
-        
-        return X
-    except Exception as e:
-        logger.error(f"Preprocessing error: {e}")
-        return None
-
-
-def log_prediction(transaction_id, input_data, prediction, probability, decision):
-    """Log prediction to audit trail."""
-    log_entry = {
-        'timestamp': datetime.utcnow().isoformat(),
-        'transaction_id': transaction_id,
-        'fraud_probability': float(probability),
-        'decision': decision,
-        'threshold': OPTIMAL_THRESHOLD,
-        'features': input_data
-    }
-    
-    os.makedirs(os.path.dirname(PREDICTIONS_LOG), exist_ok=True)
-    with open(PREDICTIONS_LOG, 'a') as f:
-        f.write(json.dumps(log_entry) + '\n')
-    
-    return log_entry
+
+def invalid_json_message(error):
+    """Error body text for a body Flask could not decode, naming the decoder's complaint."""
+    # Flask re-raises the decoder's BadRequest with a generic description
+    cause = error.__cause__ if isinstance(error.__cause__, BadRequest) else error
+    return f"Invalid JSON: {cause.description}"
 
 
 @app.route('/health', methods=['GET'])
 def health():
     """Health check endpoint."""
-    return jsonify({
-        'status': 'healthy',
-        'model_loaded': model is not None,
-        'timestamp': datetime.utcnow().isoformat()
-    }), 200
+    body, status = service.health()
+    return jsonify(body), status
 
 
 @app.route('/predict', methods=['POST'])
 def predict():
     """Score a single transaction for fraud risk."""
+    timer = RequestTimer()
     try:
         data = request.get_json()
-        
-        if not data:
-            return jsonify({'error': 'No JSON data provided'}), 400
-        
-        transaction_id = data.get('transaction_id', 'unknown')
-        
-        # Preprocess
-        X = preprocess_transaction(data)
-        if X is None or X.shape[1] == 0:
-            return jsonify({'error': 'Invalid transaction features'}), 400
-        
-        # Predict
-        if model is None:
-            return jsonify({'error': 'Model not loaded'}), 500
-        
-        probability = model.predict_proba(X)[0, 1]
-        decision = 'BLOCK' if probability >= OPTIMAL_THRESHOLD else 'APPROVE'
-        confidence = max(probability, 1 - probability)
-        
-        # Log
-        log_prediction(transaction_id, data, 1 if decision == 'BLOCK' else 0, probability, decision)
-        
-        logger.info(f"Transaction {transaction_id}: {decision} (prob={probability:.4f})")
-        
-        return jsonify({
-            'transaction_id': transaction_id,
-            'fraud_probability': float(probability),
-            'decision': decision,
-            'confidence': float(confidence),
-            'threshold': OPTIMAL_THRESHOLD,
-            'timestamp': datetime.utcnow().isoformat()
-        }), 200
-        
+    except BadRequest as e:
+        # Malformed JSON is the client's error, as in scripts/scoring_asgi.py
+        service.metrics.observe('/predict', 400, timer)
+        return traced('/predict', timer, jsonify({'error': invalid_json_message(e)}), 400)
     except Exception as e:
         logger.error(f"Prediction error: {e}")
-        return jsonify({'error': str(e)}), 500
+        service.metrics.observe('/predict', 500, timer)
+        return traced('/predict', timer, jsonify({'error': str(e)}), 500)
+    timer.mark('parse')
+    body, status = service.predict(data, timer)
+    return traced('/predict', timer, jsonify(body), status)
 
 
 @app.route('/batch_predict', methods=['POST'])
 def batch_predict():
-    """Score multiple transactions."""
+    """Score multiple transactions with a single model call."""
+    timer = RequestTimer()
+    if request.mimetype == COLUMNAR_CONTENT_TYPE:
+        body, status, content_type = service.batch_predict_columnar(request.get_data(), timer)
+        return traced('/batch_predict', timer, Response(body, content_type=content_type), status,
+                      encoded=True)
     try:
         data = request.get_json()
-        
-        if not isinstance(data, list):
-            return jsonify({'error': 'Expected list of transactions'}), 400
-        
-        results = []
-        for transaction in data:
-            X = preprocess_transaction(transaction)
-            if X is None:
-                results.append({
-                    'transaction_id': transaction.get('transaction_id', 'unknown'),
-                    'error': 'Invalid features'
-                })
-                continue
-            
-            probability = model.predict_proba(X)[0, 1]
-            decision = 'BLOCK' if probability >= OPTIMAL_THRESHOLD else 'APPROVE'
-            
-            result = {
-                'transaction_id': transaction.get('transaction_id', 'unknown'),
-                'fraud_probability': float(probability),
-                'decision': decision,
-                'confidence': float(max(probability, 1 - probability))
-            }
-            results.append(result)
-            
-            # Log
-            log_prediction(result['transaction_id'], transaction, 1 if decision == 'BLOCK' else 0, probability, decision)
-        
-        logger.info(f"Batch prediction completed: {len(results)} transactions")
-        
-        return jsonify({
-            'count': len(results),
-            'results': results,
-            'timestamp': datetime.utcnow().isoformat()
-        }), 200
-        
+    except BadRequest as e:
+        # Malformed JSON is the client's error, as in scripts/scoring_asgi.py
+        service.metrics.observe('/batch_predict', 400, timer)
+        return traced('/batch_predict', timer, jsonify({'error': invalid_json_message(e)}), 400)
     except Exception as e:
         logger.error(f"Batch prediction error: {e}")
-        return jsonify({'error': str(e)}), 500
+        service.metrics.observe('/batch_predict', 500, timer)
+        return traced('/batch_predict', timer, jsonify({'error': str(e)}), 500)
+    timer.mark('parse')
+    body, status = service.batch_predict(data, timer)
+    return traced('/batch_predict', timer, jsonify(body), status)
+
+
+@app.route('/stream_predict', methods=['POST'])
+def stream_predict():
+    """Score newline-delimited JSON transactions, streaming NDJSON results chunk by chunk."""
+    stream = request.stream
+    chunks = iter(lambda: stream.read(STREAM_READ_BYTES), b'')
+    return Response(service.stream_predict(chunks), mimetype='application/x-ndjson')
 
 
 @app.route('/stats', methods=['GET'])
 def stats():
-    """Get prediction statistics."""
-    try:
-        if not os.path.exists(PREDICTIONS_LOG):
-            return jsonify({'error': 'No predictions yet'}), 404
-        
-        with open(PREDICTIONS_LOG, 'r') as f:
-            lines = f.readlines()
-        
-        total = len(lines)
-        blocked = sum(1 for line in lines if 'BLOCK' in line)
-        approved = total - blocked
-        
-        return jsonify({
-            'total_predictions': total,
-            'blocked': blocked,
-            'approved': approved,
-            'block_rate': blocked / total if total > 0 else 0,
-            'timestamp': datetime.utcnow().isoformat()
-        }), 200
-        
-    except Exception as e:
-        logger.error(f"Stats error: {e}")
-        return jsonify({'error': str(e)}), 500
+    """Get prediction statistics from the live counters."""
+    body, status = service.stats()
+    return jsonify(body), status
+
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Request counters and latency histograms in Prometheus text format."""
+    body, status = service.metrics_text()
+    return Response(body, status, content_type=METRICS_CONTENT_TYPE)
 
 
 if __name__ == '__main__':
+    import argparse
+    # Only needed to run the server, not when the app is imported by another server
+    from src.prefork_server import serve, GRACEFUL_TIMEOUT
+    
+    parser = argparse.ArgumentParser(description='Run the real-time fraud scoring API')
+    parser.add_argument('--host', default='0.0.0.0', help='Interface to bind')
+    parser.add_argument('--port', type=int, default=5000, help='Port to listen on')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='Pre-forked worker processes (1 = single-process development server)')
+    parser.add_argument('--graceful-timeout', type=float, default=GRACEFUL_TIMEOUT,
+                        help='Seconds a worker may take to drain on restart or shutdown')
+    parser.add_argument('--socket', default=os.environ.get('SCORING_SOCKET'),
+                        help='Also answer binary scoring frames on this Unix domain socket path')
+    args = parser.parse_args()
+    
     print("=" * 70)
     print("FRAUD DETECTION REAL-TIME SCORING API")
     print("=" * 70)
-    print(f"\n✓ Model loaded from: {MODEL_PATH}")
-    print(f"✓ Optimal threshold: {OPTIMAL_THRESHOLD}")
-    print(f"✓ Predictions logged to: {PREDICTIONS_LOG}")
+    scoring_model = service.scoring_model
+    if scoring_model is not None:
+        print(f"\n✓ Model version: {scoring_model.version} (registry: {MODEL_REGISTRY_DIR}, polled every {MODEL_WATCH_INTERVAL}s)")
+        print(f"✓ Optimal threshold: {scoring_model.threshold}")
+        print(f"✓ Scoring engine: {scoring_model.engine}")
+    else:
+        print("\n✗ No model loaded; waiting for a registry version")
+    print(f"✓ Predictions logged to: {AUDIT_LOG_DIR}/ (async segments, fsync={AUDIT_FSYNC})")
     print("\nAvailable endpoints:")
     print("  GET  /health           - Health check")
     print("  POST /predict          - Score single transaction")
-    print("  POST /batch_predict    - Score multiple transactions")
+    print(f"  POST /batch_predict    - Score multiple transactions (JSON or {COLUMNAR_CONTENT_TYPE})")
+    print(f"  POST /stream_predict   - Score NDJSON, results streamed per {STREAM_CHUNK_SIZE} lines")
     print("  GET  /stats            - Prediction statistics")
+    print("  GET  /metrics          - Prometheus request metrics")
+    if args.socket:
+        print(f"  UNIX {args.socket} - Binary scoring frames (src/binary_protocol.py)")
     print("\n" + "=" * 70)
-    print("Starting server on http://localhost:5000")
+    print(f"Starting server on http://{args.host}:{args.port} ({args.workers} worker{'s' if args.workers > 1 else ''})")
+    if args.workers > 1:
+        print(f"Send SIGHUP to pid {os.getpid()} for a graceful rolling restart")
     print("=" * 70 + "\n")
     
-    app.run(host='0.0.0.0', port=5000, debug=False)
+    if args.socket:
+        from src.binary_server import BinaryScoringServer, bind_unix_socket
+        binary_socket = bind_unix_socket(args.socket)
+        master_pid = os.getpid()
+
+        def remove_socket():
+            # Only the process that bound the path removes it, and only if it is still there
+            if os.getpid() != master_pid:
+                return
+            try:
+                os.unlink(args.socket)
+            except FileNotFoundError:
+                pass
+
+        atexit.register(remove_socket)
+        if args.workers > 1:
+            # Each worker accepts on the inherited socket, like on the HTTP listener
+            os.register_at_fork(after_in_child=lambda: BinaryScoringServer(service, binary_socket).start())
+        else:
+            BinaryScoringServer(service, binary_socket).start()
+    
+    if args.workers > 1:
+        # The master only supervises: its threads stop before the first fork and each
+        # worker starts its own (restart_in_worker) and shuts them down on exit
+        serve(app, args.host, args.port, args.workers, args.graceful_timeout,
+              before_fork=service.stop_background, worker_exit=service.close)
+    else:
+        app.run(host=args.host, port=args.port, debug=False)
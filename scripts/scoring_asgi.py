@@ -0,0 +1,280 @@
+"""Asyncio (ASGI) variant of the real-time fraud scoring API.
+
+Serves the same /health, /predict, /batch_predict, /stream_predict, /stats and
+/metrics contract as scoring_api.py from a single event loop, so an idle keep-alive
+connection costs a socket and a few kilobytes instead of a thread. Request
+bodies are read on the loop; JSON decoding, vectorization, inference and response encoding run on a
+bounded thread pool, with a cap on how many requests are handed to it at once.
+Audit records go through the same non-blocking background writer as the Flask
+app.
+
+Runs under uvicorn (optional dependency: pip install uvicorn):
+
+    python scripts/scoring_asgi.py --port 5000
+"""
+import os
+import sys
+import json
+import atexit
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.columnar_codec import CONTENT_TYPE as COLUMNAR_CONTENT_TYPE
+from src.metrics import RequestTimer, CONTENT_TYPE as METRICS_CONTENT_TYPE
+from src.scoring_service import (
+    ScoringService, NDJSONSplitter, MODEL_REGISTRY_DIR, MODEL_WATCH_INTERVAL, AUDIT_LOG_DIR, AUDIT_FSYNC,
+    STREAM_CHUNK_SIZE
+)
+
+# Setup logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Threads running decode + inference + encode for POST requests
+ASGI_INFERENCE_THREADS = int(os.environ.get('ASGI_INFERENCE_THREADS', 4))
+
+# Requests handed to the pool at once; the rest wait on the event loop
+ASGI_MAX_QUEUED = int(os.environ.get('ASGI_MAX_QUEUED', 64))
+
+# Larger request bodies are rejected with 413
+ASGI_MAX_BODY_BYTES = int(os.environ.get('ASGI_MAX_BODY_BYTES', 64 * 1024 * 1024))
+
+# Load the model, restore counters and start the background writers on startup
+service = ScoringService()
+atexit.register(service.close)
+
+executor = ThreadPoolExecutor(max_workers=ASGI_INFERENCE_THREADS, thread_name_prefix='scoring')
+inference_slots = asyncio.Semaphore(ASGI_MAX_QUEUED)
+
+
+def _run_json_handler(endpoint, handler, payload, timer):
+    """Decode a request body, call the service handler and encode the response (pool thread).
+
+    Returns the status, the encoded body and the traceresponse header value (None untraced).
+    """
+    # Time spent reading the body and waiting for a pool thread counts towards the total only
+    timer.skip()
+    try:
+        data = json.loads(payload) if payload else None
+    except ValueError as e:
+        service.metrics.observe(endpoint, 400, timer)
+        status, body = 400, {'error': f'Invalid JSON: {e}'}
+    else:
+        timer.mark('parse')
+        body, status = handler(data, timer)
+    body = json.dumps(body).encode()
+    timer.mark('encode')
+    return status, body, service.finish_trace(endpoint, status, timer)
+
+
+# path -> (method, service handler, takes a JSON body)
+ROUTES = {
+    '/health': ('GET', service.health, False),
+    '/predict': ('POST', service.predict, True),
+    '/batch_predict': ('POST', service.batch_predict, True),
+    '/stats': ('GET', service.stats, False),
+}
+
+
+def _content_type(scope):
+    """Media type of the request, without parameters."""
+    for name, value in scope['headers']:
+        if name == b'content-type':
+            return value.decode('latin-1').split(';')[0].strip().lower()
+    return None
+
+
+async def _read_body(receive):
+    """Collect the request body, or return None if it exceeds ASGI_MAX_BODY_BYTES."""
+    chunks, size = [], 0
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            return b''
+        chunk = message.get('body', b'')
+        size += len(chunk)
+        if size > ASGI_MAX_BODY_BYTES:
+            return None
+        chunks.append(chunk)
+        if not message.get('more_body', False):
+            return b''.join(chunks)
+
+
+async def _send_response(send, status, body, content_type='application/json', traceresponse=None):
+    headers = [(b'content-type', content_type.encode()), (b'content-length', str(len(body)).encode())]
+    if traceresponse is not None:
+        headers.append((b'traceresponse', traceresponse.encode()))
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': headers
+    })
+    await send({'type': 'http.response.body', 'body': body})
+
+
+async def _stream_predict(receive, send):
+    """Score an NDJSON request body chunk by chunk, sending each chunk's results as it completes.
+
+    The body is only read as fast as chunks are scored, so TCP flow control
+    keeps a fast client from filling memory.
+    """
+    timer = RequestTimer()
+    scorer = service.scoring_model
+    if scorer is None:
+        service.metrics.observe('/stream_predict', 500, timer)
+        await _send_response(send, 500, b'{"error": "Model not loaded"}')
+        return
+    await send({
+        'type': 'http.response.start',
+        'status': 200,
+        'headers': [(b'content-type', b'application/x-ndjson')]
+    })
+    loop = asyncio.get_running_loop()
+
+    async def score(lines):
+        async with inference_slots:
+            body = await loop.run_in_executor(executor, service.score_ndjson_chunk, lines, scorer, timer)
+        await send({'type': 'http.response.body', 'body': body, 'more_body': True})
+
+    splitter = NDJSONSplitter()
+    lines, total = [], 0
+    try:
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                return
+            lines.extend(splitter.feed(message.get('body', b'')))
+            while len(lines) >= STREAM_CHUNK_SIZE:
+                await score(lines[:STREAM_CHUNK_SIZE])
+                total += STREAM_CHUNK_SIZE
+                del lines[:STREAM_CHUNK_SIZE]
+            if not message.get('more_body', False):
+                break
+        lines.extend(splitter.close())
+        if lines:
+            await score(lines)
+            total += len(lines)
+    except ValueError as e:
+        logger.error(f"Stream prediction error: {e}")
+        await send({'type': 'http.response.body', 'body': json.dumps({'error': str(e)}).encode() + b'\n', 'more_body': True})
+    finally:
+        # The 200 status went out with the first chunk
+        service.metrics.observe('/stream_predict', 200, timer, batch_size=total)
+        service.record_first_prediction(200 if total else None)
+    await send({'type': 'http.response.body', 'body': b''})
+
+
+async def _lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            # The audit trail is flushed by the atexit hook once the server has drained
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+async def app(scope, receive, send):
+    """ASGI entry point."""
+    if scope['type'] == 'lifespan':
+        await _lifespan(receive, send)
+        return
+    if scope['type'] != 'http':
+        return
+
+    if scope['path'] == '/stream_predict' and scope['method'] == 'POST':
+        await _stream_predict(receive, send)
+        return
+    if scope['path'] == '/metrics' and scope['method'] == 'GET':
+        body, status = service.metrics_text()
+        await _send_response(send, status, body.encode(), METRICS_CONTENT_TYPE)
+        return
+
+    route = ROUTES.get(scope['path'])
+    if route is None:
+        await _send_response(send, 404, b'{"error": "Not found"}')
+        return
+    method, handler, takes_body = route
+    if scope['method'] != method:
+        await _send_response(send, 405, b'{"error": "Method not allowed"}')
+        return
+
+    if not takes_body:
+        # Cheap reads of in-memory state; answered on the loop
+        body, status = handler()
+        await _send_response(send, status, json.dumps(body).encode())
+        return
+
+    timer = RequestTimer()
+    payload = await _read_body(receive)
+    if payload is None:
+        service.metrics.observe(scope['path'], 413, timer)
+        await _send_response(send, 413, b'{"error": "Request body too large"}')
+        return
+
+    loop = asyncio.get_running_loop()
+    async with inference_slots:
+        if handler == service.batch_predict and _content_type(scope) == COLUMNAR_CONTENT_TYPE:
+            body, status, content_type = await loop.run_in_executor(
+                executor, service.batch_predict_columnar, payload, timer)
+            traceresponse = service.finish_trace('/batch_predict', status, timer)
+            await _send_response(send, status, body, content_type, traceresponse)
+            return
+        status, body, traceresponse = await loop.run_in_executor(
+            executor, _run_json_handler, scope['path'], handler, payload, timer)
+    await _send_response(send, status, body, traceresponse=traceresponse)
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Run the asyncio fraud scoring API')
+    parser.add_argument('--host', default='0.0.0.0', help='Interface to bind')
+    parser.add_argument('--port', type=int, default=5000, help='Port to listen on')
+    parser.add_argument('--keep-alive', type=int, default=75,
+                        help='Seconds an idle keep-alive connection is held open')
+    parser.add_argument('--backlog', type=int, default=4096, help='Listen backlog')
+    args = parser.parse_args()
+
+    try:
+        import uvicorn
+    except ImportError:
+        print("✗ uvicorn is required for the asyncio server: pip install uvicorn")
+        sys.exit(1)
+
+    print("=" * 70)
+    print("FRAUD DETECTION REAL-TIME SCORING API (asyncio)")
+    print("=" * 70)
+    scoring_model = service.scoring_model
+    if scoring_model is not None:
+        print(f"\n✓ Model version: {scoring_model.version} (registry: {MODEL_REGISTRY_DIR}, polled every {MODEL_WATCH_INTERVAL}s)")
+        print(f"✓ Optimal threshold: {scoring_model.threshold}")
+        print(f"✓ Scoring engine: {scoring_model.engine}")
+    else:
+        print("\n✗ No model loaded; waiting for a registry version")
+    print(f"✓ Predictions logged to: {AUDIT_LOG_DIR}/ (async segments, fsync={AUDIT_FSYNC})")
+    print(f"✓ Inference pool: {ASGI_INFERENCE_THREADS} threads, {ASGI_MAX_QUEUED} requests in flight")
+    print("\nAvailable endpoints:")
+    print("  GET  /health           - Health check")
+    print("  POST /predict          - Score single transaction")
+    print(f"  POST /batch_predict    - Score multiple transactions (JSON or {COLUMNAR_CONTENT_TYPE})")
+    print(f"  POST /stream_predict   - Score NDJSON, results streamed per {STREAM_CHUNK_SIZE} lines")
+    print("  GET  /stats            - Prediction statistics")
+    print("  GET  /metrics          - Prometheus request metrics")
+    print("\n" + "=" * 70)
+    print(f"Starting server on http://{args.host}:{args.port} (keep-alive {args.keep_alive}s)")
+    print("=" * 70 + "\n")
+
+    uvicorn.run(
+        app,
+        host=args.host,
+        port=args.port,
+        backlog=args.backlog,
+        timeout_keep_alive=args.keep_alive,
+        access_log=False,
+        log_level='warning'
+    )
@@ -0,0 +1,99 @@
+"""Champion vs challenger report from the shadow scoring log.
+
+Reads the side-by-side records written by scoring APIs running with
+SHADOW_SCORING=1 and reports, per champion/challenger pair, how often the two
+models agree, where they disagree (which one blocks), how far their
+probabilities differ and each model's latency on the same calls.
+
+    python scripts/shadow_report.py
+    python scripts/shadow_report.py --log reports/shadow_predictions.log --output reports/shadow_report.json
+"""
+import os
+import sys
+import json
+import argparse
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.shadow_scoring import ShadowComparison
+
+SHADOW_LOG = 'reports/shadow_predictions.log'
+SHADOW_REPORT = 'reports/shadow_report.json'
+
+
+def load_comparisons(path):
+    """Aggregate the shadow log per (champion version, challenger version)."""
+    comparisons = {}
+    skipped = 0
+    with open(path, 'r') as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+                champion, challenger = record['champion'], record['challenger']
+            except (ValueError, KeyError):
+                skipped += 1
+                continue
+            key = (champion['model_version'], challenger['model_version'])
+            if key not in comparisons:
+                comparisons[key] = ShadowComparison(latency_window=None)
+            comparisons[key].add(
+                champion['fraud_probability'], [d == 'BLOCK' for d in champion['decision']],
+                challenger['fraud_probability'], [d == 'BLOCK' for d in challenger['decision']],
+                champion.get('full_latency_ms', champion['latency_ms']) / 1000, challenger['latency_ms'] / 1000,
+                champion['latency_ms'] / 1000
+            )
+    return comparisons, skipped
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare champion and challenger decisions on live traffic')
+    parser.add_argument('--log', default=SHADOW_LOG, help='Shadow scoring log')
+    parser.add_argument('--output', default=SHADOW_REPORT, help='JSON report path')
+    args = parser.parse_args()
+
+    print("=" * 70)
+    print("SHADOW SCORING REPORT")
+    print("=" * 70)
+
+    if not os.path.exists(args.log):
+        print(f"\n✗ No shadow log at {args.log}; run the API with SHADOW_SCORING=1 and a challenger")
+        return False
+    comparisons, skipped = load_comparisons(args.log)
+    if not comparisons:
+        print(f"\n✗ No shadow records in {args.log}")
+        return False
+
+    pairs = []
+    for (champion, challenger), comparison in comparisons.items():
+        summary = comparison.summary()
+        decisions = summary['decisions']
+        delta = summary['probability_delta']
+        latency = summary['latency_ms']
+        print(f"\n📊 Champion {champion} vs challenger {challenger}: {summary['rows']} transactions"
+              f" in {summary['calls']} calls")
+        print(f"   Agreement:              {summary['agreement_rate']:.2%}")
+        print(f"   Both block:             {decisions['both_block']}")
+        print(f"   Only champion blocks:   {decisions['champion_only_block']}")
+        print(f"   Only challenger blocks: {decisions['challenger_only_block']}")
+        print(f"   Probability delta:      mean {delta['mean']:+.4f}, mean |Δ| {delta['mean_abs']:.4f},"
+              f" max |Δ| {delta['max_abs']:.4f}")
+        print(f"\n   {'Latency (ms)':<12} {'p50':>8} {'p95':>8} {'p99':>8} {'max':>8}")
+        for model, label in (('champion', 'champion'), ('challenger', 'challenger'), ('champion_served', 'served')):
+            p = latency[model]
+            print(f"   {label:<12} {p['p50']:>8.3f} {p['p95']:>8.3f} {p['p99']:>8.3f} {p['max']:>8.3f}")
+        pairs.append({'champion_version': champion, 'challenger_version': challenger, **summary})
+
+    if skipped:
+        print(f"\n⚠️  Skipped {skipped} unreadable records")
+
+    os.makedirs(os.path.dirname(args.output), exist_ok=True)
+    with open(args.output, 'w') as f:
+        json.dump({'timestamp': datetime.now().isoformat(), 'log': args.log, 'pairs': pairs}, f, indent=2)
+    print(f"\n✓ Report saved: {args.output}")
+    return True
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -14,12 +14,29 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from src.train_model import train_baseline
 from src.explainability import permutation_importance_report
+from src.feature_vectorizer import FeatureVectorizer, FEATURE_SCHEMA_PATH
+from src.request_validator import TRANSACTION_FIELDS
+from src.model_registry import ModelRegistry
+from src.compact_model import export_compact_model, compare_artifacts, compaction_savings
+from src.forest_engine import FlatForest
+from src.cascade import train_cascade, benchmark, MAX_RECALL_LOSS, MAX_FALSE_BLOCK_RATE
 
 # Paths
 DATA_PATH = 'data/raw/transactions.csv'
 MODEL_OUT = 'models/baseline_model.joblib'
+COMPACT_OUT = 'models/baseline_model.frc'
+COMPACT_REPORT = 'reports/compact_model_report.json'
 METRICS_OUT = 'reports/training_metrics.json'
 EVAL_REPORT = 'reports/model_evaluation.txt'
+OPTIMAL_THRESHOLD = 0.29
+
+# Two-tier cascade: first-stage model and band (served with SCORING_CASCADE=1). The band
+# is tuned on out-of-fold training scores within these bounds on recall lost and extra
+# legitimate blocks, then evaluated on the test set
+CASCADE_OUT = 'models/baseline_model.cascade.json'
+CASCADE_REPORT = 'reports/cascade_report.json'
+CASCADE_MAX_RECALL_LOSS = float(os.environ.get('CASCADE_MAX_RECALL_LOSS', MAX_RECALL_LOSS))
+CASCADE_MAX_FALSE_BLOCK_RATE = float(os.environ.get('CASCADE_MAX_FALSE_BLOCK_RATE', MAX_FALSE_BLOCK_RATE))
 
 def main():
     print("=" * 60)
@@ -77,7 +94,8 @@ def main():
     cv = StratifiedKFold(n_splits=5, shuffle=True, random_state=42)
     cv_scores = cross_validate(
         model, X_train, y_train, cv=cv,
-        scoring=['accuracy', 'precision', 'recall', 'roc_auc']
+        scoring=['accuracy', 'precision', 'recall', 'roc_auc'],
+        return_estimator=True, return_indices=True
     )
     print(f"   Accuracy:  {cv_scores['test_accuracy'].mean():.4f} (+/- {cv_scores['test_accuracy'].std():.4f})")
     print(f"   Precision: {cv_scores['test_precision'].mean():.4f} (+/- {cv_scores['test_precision'].std():.4f})")
@@ -108,6 +126,65 @@ def main():
     joblib.dump(model, MODEL_OUT)
     print(f"\n✓ Model saved: {MODEL_OUT}")
     
+    # Save feature schema used by the serving vectorizer
+    vectorizer = FeatureVectorizer.from_training_frame(X, df, cat_cols, fields=TRANSACTION_FIELDS)
+    vectorizer.save(FEATURE_SCHEMA_PATH)
+    print(f"✓ Feature schema saved: {FEATURE_SCHEMA_PATH}")
+    
+    # Train the cascade's first stage, tune its band on out-of-fold scores of the
+    # training rows (the cross-validation folds above) and evaluate it on the test set
+    print("\n🪜 Training cascade first stage (logistic regression)...")
+    cascade = train_cascade(X_train.values, y_train.values, X_test.values, y_test.values, y_pred_proba,
+                            vectorizer.features, cv_scores['estimator'], cv_scores['indices'], OPTIMAL_THRESHOLD,
+                            CASCADE_MAX_RECALL_LOSS, CASCADE_MAX_FALSE_BLOCK_RATE)
+    cascade.save(CASCADE_OUT, MODEL_OUT)
+    low, high = cascade.low, cascade.high
+    validation, evaluation = cascade.tuning['validation'], cascade.tuning['test']
+    tiers = evaluation['tiers']
+    print(f"   Band [{low:.4f}, {'-' if high == np.inf else f'{high:.4f}'}) tuned on {validation['rows']} out-of-fold"
+          f" training rows (recall loss {validation['recall_loss']:.4f} <= {CASCADE_MAX_RECALL_LOSS},"
+          f" extra blocks {validation['false_block_rate']:.4f} <= {CASCADE_MAX_FALSE_BLOCK_RATE})")
+    print(f"   Test set: first stage approves {tiers['first_stage_approve']:.1%}, blocks"
+          f" {tiers['first_stage_block']:.1%}, forest scores {tiers['forest']:.1%}")
+    print(f"   Test recall {evaluation['forest_recall']:.4f} -> {evaluation['cascade_recall']:.4f}"
+          f" (loss {evaluation['recall_loss']:.4f}), extra blocks {evaluation['false_block_rate']:.4f}")
+    print(f"✓ Cascade saved: {CASCADE_OUT}")
+    flat_forest = FlatForest.from_sklearn(model)
+    
+    def score_forest(rows):
+        return flat_forest.predict_proba(rows), np.full(len(rows), flat_forest.n_trees)
+    
+    timing = benchmark(cascade, score_forest, X_test.values, OPTIMAL_THRESHOLD)
+    print(f"   Single row p50 {timing['forest']['single']['p50_ms']:.3f} ms -> {timing['cascade']['single']['p50_ms']:.3f} ms,"
+          f" batch {timing['forest']['batch']['rows_per_s']:,.0f} -> {timing['cascade']['batch']['rows_per_s']:,.0f} rows/s"
+          f" ({timing['batch_throughput_gain']:.1f}x)")
+    os.makedirs(os.path.dirname(CASCADE_REPORT), exist_ok=True)
+    with open(CASCADE_REPORT, 'w') as f:
+        json.dump({'band': {'low': low, 'high': None if high == np.inf else high}, 'threshold': OPTIMAL_THRESHOLD,
+                   'model_fingerprint': cascade.model_fingerprint, 'tuning': cascade.tuning, 'timing': timing},
+                  f, indent=2)
+    print(f"✓ Cascade report saved: {CASCADE_REPORT}")
+    
+    # Export the compact serving artifact, verified against the fitted forest
+    compact_meta = export_compact_model(model, vectorizer.to_schema(), OPTIMAL_THRESHOLD, COMPACT_OUT,
+                                        X_check=X, source_path=MODEL_OUT)
+    verification = compact_meta['verification']
+    savings = compaction_savings(compact_meta)
+    print(f"✓ Compact model saved: {COMPACT_OUT} ({compact_meta['n_nodes']} of {compact_meta['source_nodes']} nodes,"
+          f" max |Δp| {verification['max_abs_diff']:.1e} <= {verification['tolerance']:.0e})")
+    try:
+        comparison = compare_artifacts(MODEL_OUT, COMPACT_OUT, X.shape[1])
+        os.makedirs(os.path.dirname(COMPACT_REPORT), exist_ok=True)
+        with open(COMPACT_REPORT, 'w') as f:
+            json.dump({'verification': verification, 'n_nodes': compact_meta['n_nodes'],
+                       'source_nodes': compact_meta['source_nodes'], **savings, **comparison}, f, indent=2)
+        print(f"   Size {comparison['joblib']['size_bytes'] / 1e6:.2f} MB -> {comparison['compact']['size_bytes'] / 1e6:.2f} MB,"
+              f" load {comparison['joblib']['load_ms']:.0f} ms -> {comparison['compact']['load_ms']:.1f} ms,"
+              f" RSS +{comparison['joblib']['rss_delta_mb']:.0f} MB -> +{comparison['compact']['rss_delta_mb']:.1f} MB")
+        print(f"✓ Compact model report saved: {COMPACT_REPORT}")
+    except Exception as e:
+        print(f"⚠ Could not measure load time and RSS: {e}")
+    
     # Save metrics
     metrics = {
         'train_size': len(X_train),
@@ -128,6 +205,16 @@ def main():
         json.dump(metrics, f, indent=2)
     print(f"✓ Metrics saved: {METRICS_OUT}")
     
+    # Publish to the model registry so running scoring APIs hot-swap to it
+    version = ModelRegistry().publish(
+        MODEL_OUT, FEATURE_SCHEMA_PATH, OPTIMAL_THRESHOLD,
+        metrics={k: v for k, v in metrics.items() if k != 'top_features'},
+        model=model,
+        X_check=X,
+        cascade_path=CASCADE_OUT
+    )
+    print(f"✓ Published model version {version}")
+    
     # Save evaluation report
     report_text = f"""# MODEL TRAINING REPORT
 Generated: {pd.Timestamp.now()}
@@ -161,6 +248,14 @@ Generated: {pd.Timestamp.now()}
 - Max Depth: 15
 - Class Weight: balanced
 - Model Path: {MODEL_OUT}
+
+## Scoring Cascade
+- First stage: logistic regression ({CASCADE_OUT})
+- Band: [{low:.4f}, {'-' if high == np.inf else f'{high:.4f}'}) on the first-stage score
+- Band tuned on out-of-fold training scores: recall loss {validation['recall_loss']:.4f} (bound {CASCADE_MAX_RECALL_LOSS})
+- Test traffic per tier: first stage approves {tiers['first_stage_approve']:.1%}, blocks {tiers['first_stage_block']:.1%}, forest {tiers['forest']:.1%}
+- Test recall loss: {evaluation['recall_loss']:.4f}, extra blocks: {evaluation['false_block_rate']:.4f}
+- Batch throughput gain: {timing['batch_throughput_gain']:.1f}x
 """
     
     with open(EVAL_REPORT, 'w') as f:
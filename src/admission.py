@@ -0,0 +1,90 @@
+"""Admission control for model calls: a concurrency limit, a bounded wait queue and a deadline.
+
+Without a limit, an overloaded server queues every request in front of the model
+until clients time out. The controller admits at most ``max_concurrent`` model
+calls at once; further requests wait for a slot, but only while fewer than
+``max_queued`` are already waiting and only until the request's deadline
+(counted from when it arrived). A request that cannot be admitted is shed, and
+the caller answers it with a cheap fallback decision instead.
+
+Limits apply per process; with pre-forked workers each worker has its own.
+"""
+import time
+import threading
+
+# Reasons a request is shed
+SHED_QUEUE_FULL = 'queue_full'
+SHED_DEADLINE = 'deadline'
+SHED_REASONS = (SHED_QUEUE_FULL, SHED_DEADLINE)
+
+
+class AdmissionController:
+    """Thread-safe concurrency limiter with a bounded, deadline-aware wait."""
+
+    def __init__(self, max_concurrent, max_queued=64, deadline=0.25):
+        self.max_concurrent = max_concurrent
+        self.max_queued = max_queued
+        self.deadline = deadline
+        self._slots = threading.BoundedSemaphore(max_concurrent)
+        self._lock = threading.Lock()
+        self._waiting = 0
+        self._in_flight = 0
+        self._admitted = 0
+        self._shed = dict.fromkeys(SHED_REASONS, 0)
+
+    def acquire(self, started):
+        """Wait for a slot until ``started`` (a perf_counter time) plus the deadline.
+
+        Returns None once admitted - pair it with ``release()`` - or the reason
+        the request was shed.
+        """
+        remaining = self.deadline - (time.perf_counter() - started)
+        if remaining <= 0:
+            return self._reject(SHED_DEADLINE)
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                if self._waiting >= self.max_queued:
+                    self._shed[SHED_QUEUE_FULL] += 1
+                    return SHED_QUEUE_FULL
+                self._waiting += 1
+            try:
+                admitted = self._slots.acquire(timeout=remaining)
+            finally:
+                with self._lock:
+                    self._waiting -= 1
+            if not admitted:
+                return self._reject(SHED_DEADLINE)
+        with self._lock:
+            self._in_flight += 1
+            self._admitted += 1
+        return None
+
+    def release(self):
+        with self._lock:
+            self._in_flight -= 1
+        self._slots.release()
+
+    def saturated(self):
+        """True while every slot is taken or requests are waiting (an unlocked, approximate read)."""
+        return self._waiting > 0 or self._in_flight >= self.max_concurrent
+
+    def _reject(self, reason):
+        with self._lock:
+            self._shed[reason] += 1
+        return reason
+
+    def stats(self):
+        """Admission counters of this process for /stats."""
+        with self._lock:
+            shed = sum(self._shed.values())
+            decided = self._admitted + shed
+            return {
+                'max_concurrent': self.max_concurrent,
+                'max_queued': self.max_queued,
+                'deadline_ms': self.deadline * 1000,
+                'in_flight': self._in_flight,
+                'waiting': self._waiting,
+                'admitted': self._admitted,
+                'shed': dict(self._shed),
+                'shed_rate': shed / decided if decided else 0.0
+            }
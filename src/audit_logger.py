@@ -0,0 +1,282 @@
+"""Asynchronous group-commit audit logger for scoring decisions.
+
+Requests hand their audit records to a bounded in-memory queue and return
+immediately. A background writer serializes the records and appends them to the
+JSON-lines log in batches, flushing when a batch is full or when the flush
+interval expires, so request latency is no longer tied to the filesystem.
+
+The log is a single append-only file by default; any sink with the same
+``write``/``sync``/``close`` methods can replace it, such as the rotating,
+indexed segments of src/audit_segments.py or the size-rotated ``RotatingFile``
+the trace exporter (src/tracing.py) writes through.
+"""
+import os
+import json
+import queue
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+# fsync policies: never (leave it to the OS), batch (after every group commit),
+# interval (at most once every fsync_interval seconds)
+FSYNC_POLICIES = ('never', 'batch', 'interval')
+
+_STOP = object()
+
+
+class AppendFile:
+    """Single append-only JSON-lines file."""
+
+    def __init__(self, path):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # O_APPEND makes every group commit a single atomic append, even with several writers
+        self._fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+
+    def write(self, payload, records):
+        view = memoryview(payload)
+        while view:
+            view = view[os.write(self._fd, view):]
+
+    def sync(self):
+        os.fsync(self._fd)
+
+    def close(self):
+        os.close(self._fd)
+
+    def stats(self):
+        return {'path': self.path}
+
+
+class RotatingFile:
+    """Append-only file rotated to ``path.1`` .. ``path.<backups>`` once it exceeds ``max_bytes``.
+
+    Rotation renames files under the writer, so only one process may write a given path.
+    """
+
+    def __init__(self, path, max_bytes=10 * 1024 * 1024, backups=5):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._file = open(path, 'ab')
+        self._size = self._file.tell()
+        self._rotations = 0
+
+    def write(self, payload, records):
+        if self._size and self._size + len(payload) > self.max_bytes:
+            self._rotate()
+        self._file.write(payload)
+        self._file.flush()
+        self._size += len(payload)
+
+    def _rotate(self):
+        self._file.close()
+        if self.backups > 0:
+            for i in range(self.backups - 1, 0, -1):
+                if os.path.exists(f"{self.path}.{i}"):
+                    os.replace(f"{self.path}.{i}", f"{self.path}.{i + 1}")
+            os.replace(self.path, f"{self.path}.1")
+        self._file = open(self.path, 'wb')
+        self._size = 0
+        self._rotations += 1
+
+    def sync(self):
+        os.fsync(self._file.fileno())
+
+    def close(self):
+        self._file.close()
+
+    def stats(self):
+        return {'path': self.path, 'max_bytes': self.max_bytes, 'backups': self.backups,
+                'rotations': self._rotations}
+
+
+def json_lines(batch):
+    """Default batch encoding: one JSON object per record and line."""
+    return ''.join(json.dumps(record, default=str) + '\n' for record in batch).encode('utf-8')
+
+
+class AuditLogger:
+    """Bounded-queue background writer for JSON-lines audit records.
+
+    ``encode`` turns each group commit into the bytes handed to the sink (JSON lines by
+    default) and ``name`` labels the writer thread and its log messages.
+    """
+
+    def __init__(self, path=None, max_queue=10000, batch_size=256, flush_interval=0.05,
+                 fsync='interval', fsync_interval=1.0, block_timeout=0.0, writer=None,
+                 encode=json_lines, name='audit-logger'):
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError(f"fsync must be one of {FSYNC_POLICIES}, got {fsync!r}")
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.fsync = fsync
+        self.fsync_interval = fsync_interval
+        self.block_timeout = block_timeout
+        self.encode = encode
+        self.name = name
+
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._lock = threading.Lock()
+        self._written = 0
+        self._batches = 0
+        self._dropped = 0
+        self._backpressure_waits = 0
+        self._write_errors = 0
+        self._last_fsync = time.monotonic()
+        self._closed = False
+
+        # Where group commits go: ``path`` as one append-only file unless another sink is given
+        self.writer = writer if writer is not None else AppendFile(path)
+
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def submit(self, record):
+        """Queue a record for writing. Returns False if it had to be dropped."""
+        # Under the lock, so no record can be queued behind close()'s stop marker
+        with self._lock:
+            closed = self._closed
+            if not closed:
+                try:
+                    self._queue.put_nowait(record)
+                    return True
+                except queue.Full:
+                    pass
+        if closed:
+            return self._drop()
+        if self.block_timeout > 0:
+            # Apply backpressure to the caller before giving up on the record
+            with self._lock:
+                self._backpressure_waits += 1
+            try:
+                # Not under the lock, which the writer needs to make room; close() counts a
+                # record that lands behind its stop marker as dropped
+                self._queue.put(record, timeout=self.block_timeout)
+                return True
+            except queue.Full:
+                pass
+        return self._drop()
+
+    def _drop(self, n=1):
+        with self._lock:
+            self._dropped += n
+            dropped = self._dropped
+        if dropped == n or dropped // 1000 > (dropped - n) // 1000:
+            logger.warning(f"{self.name} queue full or closed: {dropped} records dropped so far")
+        return False
+
+    def flush(self, timeout=5.0):
+        """Block until every record queued before this call has been written."""
+        if self._closed:
+            return True
+        done = threading.Event()
+        try:
+            self._queue.put(done, timeout=timeout)
+        except queue.Full:
+            return False
+        return done.wait(timeout)
+
+    def close(self, timeout=5.0):
+        """Flush outstanding records and stop the writer thread.
+
+        Records still queued once the writer has stopped are counted as dropped.
+        """
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+        self._queue.put(_STOP)
+        self._thread.join(timeout)
+        if not self._thread.is_alive():
+            unwritten = 0
+            while True:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if isinstance(item, threading.Event):
+                    item.set()
+                elif item is not _STOP:
+                    unwritten += 1
+            if unwritten:
+                self._drop(unwritten)
+        self.writer.close()
+
+    def stats(self):
+        """Return writer counters for monitoring endpoints."""
+        with self._lock:
+            return {
+                'queued': self._queue.qsize(),
+                'written': self._written,
+                'batches': self._batches,
+                'dropped': self._dropped,
+                'backpressure_waits': self._backpressure_waits,
+                'write_errors': self._write_errors,
+                'fsync': self.fsync,
+                'sink': self.writer.stats()
+            }
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            batch, waiters, stop = [], [], False
+            deadline = time.monotonic() + self.flush_interval
+            # Group commit: collect until the batch is full or the flush interval expires
+            while True:
+                if item is _STOP:
+                    stop = True
+                elif isinstance(item, threading.Event):
+                    waiters.append(item)
+                else:
+                    batch.append(item)
+                if stop or waiters or len(batch) >= self.batch_size:
+                    break
+                remaining = deadline - time.monotonic()
+                try:
+                    item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+            if stop:
+                # Drain whatever was queued ahead of shutdown
+                while True:
+                    try:
+                        item = self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if isinstance(item, threading.Event):
+                        waiters.append(item)
+                    elif item is not _STOP:
+                        batch.append(item)
+            self._write(batch, force_sync=stop)
+            for waiter in waiters:
+                waiter.set()
+            if stop:
+                return
+
+    def _write(self, batch, force_sync=False):
+        if not batch:
+            return
+        try:
+            payload = self.encode(batch)
+            self.writer.write(payload, batch)
+            now = time.monotonic()
+            if (self.fsync == 'batch' or force_sync and self.fsync != 'never'
+                    or self.fsync == 'interval' and now - self._last_fsync >= self.fsync_interval):
+                self.writer.sync()
+                self._last_fsync = now
+            with self._lock:
+                self._written += len(batch)
+                self._batches += 1
+        except Exception as e:
+            with self._lock:
+                self._write_errors += 1
+            logger.error(f"{self.name} write failed ({len(batch)} records lost): {e}")
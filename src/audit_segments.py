@@ -0,0 +1,443 @@
+"""Rotating, compressed audit log segments with per-segment indexes.
+
+Instead of one ever-growing JSON-lines file, the audit writer appends to an
+active segment and seals it once it reaches ``max_bytes`` or ``max_age``
+seconds. Sealing gzips the segment in the background and writes a small index
+next to it. Old segments are deleted once the sealed ones exceed
+``retention_bytes`` on disk or are older than ``retention_age``. Each
+writing process (pre-forked worker) has its own active segment, named with
+its pid::
+
+    reports/audit/
+        audit-20260221T103045-4121-0003.jsonl       active segment
+        audit-20260221T093012-4121-0002.jsonl.gz    sealed segment
+        audit-20260221T093012-4121-0002.idx.json    its index
+
+An index records the segment's first and last timestamp, its record and
+decision counts, its transaction_id range, its sequence number range and its
+raw and compressed sizes. ``AuditReader`` reads only these indexes to find
+the segments overlapping a time range (or holding decisions after a sequence
+number), and opens only those. Scan time therefore follows the window
+queried, not the total history. Active segments have no index yet and are
+always read.
+
+A worker that dies without closing its writer leaves its active segment
+behind. ``SegmentedLog.recover`` runs when a writer starts: it seals and
+indexes the active segments of processes that no longer exist, then applies
+retention, so crashed workers' records are neither lost nor kept forever.
+"""
+import os
+import json
+import gzip
+import time
+import shutil
+import threading
+import logging
+from datetime import datetime, timedelta, timezone
+
+logger = logging.getLogger(__name__)
+
+AUDIT_DIR = 'reports/audit'
+SEGMENT_PREFIX = 'audit'
+ACTIVE_SUFFIX = '.jsonl'
+SEALED_SUFFIX = '.jsonl.gz'
+INDEX_SUFFIX = '.idx.json'
+
+
+def iter_decisions(record, features=False):
+    """Yield one dict per scored transaction of an audit record (rejected rows are skipped).
+
+    Keys: timestamp, seq, transaction_id, fraud_probability, decision, model_version,
+    plus the transaction's ``features`` dict when ``features`` is set.
+    """
+    if not isinstance(record, dict):
+        return
+    timestamp = record.get('timestamp')
+    model_version = record.get('model_version')
+    first_seq = record.get('first_seq')
+    if 'predictions' in record:
+        for i, prediction in enumerate(record['predictions']):
+            if 'decision' not in prediction or 'fraud_probability' not in prediction:
+                continue
+            decision = {
+                'timestamp': timestamp,
+                'seq': first_seq + i if first_seq is not None else None,
+                'transaction_id': prediction.get('transaction_id'),
+                'fraud_probability': prediction['fraud_probability'],
+                'decision': prediction['decision'],
+                'model_version': model_version
+            }
+            if features:
+                decision['features'] = prediction.get('features')
+            yield decision
+    elif 'scores' in record:
+        # Columnar batch: parallel lists over the valid rows, columns over all rows
+        scores = record['scores']
+        columns = record.get('columns', {})
+        ids = columns.get('transaction_id')
+        for i, (row, probability, label) in enumerate(zip(scores['row'], scores['fraud_probability'],
+                                                          scores['decision'])):
+            decision = {
+                'timestamp': timestamp,
+                'seq': first_seq + i if first_seq is not None else None,
+                'transaction_id': ids[row] if ids is not None else None,
+                'fraud_probability': probability,
+                'decision': label,
+                'model_version': model_version
+            }
+            if features:
+                decision['features'] = {name: values[row] for name, values in columns.items()}
+            yield decision
+    elif 'decision' in record and 'fraud_probability' in record:
+        decision = {
+            'timestamp': timestamp,
+            'seq': record.get('seq'),
+            'transaction_id': record.get('transaction_id'),
+            'fraud_probability': record['fraud_probability'],
+            'decision': record['decision'],
+            'model_version': model_version
+        }
+        if features:
+            decision['features'] = record.get('features')
+        yield decision
+
+
+class SegmentIndex:
+    """Summary of one segment, accumulated as records are written."""
+
+    def __init__(self, segment):
+        self.segment = segment
+        self.records = 0
+        self.decisions = 0
+        self.first_timestamp = None
+        self.last_timestamp = None
+        self.transaction_id_min = None
+        self.transaction_id_max = None
+        self.first_seq = None
+        self.last_seq = None
+        self.bytes = 0
+
+    def add(self, records, n_bytes):
+        self.bytes += n_bytes
+        for record in records:
+            self.records += 1
+            timestamp = record.get('timestamp') if isinstance(record, dict) else None
+            if timestamp is not None:
+                if self.first_timestamp is None or timestamp < self.first_timestamp:
+                    self.first_timestamp = timestamp
+                if self.last_timestamp is None or timestamp > self.last_timestamp:
+                    self.last_timestamp = timestamp
+            for decision in iter_decisions(record):
+                self.decisions += 1
+                seq = decision['seq']
+                if seq is not None:
+                    if self.first_seq is None or seq < self.first_seq:
+                        self.first_seq = seq
+                    if self.last_seq is None or seq > self.last_seq:
+                        self.last_seq = seq
+                transaction_id = decision['transaction_id']
+                if transaction_id is not None:
+                    transaction_id = str(transaction_id)
+                    if self.transaction_id_min is None or transaction_id < self.transaction_id_min:
+                        self.transaction_id_min = transaction_id
+                    if self.transaction_id_max is None or transaction_id > self.transaction_id_max:
+                        self.transaction_id_max = transaction_id
+
+    def to_dict(self):
+        return dict(vars(self))
+
+
+def _timestamp(value):
+    """ISO timestamp comparable with the audit records' (naive UTC) timestamps."""
+    if value is None or isinstance(value, str):
+        return value
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value.isoformat()
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        # Alive, owned by another user
+        return True
+    return True
+
+
+def _write_json(path, data):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f)
+    os.replace(tmp_path, path)
+
+
+class SegmentedLog:
+    """Append-only audit sink that rotates, compresses, indexes and expires segments.
+
+    Used from the audit writer's thread only; sealing runs on short-lived background threads.
+    """
+
+    def __init__(self, directory=AUDIT_DIR, max_bytes=64 * 1024 * 1024, max_age=3600.0,
+                 retention_bytes=1024 ** 3, retention_age=30 * 86400.0, prefix=SEGMENT_PREFIX):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.retention_bytes = retention_bytes
+        self.retention_age = retention_age
+        self.prefix = prefix
+        os.makedirs(directory, exist_ok=True)
+
+        self._fd = None
+        self._path = None
+        self._index = None
+        self._opened_at = None
+        self._counter = 0
+        self._sealing = []
+        self._lock = threading.Lock()
+        self._sealed = 0
+        self._expired = 0
+
+    def _open(self):
+        name = f"{self.prefix}-{datetime.utcnow():%Y%m%dT%H%M%S}-{os.getpid()}-{self._counter:04d}"
+        self._counter += 1
+        self._path = os.path.join(self.directory, name + ACTIVE_SUFFIX)
+        self._fd = os.open(self._path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        self._index = SegmentIndex(name + SEALED_SUFFIX)
+        self._opened_at = time.monotonic()
+
+    def write(self, payload, records):
+        """Append an encoded group of records, rotating first if the active segment is full or old."""
+        if self._fd is not None and (self._index.bytes >= self.max_bytes
+                                     or time.monotonic() - self._opened_at >= self.max_age):
+            self.seal()
+        if self._fd is None:
+            self._open()
+        view = memoryview(payload)
+        while view:
+            view = view[os.write(self._fd, view):]
+        self._index.add(records, len(payload))
+
+    def sync(self):
+        if self._fd is not None:
+            os.fsync(self._fd)
+
+    def seal(self):
+        """Close the active segment and compress and index it in the background."""
+        if self._fd is None:
+            return
+        os.fsync(self._fd)
+        os.close(self._fd)
+        path, index = self._path, self._index
+        self._fd = self._path = self._index = None
+        if index.records == 0:
+            os.remove(path)
+            return
+        thread = threading.Thread(target=self._compress, args=(path, index), name='audit-seal', daemon=True)
+        thread.start()
+        self._sealing = [t for t in self._sealing if t.is_alive()] + [thread]
+
+    def recover(self):
+        """Seal orphaned active segments of dead processes and apply retention, in the background."""
+        thread = threading.Thread(target=self._recover, name='audit-recover', daemon=True)
+        thread.start()
+        self._sealing = [t for t in self._sealing if t.is_alive()] + [thread]
+        return thread
+
+    def _recover(self):
+        recovered = 0
+        for name in AuditReader(self.directory, self.prefix)._names():
+            if not name.endswith(ACTIVE_SUFFIX):
+                continue
+            stem, pid = self._owner(name[:-len(ACTIVE_SUFFIX)])
+            if pid is None or pid == os.getpid() or _pid_alive(pid):
+                continue
+            path = os.path.join(self.directory, name)
+            if os.path.exists(os.path.join(self.directory, name[:-len(ACTIVE_SUFFIX)] + INDEX_SUFFIX)):
+                # The writer died after sealing, before removing the raw copy
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                continue
+            # Claim the segment under this process's pid; a concurrent recovery loses the rename
+            claimed = os.path.join(self.directory, f"{stem}-{os.getpid()}-r{recovered:03d}{ACTIVE_SUFFIX}")
+            recovered += 1
+            try:
+                os.rename(path, claimed)
+            except FileNotFoundError:
+                continue
+            index = SegmentIndex(os.path.basename(claimed)[:-len(ACTIVE_SUFFIX)] + SEALED_SUFFIX)
+            with open(claimed, 'rb') as f:
+                for line in f:
+                    try:
+                        index.add([json.loads(line)], len(line))
+                    except ValueError:
+                        # A record torn by the crash: kept in the segment, not indexed
+                        index.bytes += len(line)
+            if index.records == 0:
+                os.remove(claimed)
+                continue
+            logger.info(f"Recovering orphaned audit segment {name} ({index.records} records)")
+            self._compress(claimed, index, retention=False)
+        self.apply_retention()
+
+    def _owner(self, stem):
+        """Split a segment stem into its ``prefix-timestamp`` part and the writer's pid."""
+        parts = stem.rsplit('-', 2)
+        if len(parts) != 3 or not parts[0].startswith(self.prefix + '-') or not parts[1].isdigit():
+            return stem, None
+        return parts[0], int(parts[1])
+
+    def close(self, timeout=30.0):
+        """Seal the active segment and wait for pending compressions."""
+        self.seal()
+        for thread in self._sealing:
+            thread.join(timeout)
+
+    def _compress(self, path, index, retention=True):
+        stem = path[:-len(ACTIVE_SUFFIX)]
+        sealed_path = stem + SEALED_SUFFIX
+        try:
+            tmp_path = f"{sealed_path}.tmp"
+            with open(path, 'rb') as src, gzip.open(tmp_path, 'wb', compresslevel=6) as dst:
+                shutil.copyfileobj(src, dst, 1024 * 1024)
+            os.replace(tmp_path, sealed_path)
+            summary = index.to_dict()
+            summary['compressed_bytes'] = os.path.getsize(sealed_path)
+            summary['sealed_at'] = datetime.utcnow().isoformat()
+            # Readers prefer the indexed, compressed copy as soon as the index exists
+            _write_json(stem + INDEX_SUFFIX, summary)
+            os.remove(path)
+            with self._lock:
+                self._sealed += 1
+        except Exception as e:
+            # The raw segment stays in place and is still read as an unindexed segment
+            logger.error(f"Sealing audit segment {path} failed: {e}")
+            return
+        if retention:
+            self.apply_retention()
+
+    def apply_retention(self):
+        """Delete the oldest sealed segments beyond the size or age limit; returns how many."""
+        indexes = AuditReader(self.directory, self.prefix).indexes()
+        cutoff = (datetime.utcnow() - timedelta(seconds=self.retention_age)).isoformat()
+        total = sum(index.get('compressed_bytes', 0) for index in indexes)
+        expired = 0
+        for index in indexes:
+            if total <= self.retention_bytes and (index['last_timestamp'] or '') >= cutoff:
+                break
+            stem = os.path.join(self.directory, index['segment'][:-len(SEALED_SUFFIX)])
+            for path in (stem + SEALED_SUFFIX, stem + INDEX_SUFFIX):
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    # Another worker expired it first
+                    pass
+            total -= index.get('compressed_bytes', 0)
+            expired += 1
+        if expired:
+            with self._lock:
+                self._expired += expired
+            logger.info(f"Audit retention: deleted {expired} segments")
+        return expired
+
+    def stats(self):
+        with self._lock:
+            return {
+                'directory': self.directory,
+                'active_segment': os.path.basename(self._path) if self._path else None,
+                'active_bytes': self._index.bytes if self._index else 0,
+                'sealed': self._sealed,
+                'expired': self._expired
+            }
+
+
+class AuditReader:
+    """Read audit records by time range or sequence number, opening only the segments that can match."""
+
+    def __init__(self, directory=AUDIT_DIR, prefix=SEGMENT_PREFIX):
+        self.directory = directory
+        self.prefix = prefix
+
+    def _names(self):
+        try:
+            return [name for name in os.listdir(self.directory) if name.startswith(self.prefix + '-')]
+        except FileNotFoundError:
+            return []
+
+    def indexes(self):
+        """Indexes of all sealed segments, oldest first."""
+        indexes = []
+        for name in self._names():
+            if not name.endswith(INDEX_SUFFIX):
+                continue
+            try:
+                with open(os.path.join(self.directory, name), 'r') as f:
+                    indexes.append(json.load(f))
+            except (OSError, ValueError):
+                continue
+        return sorted(indexes, key=lambda index: index['last_timestamp'] or '')
+
+    def segments(self, start=None, end=None, after_seq=None):
+        """Paths of the segments that may hold records in [start, end] or decisions after ``after_seq``."""
+        start, end = _timestamp(start), _timestamp(end)
+        names = self._names()
+        selected = []
+        for index in self.indexes():
+            if start is not None and (index['last_timestamp'] or '') < start:
+                continue
+            if end is not None and (index['first_timestamp'] or '') > end:
+                continue
+            if after_seq is not None and index['last_seq'] is not None and index['last_seq'] <= after_seq:
+                continue
+            selected.append(os.path.join(self.directory, index['segment']))
+        indexed = {name[:-len(INDEX_SUFFIX)] for name in names if name.endswith(INDEX_SUFFIX)}
+        # Active segments, and segments still being sealed, have no index yet
+        selected += sorted(os.path.join(self.directory, name) for name in names
+                           if name.endswith(ACTIVE_SUFFIX) and name[:-len(ACTIVE_SUFFIX)] not in indexed)
+        return selected
+
+    def records(self, start=None, end=None, after_seq=None):
+        """Yield the audit records with a timestamp in [start, end], segment by segment."""
+        start, end = _timestamp(start), _timestamp(end)
+        for path in self.segments(start, end, after_seq):
+            try:
+                f = gzip.open(path, 'rt') if path.endswith('.gz') else open(path, 'r', errors='replace')
+            except FileNotFoundError:
+                # Expired, or sealed, since it was listed
+                continue
+            with f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue
+                    timestamp = record.get('timestamp') if isinstance(record, dict) else None
+                    if start is not None and (timestamp is None or timestamp < start):
+                        continue
+                    if end is not None and (timestamp is None or timestamp > end):
+                        continue
+                    yield record
+
+    def decisions(self, start=None, end=None, after_seq=None, features=False):
+        """Yield the scored transactions (see ``iter_decisions``) in [start, end] with seq > ``after_seq``."""
+        for record in self.records(start, end, after_seq):
+            for decision in iter_decisions(record, features):
+                if after_seq is not None and decision['seq'] is not None and decision['seq'] <= after_seq:
+                    continue
+                yield decision
+
+    def disk_usage(self):
+        """Segment count and bytes on disk."""
+        names = self._names()
+        sizes = []
+        for name in names:
+            if name.endswith(ACTIVE_SUFFIX) or name.endswith(SEALED_SUFFIX):
+                try:
+                    sizes.append(os.path.getsize(os.path.join(self.directory, name)))
+                except FileNotFoundError:
+                    continue
+        return {'segments': len(sizes), 'bytes': sum(sizes)}
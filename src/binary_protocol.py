@@ -0,0 +1,226 @@
+"""Length-prefixed binary frames for scoring over a Unix domain socket.
+
+Co-located callers skip HTTP and JSON entirely: a request is a fixed-layout
+frame of packed float64 feature rows, decoded with ``np.frombuffer``, and the
+answer is a fixed-size record per row. A connection carries any number of
+request/response pairs, answered in order.
+
+Layout (integers little-endian)::
+
+    length      uint32    bytes of the frame that follow
+    version     uint8     PROTOCOL_VERSION
+    kind        uint8     request: SCORE or SCHEMA; response: a status
+    n_rows      uint16
+    request_id  uint32    echoed in the response
+
+    SCORE request     n_rows x (uint64 transaction_id, n_features x float64), features in schema order
+    SCHEMA request    no body
+    OK to SCORE       n_rows x (float64 fraud_probability, uint8 decision, uint8 flags),
+                      then, if any row was rejected, a UTF-8 JSON object {row: error}
+    OK to SCHEMA      UTF-8 JSON: features, categorical labels, threshold, model version
+    any other status  UTF-8 error message
+
+Categorical features are sent as their training code - the label's index in the
+schema's ``categorical`` list, or ``unknown_category_code`` - so callers fetch
+the schema once per connection (or model version) and encode locally. Rejected
+rows answer ``DECISION_INVALID`` with a NaN probability; ``FLAG_DEGRADED`` marks
+rows decided by the fallback rules under overload.
+"""
+import json
+import socket
+import struct
+import numpy as np
+
+PROTOCOL_VERSION = 1
+
+# Request kinds
+SCORE = 1
+SCHEMA = 2
+
+# Response statuses
+STATUS_OK = 0
+STATUS_BAD_REQUEST = 1
+STATUS_OVERLOADED = 2
+STATUS_ERROR = 3
+
+# Per-row decisions and flags
+DECISION_APPROVE = 0
+DECISION_BLOCK = 1
+DECISION_INVALID = 2
+FLAG_DEGRADED = 1
+
+# Largest frame a peer may send; a full 65535-row frame of 8 features is under 5 MB
+MAX_FRAME_BYTES = 16 * 1024 * 1024
+
+_LENGTH = struct.Struct('<I')
+_HEADER = struct.Struct('<BBHI')
+
+RESULT_DTYPE = np.dtype([('fraud_probability', '<f8'), ('decision', 'u1'), ('flags', 'u1')])
+
+
+def row_dtype(n_features):
+    """Structured dtype of one SCORE request row."""
+    return np.dtype([('transaction_id', '<u8'), ('features', '<f8', (n_features,))])
+
+
+def read_frame(sock, max_bytes=MAX_FRAME_BYTES):
+    """Read one frame (without its length prefix); None if the peer closed between frames."""
+    prefix = _recv_exactly(sock, _LENGTH.size, eof_ok=True)
+    if prefix is None:
+        return None
+    (length,) = _LENGTH.unpack(prefix)
+    if length < _HEADER.size or length > max_bytes:
+        raise ValueError(f"Invalid frame length {length}")
+    return _recv_exactly(sock, length)
+
+
+def _recv_exactly(sock, n, eof_ok=False):
+    buffer = bytearray(n)
+    view = memoryview(buffer)
+    received = 0
+    while received < n:
+        count = sock.recv_into(view[received:])
+        if count == 0:
+            if eof_ok and received == 0:
+                return None
+            raise ConnectionError("Connection closed mid-frame")
+        received += count
+    return buffer
+
+
+def _frame(kind, n_rows, request_id, *parts):
+    header = _HEADER.pack(PROTOCOL_VERSION, kind, n_rows, request_id)
+    length = _HEADER.size + sum(len(part) for part in parts)
+    return b''.join((_LENGTH.pack(length), header) + parts)
+
+
+def parse_header(frame):
+    """Return ``(kind, n_rows, request_id, body)`` of a frame read with ``read_frame``."""
+    version, kind, n_rows, request_id = _HEADER.unpack_from(frame)
+    if version != PROTOCOL_VERSION:
+        raise ValueError(f"Unsupported protocol version {version}")
+    return kind, n_rows, request_id, memoryview(frame)[_HEADER.size:]
+
+
+def encode_score_request(X, transaction_ids=None, request_id=0):
+    """Frame an n x n_features matrix of encoded features (and optional uint64 ids) for scoring."""
+    X = np.asarray(X, dtype=np.float64)
+    if X.ndim != 2 or len(X) > 0xFFFF:
+        raise ValueError("Expected a matrix of at most 65535 rows")
+    rows = np.empty(len(X), dtype=row_dtype(X.shape[1]))
+    rows['transaction_id'] = 0 if transaction_ids is None else transaction_ids
+    rows['features'] = X
+    return _frame(SCORE, len(X), request_id, rows.tobytes())
+
+
+def encode_schema_request(request_id=0):
+    return _frame(SCHEMA, 0, request_id)
+
+
+def decode_score_request(n_rows, body, n_features):
+    """Return ``(transaction_ids, X)`` of a SCORE body; ``X`` is a contiguous float64 copy."""
+    dtype = row_dtype(n_features)
+    if len(body) != n_rows * dtype.itemsize:
+        raise ValueError(f"Expected {n_rows} rows of {n_features} features ({n_rows * dtype.itemsize} bytes),"
+                         f" got {len(body)} bytes")
+    rows = np.frombuffer(body, dtype=dtype, count=n_rows)
+    return rows['transaction_id'], np.ascontiguousarray(rows['features'])
+
+
+def encode_score_response(request_id, probabilities, decisions, flags, errors=None):
+    """Frame per-row results; ``errors`` maps rejected row positions to messages."""
+    results = np.empty(len(probabilities), dtype=RESULT_DTYPE)
+    results['fraud_probability'] = probabilities
+    results['decision'] = decisions
+    results['flags'] = flags
+    tail = json.dumps({str(position): message for position, message in errors.items()}).encode() if errors else b''
+    return _frame(STATUS_OK, len(results), request_id, results.tobytes(), tail)
+
+
+def encode_json_response(request_id, body):
+    return _frame(STATUS_OK, 0, request_id, json.dumps(body).encode())
+
+
+def encode_error_response(request_id, status, message):
+    return _frame(status, 0, request_id, str(message).encode())
+
+
+def decode_score_response(n_rows, body):
+    """Return ``(results, errors)``: a RESULT_DTYPE array and a dict of row position to message."""
+    size = n_rows * RESULT_DTYPE.itemsize
+    results = np.frombuffer(body, dtype=RESULT_DTYPE, count=n_rows)
+    tail = bytes(body[size:])
+    errors = {int(position): message for position, message in json.loads(tail).items()} if tail else {}
+    return results, errors
+
+
+class BinaryProtocolError(Exception):
+    """The server answered a request with a non-OK status."""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class BinaryScoringClient:
+    """Blocking client for co-located callers; one connection, one request at a time."""
+
+    def __init__(self, path):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.connect(path)
+        self._request_id = 0
+        self._schema = None
+
+    def _call(self, frame):
+        self.sock.sendall(frame)
+        response = read_frame(self.sock)
+        if response is None:
+            raise ConnectionError("Server closed the connection")
+        status, n_rows, request_id, body = parse_header(response)
+        if request_id != self._request_id:
+            raise BinaryProtocolError(STATUS_ERROR, f"Response to request {request_id}, expected {self._request_id}")
+        if status != STATUS_OK:
+            raise BinaryProtocolError(status, bytes(body).decode())
+        return n_rows, body
+
+    def _next_id(self):
+        self._request_id = (self._request_id + 1) & 0xFFFFFFFF
+        return self._request_id
+
+    def schema(self):
+        """The serving schema, threshold and model version; cached until ``refresh_schema``."""
+        if self._schema is None:
+            self.refresh_schema()
+        return self._schema
+
+    def refresh_schema(self):
+        _, body = self._call(encode_schema_request(self._next_id()))
+        self._schema = json.loads(bytes(body))
+        return self._schema
+
+    def encode(self, records):
+        """Encode transaction dicts into the float64 matrix a SCORE request carries."""
+        schema = self.schema()
+        codes = {name: {label: code for code, label in enumerate(classes)}
+                 for name, classes in schema['categorical'].items()}
+        unknown = schema['unknown_category_code']
+        X = np.empty((len(records), len(schema['features'])), dtype=np.float64)
+        for row, record in enumerate(records):
+            for i, name in enumerate(schema['features']):
+                value = record[name]
+                X[row, i] = codes[name].get(value, unknown) if name in codes else value
+        return X
+
+    def score(self, X, transaction_ids=None):
+        """Score encoded rows; returns ``(results, errors)`` as ``decode_score_response`` does."""
+        n_rows, body = self._call(encode_score_request(X, transaction_ids, self._next_id()))
+        return decode_score_response(n_rows, body)
+
+    def close(self):
+        self.sock.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
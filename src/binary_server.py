@@ -0,0 +1,88 @@
+"""Unix-domain-socket listener answering binary scoring frames (see src/binary_protocol.py).
+
+Callers on the same host skip TCP, HTTP parsing and JSON: each connection is
+served by its own thread, which reads a frame, hands it to the
+``ScoringService`` shared with the HTTP app - same model version, threshold,
+counters and audit trail - and writes the response frame back.
+
+The socket is bound once (``bind_unix_socket``) and may be inherited by
+pre-forked workers, which then each accept on it like on the HTTP listener.
+"""
+import os
+import socket
+import logging
+import threading
+
+from src.binary_protocol import read_frame, MAX_FRAME_BYTES
+
+logger = logging.getLogger(__name__)
+
+# Pending connections the kernel queues before accept
+LISTEN_BACKLOG = 512
+
+
+def bind_unix_socket(path, mode=0o660):
+    """Bind and listen on ``path``, replacing a stale socket file left by a previous run."""
+    if os.path.exists(path):
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(path)
+        except (ConnectionRefusedError, FileNotFoundError):
+            os.unlink(path)
+        else:
+            raise OSError(f"Another server is listening on {path}")
+        finally:
+            probe.close()
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.bind(path)
+    # Only the service's user and group may connect
+    os.chmod(path, mode)
+    sock.listen(LISTEN_BACKLOG)
+    sock.set_inheritable(True)
+    return sock
+
+
+class BinaryScoringServer:
+    """Accept connections on a bound Unix socket and answer their frames with ``service.predict_binary``."""
+
+    def __init__(self, service, sock, max_frame_bytes=MAX_FRAME_BYTES):
+        self.service = service
+        self.socket = sock
+        self.max_frame_bytes = max_frame_bytes
+        self._thread = None
+
+    def start(self):
+        """Accept in a background daemon thread."""
+        self._thread = threading.Thread(target=self.serve_forever, name='binary-accept', daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self):
+        while True:
+            try:
+                conn, _ = self.socket.accept()
+            except OSError:
+                # The listening socket was shut down
+                return
+            threading.Thread(target=self._serve_connection, args=(conn,), name='binary-conn', daemon=True).start()
+
+    def _serve_connection(self, conn):
+        predict = self.service.predict_binary
+        with conn:
+            try:
+                while True:
+                    frame = read_frame(conn, self.max_frame_bytes)
+                    if frame is None:
+                        return
+                    conn.sendall(predict(frame))
+            except (ValueError, OSError) as e:
+                # A bad length prefix or a dropped peer: the stream cannot be resynchronized
+                logger.warning(f"Closing binary connection: {e}")
+
+    def close(self):
+        """Stop accepting; connections already open finish their current frame."""
+        try:
+            self.socket.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self.socket.close()
@@ -0,0 +1,314 @@
+"""Two-tier scoring cascade: a cheap linear first stage in front of the forest.
+
+Most transactions are obviously legitimate, yet each one pays for every tree of
+the forest. The cascade scores each row with a logistic regression first (one
+dot product) and settles it there when the score is confidently low or high:
+
+* ``score < low``         - approved without the forest
+* ``low <= score < high`` - the uncertain band, scored by the forest
+* ``score >= high``       - blocked without the forest
+
+The first stage is fitted by scripts/train.py (and scripts/retrain_model.py)
+alongside the forest, on the same feature rows, and stored as a small JSON
+artifact with the standardization folded into its weights, so serving needs
+neither sklearn nor a scaler. The band is tuned offline on out-of-fold scores of
+the training rows: it settles as many rows as possible while the recall lost
+against the forest alone stays within ``max_recall_loss`` and the legitimate
+transactions newly blocked stay within ``max_false_block_rate``. The tuned band
+is then evaluated once on the untouched test split (see ``train_cascade``). For a
+forest that is already trained, ``fit_cascade`` tunes the band on that forest's
+scores of held-out rows instead (scripts/fit_cascade.py).
+
+The band only holds for the forest it was tuned against, so the artifact records
+the SHA-256 of that forest's joblib file and ``Cascade.load`` refuses it for any
+other model.
+
+Like early-exited rows, settled rows report their first-stage probability
+clipped to the settled side of the decision threshold, and count 0 trees
+evaluated.
+"""
+import json
+import time
+import logging
+import numpy as np
+
+from src.forest_engine import model_fingerprint
+
+logger = logging.getLogger(__name__)
+
+# Tuning bounds: recall lost vs the forest alone (fraction of all frauds), and legitimate
+# transactions blocked by the first stage that the forest would approve (fraction of all legitimate)
+MAX_RECALL_LOSS = 0.01
+MAX_FALSE_BLOCK_RATE = 0.001
+
+# Candidate band edges: this many quantiles of the first-stage scores
+BAND_GRID = 100
+
+
+class FirstStage:
+    """Logistic regression over raw feature rows: ``sigmoid(X @ weights + intercept)``."""
+
+    def __init__(self, features, weights, intercept):
+        self.features = list(features)
+        self.weights = np.asarray(weights, dtype=np.float64)
+        self.intercept = float(intercept)
+
+    @classmethod
+    def fit(cls, X, y, features):
+        """Fit a class-balanced logistic regression on standardized features and fold the scaling in."""
+        # Imported here: serving only evaluates the folded weights
+        from sklearn.linear_model import LogisticRegression
+        from sklearn.preprocessing import StandardScaler
+        X = np.asarray(X, dtype=np.float64)
+        scaler = StandardScaler().fit(X)
+        model = LogisticRegression(class_weight='balanced', max_iter=1000).fit(scaler.transform(X), y)
+        coef = model.coef_[0] / scaler.scale_
+        intercept = model.intercept_[0] - float(np.dot(coef, scaler.mean_))
+        return cls(features, coef, intercept)
+
+    def predict_proba(self, X):
+        z = X @ self.weights + self.intercept
+        # Clipped so saturated rows do not overflow exp
+        return 1.0 / (1.0 + np.exp(-np.clip(z, -50.0, 50.0)))
+
+
+def cascade_decisions(stage_probabilities, forest_blocked, low, high):
+    """Blocked mask of the cascade given each tier's scores."""
+    return (stage_probabilities >= high) | ((stage_probabilities >= low) & forest_blocked)
+
+
+def tune_band(stage_probabilities, forest_probabilities, y, threshold, max_recall_loss=MAX_RECALL_LOSS,
+              max_false_block_rate=MAX_FALSE_BLOCK_RATE, grid=BAND_GRID):
+    """Choose ``(low, high)`` settling the most rows within both bounds, measured on labelled held-out rows.
+
+    Returns the band and its evaluation (see ``evaluate_band``).
+    """
+    stage_probabilities = np.asarray(stage_probabilities, dtype=np.float64)
+    forest_blocked = np.asarray(forest_probabilities) >= threshold
+    y = np.asarray(y).astype(bool)
+    edges = np.unique(np.quantile(stage_probabilities, np.linspace(0, 1, grid + 1)))
+    lows = np.concatenate([[0.0], edges])
+    highs = np.concatenate([edges, [np.inf]])
+
+    best = None
+    for low in lows:
+        for high in highs[highs >= low]:
+            evaluation = evaluate_band(stage_probabilities, forest_blocked, y, low, high)
+            if (evaluation['recall_loss'] > max_recall_loss
+                    or evaluation['false_block_rate'] > max_false_block_rate):
+                continue
+            key = (evaluation['settled_fraction'], -evaluation['recall_loss'])
+            if best is None or key > best[0]:
+                best = (key, low, high, evaluation)
+    # (0, inf) settles nothing and loses nothing, so a band always qualifies
+    _, low, high, evaluation = best
+    return float(low), float(high), evaluation
+
+
+def evaluate_band(stage_probabilities, forest_blocked, y, low, high):
+    """Share of rows per tier, and recall and false blocks of the cascade vs the forest alone."""
+    n = len(stage_probabilities)
+    settled_approve = stage_probabilities < low
+    settled_block = stage_probabilities >= high
+    blocked = cascade_decisions(stage_probabilities, forest_blocked, low, high)
+    n_fraud = max(int(np.count_nonzero(y)), 1)
+    n_legit = max(n - int(np.count_nonzero(y)), 1)
+    forest_recall = np.count_nonzero(forest_blocked & y) / n_fraud
+    cascade_recall = np.count_nonzero(blocked & y) / n_fraud
+    return {
+        'rows': n,
+        'settled_fraction': float(np.count_nonzero(settled_approve | settled_block) / n),
+        'tiers': {
+            'first_stage_approve': float(np.count_nonzero(settled_approve) / n),
+            'first_stage_block': float(np.count_nonzero(settled_block) / n),
+            'forest': float(np.count_nonzero(~settled_approve & ~settled_block) / n)
+        },
+        'forest_recall': float(forest_recall),
+        'cascade_recall': float(cascade_recall),
+        'recall_loss': float(forest_recall - cascade_recall),
+        'false_block_rate': float(np.count_nonzero(blocked & ~forest_blocked & ~y) / n_legit),
+        'decision_agreement': float(np.count_nonzero(blocked == forest_blocked) / n)
+    }
+
+
+def out_of_fold_scores(X, y, features, estimators, folds):
+    """First-stage and forest probabilities of every row from models that did not see it.
+
+    ``estimators`` and ``folds`` come from ``cross_validate(..., return_estimator=True,
+    return_indices=True)``: each fold's forest scores its held-out rows, and a first
+    stage fitted on the same fold's training rows scores them too.
+    """
+    X = np.asarray(X, dtype=np.float64)
+    y = np.asarray(y)
+    stage_probabilities = np.empty(len(X))
+    forest_probabilities = np.empty(len(X))
+    for estimator, train_idx, test_idx in zip(estimators, folds['train'], folds['test']):
+        stage = FirstStage.fit(X[train_idx], y[train_idx], features)
+        stage_probabilities[test_idx] = stage.predict_proba(X[test_idx])
+        forest_probabilities[test_idx] = estimator.predict_proba(X[test_idx])[:, 1]
+    return stage_probabilities, forest_probabilities
+
+
+def train_cascade(X_train, y_train, X_test, y_test, forest_test_probabilities, features, estimators, folds,
+                  threshold, max_recall_loss=MAX_RECALL_LOSS, max_false_block_rate=MAX_FALSE_BLOCK_RATE):
+    """Fit the first stage on the training rows, tune its band out-of-fold and evaluate it on test.
+
+    ``estimators`` and ``folds`` are the cross-validation forests and indices over
+    ``X_train`` (see ``out_of_fold_scores``); ``forest_test_probabilities`` are the
+    final forest's scores of ``X_test``. The test split plays no part in choosing the
+    band, so its evaluation (``tuning['test']``) is an unbiased estimate.
+    """
+    stage_oof, forest_oof = out_of_fold_scores(X_train, y_train, features, estimators, folds)
+    low, high, validation = tune_band(stage_oof, forest_oof, y_train, threshold, max_recall_loss,
+                                      max_false_block_rate)
+    stage = FirstStage.fit(X_train, y_train, features)
+    test = evaluate_band(stage.predict_proba(np.asarray(X_test, dtype=np.float64)),
+                         np.asarray(forest_test_probabilities) >= threshold, np.asarray(y_test).astype(bool),
+                         low, high)
+    return Cascade(stage, low, high, threshold, tuning={
+        'max_recall_loss': max_recall_loss,
+        'max_false_block_rate': max_false_block_rate,
+        'validation': dict(validation, rows_from='out-of-fold training rows'),
+        'test': test
+    })
+
+
+def fit_cascade(X_train, y_train, X_holdout, y_holdout, forest_holdout_probabilities, features, threshold,
+                max_recall_loss=MAX_RECALL_LOSS, max_false_block_rate=MAX_FALSE_BLOCK_RATE, random_state=42):
+    """Fit the first stage for an already-trained forest and tune its band on held-out rows.
+
+    The forest has memorized its own training rows, so its scores of them say little
+    about how it routes new traffic. ``X_holdout`` are rows the forest never saw and
+    ``forest_holdout_probabilities`` its scores of them: they are split into two
+    stratified halves, the band is tuned on one (``tuning['validation']``) and
+    evaluated on the other (``tuning['test']``).
+    """
+    # Imported here: serving only evaluates the folded weights
+    from sklearn.model_selection import train_test_split
+    X_holdout = np.asarray(X_holdout, dtype=np.float64)
+    y_holdout = np.asarray(y_holdout).astype(bool)
+    forest_holdout_probabilities = np.asarray(forest_holdout_probabilities, dtype=np.float64)
+    tune_idx, test_idx = train_test_split(np.arange(len(X_holdout)), test_size=0.5, stratify=y_holdout,
+                                          random_state=random_state)
+
+    stage = FirstStage.fit(X_train, y_train, features)
+    stage_probabilities = stage.predict_proba(X_holdout)
+    forest_blocked = forest_holdout_probabilities >= threshold
+    low, high, validation = tune_band(stage_probabilities[tune_idx], forest_holdout_probabilities[tune_idx],
+                                      y_holdout[tune_idx], threshold, max_recall_loss, max_false_block_rate)
+    test = evaluate_band(stage_probabilities[test_idx], forest_blocked[test_idx], y_holdout[test_idx], low, high)
+    return Cascade(stage, low, high, threshold, tuning={
+        'max_recall_loss': max_recall_loss,
+        'max_false_block_rate': max_false_block_rate,
+        'validation': dict(validation, rows_from='held-out rows, tuning half'),
+        'test': dict(test, rows_from='held-out rows, evaluation half')
+    })
+
+
+class Cascade:
+    """First stage plus the tuned band; routes the uncertain rows of a matrix to the forest."""
+
+    def __init__(self, stage, low, high, threshold, tuning=None, model_fingerprint=None):
+        self.stage = stage
+        self.low = low
+        self.high = high
+        # The decision threshold the band was tuned for
+        self.threshold = threshold
+        self.tuning = tuning or {}
+        # SHA-256 of the forest's joblib file the band was tuned against (see forest_engine.model_fingerprint)
+        self.model_fingerprint = model_fingerprint
+
+    def score(self, X, score_forest, threshold):
+        """Return ``(probabilities, trees_evaluated)``; ``score_forest(X)`` scores the uncertain rows."""
+        p = self.stage.predict_proba(X)
+        approve = p < self.low
+        block = p >= self.high
+        uncertain = ~(approve | block)
+        probabilities = np.where(approve, np.minimum(p, np.nextafter(threshold, 0)), np.maximum(p, threshold))
+        trees = np.zeros(len(X), dtype=np.int64)
+        if uncertain.all():
+            return score_forest(X)
+        if uncertain.any():
+            probabilities[uncertain], trees[uncertain] = score_forest(X[uncertain])
+        return probabilities, trees
+
+    def to_dict(self):
+        return {
+            'features': self.stage.features,
+            'weights': self.stage.weights.tolist(),
+            'intercept': self.stage.intercept,
+            'low': self.low,
+            # JSON has no infinity: None means no rows are blocked by the first stage
+            'high': None if np.isinf(self.high) else self.high,
+            'threshold': self.threshold,
+            'model_fingerprint': self.model_fingerprint,
+            'tuning': self.tuning
+        }
+
+    def save(self, path, model_path=None):
+        """Write the artifact; ``model_path`` is the saved forest it belongs to, whose fingerprint is recorded."""
+        if model_path is not None:
+            self.model_fingerprint = model_fingerprint(model_path)
+        with open(path, 'w') as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+    @classmethod
+    def load(cls, path, features=None, model_fingerprint=None):
+        """Load a cascade artifact, refusing it unless it matches the serving model.
+
+        ``features`` is the serving schema's column order and ``model_fingerprint``
+        the serving forest's fingerprint; either must match what the artifact records.
+        """
+        with open(path, 'r') as f:
+            data = json.load(f)
+        if features is not None and data['features'] != list(features):
+            raise ValueError(f"Cascade feature order {data['features']} does not match schema {list(features)}")
+        if model_fingerprint is not None and data.get('model_fingerprint') != model_fingerprint:
+            raise ValueError(f"Cascade {path} was tuned for model {data.get('model_fingerprint') or 'unknown'},"
+                             f" not {model_fingerprint}")
+        stage = FirstStage(data['features'], data['weights'], data['intercept'])
+        high = np.inf if data['high'] is None else data['high']
+        return cls(stage, data['low'], high, data['threshold'], data.get('tuning'), data.get('model_fingerprint'))
+
+    def stats(self):
+        return {
+            'low': self.low,
+            'high': None if np.isinf(self.high) else self.high,
+            'tuned_threshold': self.threshold,
+            'model_fingerprint': self.model_fingerprint,
+            'tuning': self.tuning
+        }
+
+
+def benchmark(cascade, score_forest, X, threshold, single_rows=500, batch_repeats=20):
+    """Time forest-only vs cascade scoring: single-row latency percentiles and batch throughput."""
+    X = np.ascontiguousarray(X, dtype=np.float64)
+
+    def single(score):
+        latencies = []
+        for row in X[:single_rows]:
+            row = row[np.newaxis, :]
+            start = time.perf_counter()
+            score(row)
+            latencies.append(time.perf_counter() - start)
+        latencies = np.asarray(latencies) * 1000
+        return {'p50_ms': float(np.percentile(latencies, 50)), 'p99_ms': float(np.percentile(latencies, 99))}
+
+    def batch(score):
+        score(X)
+        start = time.perf_counter()
+        for _ in range(batch_repeats):
+            score(X)
+        return {'rows_per_s': float(len(X) * batch_repeats / (time.perf_counter() - start))}
+
+    def cascaded(rows):
+        return cascade.score(rows, score_forest, threshold)
+
+    forest = {'single': single(score_forest), 'batch': batch(score_forest)}
+    tiered = {'single': single(cascaded), 'batch': batch(cascaded)}
+    return {
+        'forest': forest,
+        'cascade': tiered,
+        'single_row_speedup_p50': forest['single']['p50_ms'] / tiered['single']['p50_ms'],
+        'batch_throughput_gain': tiered['batch']['rows_per_s'] / forest['batch']['rows_per_s']
+    }
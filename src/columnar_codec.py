@@ -0,0 +1,126 @@
+"""Typed-column binary framing for bulk scoring requests and responses.
+
+A frame carries a table as whole columns instead of one JSON object per row, so
+the server decodes it with ``np.frombuffer`` and never builds per-row dicts.
+
+Layout (integers little-endian)::
+
+    magic       4 bytes   b'FRC1'
+    meta_len    uint32    length of the JSON metadata block
+    metadata    UTF-8     {"n_rows": N, "columns": [{"name", "dtype", ...}, ...], ...}
+    column data           one buffer per column, in metadata order, each padded to 8 bytes
+
+Numeric columns are raw arrays of their NumPy dtype string (``'<f8'``, ``'<i4'``,
+``'|u1'`` ...). String columns have dtype ``'dict'``: the metadata lists the
+distinct values under ``"dictionary"`` and the data is an ``'<i4'`` index array
+into it, with -1 for nulls. Extra metadata keys are passed through untouched.
+"""
+import json
+import struct
+from collections import namedtuple
+import numpy as np
+
+CONTENT_TYPE = 'application/vnd.fraud-columns'
+MAGIC = b'FRC1'
+
+# Dictionary-encoded string column: ``dictionary[indices]`` are the values, -1 is null
+DictionaryColumn = namedtuple('DictionaryColumn', ['dictionary', 'indices'])
+
+_HEADER = struct.Struct('<4sI')
+_ALIGN = 8
+
+
+def encode(columns, **metadata):
+    """Encode a dict of columns (arrays, lists or DictionaryColumns) into one frame."""
+    specs, buffers, n_rows = [], [], None
+    for name, values in columns.items():
+        if not isinstance(values, DictionaryColumn):
+            values = np.asarray(values)
+            if values.dtype.kind in 'OUS':
+                values = _dictionary_encode(values)
+        if isinstance(values, DictionaryColumn):
+            spec = {'name': name, 'dtype': 'dict', 'dictionary': list(values.dictionary)}
+            data = np.ascontiguousarray(values.indices, dtype='<i4')
+        else:
+            data = np.ascontiguousarray(values, dtype=values.dtype.newbyteorder('<'))
+            spec = {'name': name, 'dtype': data.dtype.str}
+        if data.ndim != 1:
+            raise ValueError(f"Column '{name}' must be one-dimensional")
+        if n_rows is not None and len(data) != n_rows:
+            raise ValueError(f"Column '{name}' has {len(data)} rows, expected {n_rows}")
+        n_rows = len(data)
+        specs.append(spec)
+        buffers.append(data.tobytes())
+
+    meta = json.dumps(dict(metadata, n_rows=n_rows or 0, columns=specs)).encode()
+    parts = [_HEADER.pack(MAGIC, len(meta)), meta, _padding(_HEADER.size + len(meta))]
+    for data in buffers:
+        parts.append(data)
+        parts.append(_padding(len(data)))
+    return b''.join(parts)
+
+
+def decode(payload):
+    """Decode a frame into ``(columns, metadata)``; numeric columns are zero-copy views of ``payload``."""
+    if len(payload) < _HEADER.size:
+        raise ValueError("Truncated columnar frame")
+    magic, meta_len = _HEADER.unpack_from(payload)
+    if magic != MAGIC:
+        raise ValueError("Not a columnar frame (bad magic)")
+    offset = _HEADER.size + meta_len
+    try:
+        metadata = json.loads(bytes(payload[_HEADER.size:offset]))
+        n_rows = int(metadata['n_rows'])
+        specs = metadata.pop('columns')
+    except (ValueError, KeyError, TypeError, AttributeError) as e:
+        raise ValueError(f"Invalid columnar frame metadata: {e}")
+    if n_rows < 0:
+        raise ValueError(f"Invalid columnar frame metadata: n_rows {n_rows}")
+    if not isinstance(specs, list):
+        raise ValueError("Invalid columnar frame metadata: columns must be a list")
+    for position, spec in enumerate(specs):
+        _check_spec(position, spec)
+    offset += -offset % _ALIGN
+
+    columns = {}
+    for spec in specs:
+        is_dictionary = spec['dtype'] == 'dict'
+        try:
+            dtype = np.dtype('<i4' if is_dictionary else spec['dtype'])
+        except TypeError:
+            raise ValueError(f"Unsupported dtype for column '{spec['name']}': {spec['dtype']}")
+        if dtype.kind not in 'biuf':
+            raise ValueError(f"Unsupported dtype for column '{spec['name']}': {spec['dtype']}")
+        size = n_rows * dtype.itemsize
+        if offset + size > len(payload):
+            raise ValueError(f"Truncated data for column '{spec['name']}'")
+        values = np.frombuffer(payload, dtype=dtype, count=n_rows, offset=offset)
+        if is_dictionary:
+            dictionary = np.asarray(spec['dictionary'], dtype=object)
+            if n_rows and (values.min() < -1 or values.max() >= len(dictionary)):
+                raise ValueError(f"Dictionary index out of range in column '{spec['name']}'")
+            values = DictionaryColumn(dictionary, values)
+        columns[spec['name']] = values
+        offset += size + (-size % _ALIGN)
+    return columns, metadata
+
+
+def _check_spec(position, spec):
+    """Raise ValueError unless ``spec`` is a well-formed column description."""
+    if not isinstance(spec, dict):
+        raise ValueError(f"Invalid spec for column {position}: expected an object")
+    if not isinstance(spec.get('name'), str):
+        raise ValueError(f"Invalid spec for column {position}: 'name' must be a string")
+    if not isinstance(spec.get('dtype'), str):
+        raise ValueError(f"Invalid spec for column '{spec['name']}': 'dtype' must be a string")
+    if spec['dtype'] == 'dict' and not isinstance(spec.get('dictionary'), list):
+        raise ValueError(f"Invalid spec for column '{spec['name']}': 'dictionary' must be a list")
+
+
+def _dictionary_encode(values):
+    dictionary, indices = np.unique(values.astype(str), return_inverse=True)
+    return DictionaryColumn(dictionary.tolist(), indices)
+
+
+def _padding(length):
+    return b'\0' * (-length % _ALIGN)
@@ -0,0 +1,386 @@
+"""Compact single-file forest artifact, memory-mapped at load.
+
+The joblib pickle stores every node as sklearn's 64-byte node struct plus a
+float64 value row, and unpickling it imports sklearn and copies all of it into
+each process. The compact format keeps only what scoring needs:
+
+* split thresholds as float32, rounded down: for float32 inputs (sklearn scores
+  float32) ``x <= t`` holds exactly when ``x <= round_down_float32(t)``, so
+  every split goes the same way;
+* feature ids as uint8 and child links as tree-local uint16 indices (wider
+  types only when the forest needs them);
+* subtrees whose leaves all carry the same value merged into one leaf;
+* leaf values as float32 - the only lossy step, checked against the source model
+  at export (``COMPACT_TOLERANCE``);
+* the feature schema and decision threshold embedded in the header.
+
+Layout (integers little-endian)::
+
+    magic       4 bytes   b'FRCM'
+    meta_len    uint32    length of the JSON metadata block
+    metadata    UTF-8     format, threshold, schema, array specs, source, verification
+    arrays      feature, threshold, children, value, roots - each 64-byte aligned
+
+Loading parses the header and maps the file; the arrays are views of the
+mapping, so load time does not grow with the forest and processes share the
+pages.
+"""
+import os
+import sys
+import json
+import struct
+import subprocess
+import numpy as np
+
+from src.forest_engine import FlatForest, model_fingerprint
+
+MAGIC = b'FRCM'
+FORMAT_VERSION = 1
+
+# Largest accepted |probability difference| against the source model
+COMPACT_TOLERANCE = 1e-6
+
+# Synthetic rows probed around the split thresholds when verifying an export
+PROBE_ROWS = 20000
+
+_HEADER = struct.Struct('<4sI')
+_ALIGN = 64
+ARRAY_NAMES = ('feature', 'threshold', 'children', 'value', 'roots')
+
+
+class CompactForest:
+    """Read-only scorer over the compact arrays, identical in decisions to the flat engine."""
+
+    # Rows scored per traversal block, as in FlatForest
+    BLOCK_ROWS = 128
+
+    def __init__(self, feature, threshold, children, value, roots, max_depth, metadata=None):
+        self.feature = feature
+        self.threshold = threshold
+        # Interleaved tree-local children: children[2 * node] left, children[2 * node + 1] right
+        self.children = children
+        self.value = value
+        self.roots = roots
+        self.max_depth = int(max_depth)
+        self.n_trees = len(roots)
+        self.metadata = metadata or {}
+        self._root_nodes = np.asarray(roots, dtype=np.intp)
+
+    @property
+    def n_nodes(self):
+        return len(self.feature)
+
+    @property
+    def threshold_value(self):
+        """Decision threshold embedded at export, or None."""
+        return self.metadata.get('threshold')
+
+    @property
+    def schema(self):
+        """Feature schema embedded at export, or None."""
+        return self.metadata.get('schema')
+
+    @classmethod
+    def from_flat(cls, flat, n_features):
+        """Compact an exported FlatForest, merging single-valued subtrees."""
+        children = np.asarray(flat.children, dtype=np.int64).reshape(-1, 2).tolist()
+        feature_src = np.asarray(flat.feature).tolist()
+        threshold_src = np.asarray(flat.threshold).tolist()
+        value_src = np.asarray(flat.value).tolist()
+        is_leaf = [left == node for node, (left, _) in enumerate(children)]
+
+        # A node is constant when every leaf under it has the same value. sklearn
+        # numbers children after their parent, so one reverse pass sees children first.
+        constant = list(is_leaf)
+        leaf_value = [value if leaf else None for value, leaf in zip(value_src, is_leaf)]
+        for node in range(len(children) - 1, -1, -1):
+            if not is_leaf[node]:
+                left, right = children[node]
+                if constant[left] and constant[right] and leaf_value[left] == leaf_value[right]:
+                    constant[node] = True
+                    leaf_value[node] = leaf_value[left]
+
+        features, thresholds, lefts, rights, values, roots = [], [], [], [], [], []
+        offset, max_depth, largest_tree = 0, 0, 0
+        for root in np.asarray(flat.roots, dtype=np.int64):
+            # Renumber the nodes kept in this tree in depth-first order
+            order, local = [], {}
+            stack = [(int(root), 0)]
+            while stack:
+                node, depth = stack.pop()
+                local[node] = len(order)
+                order.append(node)
+                max_depth = max(max_depth, depth)
+                if not constant[node]:
+                    stack.append((children[node][1], depth + 1))
+                    stack.append((children[node][0], depth + 1))
+            for node in order:
+                position = local[node]
+                if constant[node]:
+                    features.append(0)
+                    thresholds.append(np.inf)
+                    lefts.append(position)
+                    rights.append(position)
+                    values.append(leaf_value[node])
+                else:
+                    features.append(feature_src[node])
+                    thresholds.append(threshold_src[node])
+                    lefts.append(local[children[node][0]])
+                    rights.append(local[children[node][1]])
+                    values.append(0.0)
+            roots.append(offset)
+            offset += len(order)
+            largest_tree = max(largest_tree, len(order))
+
+        feature_dtype = np.uint8 if n_features <= np.iinfo(np.uint8).max else np.uint16
+        child_dtype = np.uint16 if largest_tree <= np.iinfo(np.uint16).max else np.uint32
+        root_dtype = np.uint32 if offset <= np.iinfo(np.uint32).max else np.uint64
+        return cls(
+            feature=np.asarray(features, dtype=feature_dtype),
+            threshold=_round_down_float32(np.asarray(thresholds, dtype=np.float64)),
+            children=np.stack([lefts, rights], axis=1).ravel().astype(child_dtype),
+            value=np.asarray(values, dtype=np.float32),
+            roots=np.asarray(roots, dtype=root_dtype),
+            max_depth=max_depth
+        )
+
+    @classmethod
+    def from_sklearn(cls, forest):
+        return cls.from_flat(FlatForest.from_sklearn(forest), forest.n_features_in_)
+
+    def save(self, path, **metadata):
+        """Write the artifact atomically; ``metadata`` (threshold, schema, ...) goes into the header."""
+        specs, offset = [], 0
+        for name in ARRAY_NAMES:
+            array = getattr(self, name)
+            specs.append({'name': name, 'dtype': array.dtype.str, 'count': len(array), 'offset': offset})
+            offset += array.nbytes + (-array.nbytes % _ALIGN)
+        meta = dict(metadata, format=FORMAT_VERSION, n_trees=self.n_trees, n_nodes=self.n_nodes,
+                    max_depth=self.max_depth, arrays=specs)
+        meta_bytes = json.dumps(meta).encode()
+        data_start = _HEADER.size + len(meta_bytes)
+        data_start += -data_start % _ALIGN
+
+        tmp_path = f"{path}.tmp-{os.getpid()}"
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with open(tmp_path, 'wb') as f:
+            f.write(_HEADER.pack(MAGIC, len(meta_bytes)))
+            f.write(meta_bytes)
+            f.write(b'\0' * (data_start - _HEADER.size - len(meta_bytes)))
+            for spec in specs:
+                array = np.ascontiguousarray(getattr(self, spec['name']))
+                f.write(array.tobytes())
+                f.write(b'\0' * (-array.nbytes % _ALIGN))
+        # Processes that mapped the previous file keep reading the old inode
+        os.replace(tmp_path, path)
+        self.metadata = meta
+
+    @staticmethod
+    def read_metadata(path):
+        """Return the header metadata, or None if ``path`` is not a readable compact artifact."""
+        try:
+            with open(path, 'rb') as f:
+                magic, meta_len = _HEADER.unpack(f.read(_HEADER.size))
+                if magic != MAGIC:
+                    return None
+                return json.loads(f.read(meta_len))
+        except (OSError, ValueError, struct.error):
+            return None
+
+    @classmethod
+    def load(cls, path):
+        """Map the artifact read-only; no array data is read until it is scored."""
+        mapped = np.memmap(path, dtype=np.uint8, mode='r')
+        magic, meta_len = _HEADER.unpack_from(mapped)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a compact model artifact")
+        meta = json.loads(bytes(mapped[_HEADER.size:_HEADER.size + meta_len]))
+        if meta.get('format') != FORMAT_VERSION:
+            raise ValueError(f"Unsupported compact model format {meta.get('format')} in {path}")
+        data_start = _HEADER.size + meta_len
+        data_start += -data_start % _ALIGN
+        arrays = {
+            spec['name']: np.frombuffer(mapped, dtype=np.dtype(spec['dtype']), count=spec['count'],
+                                        offset=data_start + spec['offset'])
+            for spec in meta['arrays']
+        }
+        return cls(max_depth=meta['max_depth'], metadata=meta, **arrays)
+
+    def prefault(self):
+        """Read every page of the mapped arrays, so the artifact is resident before the first request."""
+        for name in ARRAY_NAMES:
+            getattr(self, name).view(np.uint8).max()
+
+    def apply(self, X):
+        """Return the global leaf index reached by every row in every tree, shape (n, n_trees)."""
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        if len(X) <= self.BLOCK_ROWS:
+            return self._apply_block(X)
+        return np.concatenate([
+            self._apply_block(X[start:start + self.BLOCK_ROWS])
+            for start in range(0, len(X), self.BLOCK_ROWS)
+        ])
+
+    def _apply_block(self, X):
+        n_rows, n_features = X.shape
+        flat_X = X.ravel()
+        row_offset = (np.arange(n_rows, dtype=np.intp) * n_features)[:, None]
+
+        roots = np.broadcast_to(self._root_nodes, (n_rows, self.n_trees))
+        nodes = roots
+        for _ in range(self.max_depth):
+            values = flat_X.take(row_offset + self.feature.take(nodes))
+            go_right = values > self.threshold.take(nodes)
+            # Child links are tree-local
+            nodes = roots + self.children.take(2 * nodes + go_right)
+        return nodes
+
+    def predict_proba(self, X):
+        """Return the class-1 probability of every row."""
+        leaf_values = self.value.take(self.apply(X)).astype(np.float64)
+        total = np.cumsum(leaf_values, axis=1)[:, -1]
+        return total / self.n_trees
+
+    def verify(self, flat, X, threshold=None):
+        """Compare against the flat (exact) engine on ``X``; return the differences found."""
+        expected = flat.predict_proba(X)
+        actual = self.predict_proba(X)
+        result = {'rows': len(X), 'max_abs_diff': float(np.abs(expected - actual).max()) if len(X) else 0.0}
+        if threshold is not None:
+            result['decision_mismatches'] = int(np.count_nonzero((expected >= threshold) != (actual >= threshold)))
+        return result
+
+
+def _round_down_float32(values):
+    """Largest float32 not above each float64 value (+inf stays +inf)."""
+    rounded = values.astype(np.float32)
+    above = rounded.astype(np.float64) > values
+    rounded[above] = np.nextafter(rounded[above], np.float32(-np.inf))
+    return rounded
+
+
+def probe_rows(flat, n_features, n_rows=PROBE_ROWS, seed=0):
+    """Synthetic rows placed on and around split thresholds, to exercise both sides of splits."""
+    rng = np.random.RandomState(seed)
+    feature = np.asarray(flat.feature)
+    threshold = np.asarray(flat.threshold)
+    split = np.isfinite(threshold)
+    X = np.zeros((n_rows, n_features))
+    for column in range(n_features):
+        cuts = threshold[split & (feature == column)]
+        if len(cuts) == 0:
+            continue
+        X[:, column] = rng.choice(cuts, n_rows) + rng.choice([-1e-3, 0.0, 1e-3], n_rows) * (1 + np.abs(rng.choice(cuts, n_rows)))
+    return X
+
+
+def export_compact_model(model, schema, threshold, path, X_check=None, source_path=None,
+                         tolerance=COMPACT_TOLERANCE):
+    """Compact a fitted forest, verify it against the exact engine and write it to ``path``.
+
+    The check runs on probe rows around every split threshold plus ``X_check``
+    (for example the training data). Raises ValueError, without writing, if any
+    probability differs by more than ``tolerance``. Returns the header metadata.
+    """
+    flat = FlatForest.from_sklearn(model)
+    n_features = model.n_features_in_
+    compact = CompactForest.from_flat(flat, n_features)
+
+    checks = {'probe': compact.verify(flat, probe_rows(flat, n_features), threshold)}
+    if X_check is not None:
+        checks['data'] = compact.verify(flat, np.asarray(X_check, dtype=np.float64), threshold)
+    max_abs_diff = max(check['max_abs_diff'] for check in checks.values())
+    if max_abs_diff > tolerance:
+        raise ValueError(f"Compact model differs from the source by {max_abs_diff:.3e} (tolerance {tolerance:.0e})")
+
+    metadata = {
+        'threshold': threshold,
+        'schema': schema,
+        'source_nodes': flat.n_nodes,
+        'array_bytes': array_bytes(flat, compact),
+        'verification': dict(checks, tolerance=tolerance, max_abs_diff=max_abs_diff)
+    }
+    if source_path is not None:
+        source = os.stat(source_path)
+        metadata.update(source_path=os.path.basename(source_path), source_mtime=source.st_mtime,
+                        source_size=source.st_size, source_sha256=model_fingerprint(source_path))
+    compact.save(path, **metadata)
+    return compact.metadata
+
+
+def array_bytes(flat, compact):
+    """Array bytes of the source forest, after merging, and after narrowing the dtypes.
+
+    ``merged`` keeps the source dtypes at the compact node count, so
+    ``source - merged`` is what merging saved and ``merged - compact`` what the
+    float32 values and narrow indices saved.
+    """
+    node_bytes = (flat.feature.itemsize + flat.threshold.itemsize + 2 * flat.children.itemsize
+                  + flat.value.itemsize)
+    return {
+        'source': sum(getattr(flat, name).nbytes for name in ARRAY_NAMES),
+        'merged': compact.n_nodes * node_bytes + flat.roots.nbytes,
+        'compact': sum(getattr(compact, name).nbytes for name in ARRAY_NAMES)
+    }
+
+
+def compaction_savings(metadata):
+    """Nodes merged and array bytes saved by merging and by narrowing, from export metadata."""
+    sizes = metadata['array_bytes']
+    return {
+        'merged_nodes': metadata['source_nodes'] - metadata['n_nodes'],
+        'array_bytes': sizes,
+        'merge_saved_bytes': sizes['source'] - sizes['merged'],
+        'quantization_saved_bytes': sizes['merged'] - sizes['compact']
+    }
+
+
+# Loads one artifact in a fresh interpreter and reports load time and resident memory
+_LOAD_PROBE = """
+import json, sys, time
+sys.path.insert(0, {root!r})
+def rss():
+    with open('/proc/self/statm') as f:
+        return int(f.read().split()[1]) * {page_size}
+import numpy as np
+{imports}
+before = rss()
+start = time.perf_counter()
+model = {load}
+loaded = time.perf_counter()
+model.predict_proba(np.zeros((1, {n_features})))
+print(json.dumps({{'load_ms': (loaded - start) * 1000, 'first_prediction_ms': (time.perf_counter() - loaded) * 1000,
+                  'rss_before_mb': before / 2**20, 'rss_after_mb': rss() / 2**20}}))
+"""
+
+
+def measure_load(kind, path, n_features):
+    """Load an artifact in a subprocess and return its load time and RSS figures.
+
+    ``kind`` is 'joblib' or 'compact'. RSS is read from /proc, so this needs Linux.
+    """
+    if kind == 'joblib':
+        imports, load = 'import joblib, warnings; warnings.simplefilter("ignore")', f'joblib.load({path!r})'
+    else:
+        imports, load = 'from src.compact_model import CompactForest', f'CompactForest.load({path!r})'
+    code = _LOAD_PROBE.format(root=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                              page_size=os.sysconf('SC_PAGE_SIZE'), imports=imports, load=load,
+                              n_features=n_features)
+    output = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True).stdout
+    result = json.loads(output.strip().splitlines()[-1])
+    result['rss_delta_mb'] = result['rss_after_mb'] - result['rss_before_mb']
+    result['size_bytes'] = os.path.getsize(path)
+    return result
+
+
+def compare_artifacts(joblib_path, compact_path, n_features):
+    """Size, load time and RSS of the joblib pickle against the compact artifact."""
+    before = measure_load('joblib', joblib_path, n_features)
+    after = measure_load('compact', compact_path, n_features)
+    return {
+        'joblib': before,
+        'compact': after,
+        'size_ratio': before['size_bytes'] / after['size_bytes'],
+        'load_speedup': before['load_ms'] / max(after['load_ms'], 1e-6),
+        'rss_delta_saved_mb': before['rss_delta_mb'] - after['rss_delta_mb']
+    }
@@ -0,0 +1,302 @@
+"""Precompiled feature vectorizer shared by the scoring API, batch and simulation paths.
+
+The vectorizer is built once from the feature schema persisted next to the model
+(``models/feature_schema.json``) and turns transaction dicts straight into a float
+ndarray in the column order the model was trained on. Nothing is fitted per call
+and pandas is not needed on the hot path. Fields are validated by a function
+compiled from the schema's field declarations (see ``src/request_validator.py``).
+"""
+import os
+import json
+import numpy as np
+
+from src.columnar_codec import DictionaryColumn
+from src.request_validator import FieldSpec, ValidationError, compile_validator, default_fields, format_errors
+
+FEATURE_SCHEMA_PATH = 'models/feature_schema.json'
+
+# Code used for merchant categories the model never saw during training
+UNKNOWN_CATEGORY_CODE = -1
+
+
+class FeatureVectorizer:
+    """Convert transactions into model-ready feature matrices."""
+
+    def __init__(self, features, categorical=None, unknown_code=UNKNOWN_CATEGORY_CODE, fields=None):
+        self.features = list(features)
+        self.categorical = {name: list(classes) for name, classes in (categorical or {}).items()}
+        self.unknown_code = unknown_code
+        self.n_features = len(self.features)
+
+        # Field declarations compiled into one validating encoder; undeclared
+        # features only need to be finite numbers or hashable category labels
+        declared = dict(default_fields(self.features, self.categorical), **(fields or {}))
+        self._specs = [
+            FieldSpec(name, declared[name], self.categorical.get(name), unknown_code) for name in self.features
+        ]
+        self._encode = compile_validator(self._specs)
+
+        # Precompile one slot per column: (position, name, category codes or None)
+        self._slots = [
+            (i, name, {c: code for code, c in enumerate(self.categorical[name])}
+             if name in self.categorical else None)
+            for i, name in enumerate(self.features)
+        ]
+        self._codes = {name: codes for _, name, codes in self._slots if codes is not None}
+        # Sorted class arrays plus the code of each sorted entry, for column lookups
+        self._sorted_classes = {}
+        for name, classes in self.categorical.items():
+            order = np.argsort(np.array(classes, dtype=object))
+            self._sorted_classes[name] = (np.array(classes, dtype=object)[order], order)
+        # Bounds for validating encoded matrices, compiled on first use
+        self._matrix_checks = None
+
+    @classmethod
+    def from_schema(cls, path=FEATURE_SCHEMA_PATH):
+        """Build the vectorizer from a persisted feature schema."""
+        with open(path, 'r') as f:
+            return cls.from_dict(json.load(f))
+
+    @classmethod
+    def from_dict(cls, schema):
+        """Build the vectorizer from a schema dict, e.g. one embedded in a compact model artifact."""
+        return cls(
+            schema['features'],
+            schema.get('categorical', {}),
+            schema.get('unknown_category_code', UNKNOWN_CATEGORY_CODE),
+            schema.get('fields')
+        )
+
+    @classmethod
+    def from_training_frame(cls, X, df, cat_cols, fields=None):
+        """Capture the schema of a training matrix built with per-column LabelEncoders.
+
+        ``X`` is the encoded feature frame passed to ``fit`` and ``df`` the raw frame the
+        ``cat_cols`` were encoded from. LabelEncoder assigns codes in sorted order, so the
+        sorted unique values reproduce the training encoding exactly. ``fields`` are the
+        field declarations validated at serving time.
+        """
+        categorical = {col: sorted(df[col].dropna().unique().tolist()) for col in cat_cols}
+        return cls(X.columns.tolist(), categorical, fields=fields)
+
+    def to_schema(self):
+        """Return the JSON-serializable schema."""
+        return {
+            'features': self.features,
+            'categorical': self.categorical,
+            'unknown_category_code': self.unknown_code,
+            'fields': {spec.name: spec.to_dict() for spec in self._specs}
+        }
+
+    def save(self, path=FEATURE_SCHEMA_PATH):
+        """Persist the schema next to the model artifact."""
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w') as f:
+            json.dump(self.to_schema(), f, indent=2)
+
+    def synthetic_records(self, n, seed=0):
+        """Return ``n`` random valid transactions in this schema, e.g. to warm up a model before serving."""
+        rng = np.random.default_rng(seed)
+        columns = {}
+        for spec in self._specs:
+            low = spec.min if spec.min is not None else 0
+            high = spec.max if spec.max is not None else low + 100
+            if spec.type == 'category':
+                classes = list(spec.codes) or ['unknown']
+                columns[spec.name] = [classes[i] for i in rng.integers(len(classes), size=n)]
+            elif spec.type == 'boolean':
+                columns[spec.name] = rng.integers(0, 2, size=n).tolist()
+            elif spec.type == 'integer':
+                columns[spec.name] = rng.integers(low, high + 1, size=n).tolist()
+            else:
+                columns[spec.name] = rng.uniform(low, high, size=n).round(2).tolist()
+        return [{name: values[i] for name, values in columns.items()} for i in range(n)]
+
+    def check_model(self, model):
+        """Raise if the model was fitted on a different column order."""
+        names = getattr(model, 'feature_names_in_', None)
+        if names is not None and list(names) != self.features:
+            raise ValueError(f"Model feature order {list(names)} does not match schema {self.features}")
+
+    def encode_row(self, record, out):
+        """Validate one transaction dict into the preallocated row ``out``.
+
+        Raises ValidationError listing every invalid field.
+        """
+        if not isinstance(record, dict):
+            raise ValueError('Expected transaction object')
+        field_errors = self._encode(record, out)
+        if field_errors:
+            raise ValidationError(field_errors)
+        return out
+
+    def transform(self, record):
+        """Vectorize a single transaction into a 1 x n_features matrix."""
+        X = np.empty((1, self.n_features), dtype=np.float64)
+        self.encode_row(record, X[0])
+        return X
+
+    def transform_many(self, records):
+        """Vectorize a list of transactions into an n x n_features matrix."""
+        X = np.empty((len(records), self.n_features), dtype=np.float64)
+        for row, record in enumerate(records):
+            self.encode_row(record, X[row])
+        return X
+
+    def transform_batch(self, records):
+        """Vectorize a batch, collecting per-row errors instead of failing the whole batch.
+
+        Returns ``(X, rows, errors)`` where ``X`` holds the valid rows in order, ``rows``
+        maps each matrix row back to its position in ``records`` and ``errors`` maps the
+        position of every rejected record to its error message.
+        """
+        X = np.empty((len(records), self.n_features), dtype=np.float64)
+        encode = self._encode
+        rows = []
+        errors = {}
+        for position, record in enumerate(records):
+            if not isinstance(record, dict):
+                errors[position] = 'Expected transaction object'
+                continue
+            field_errors = encode(record, X[len(rows)])
+            if field_errors:
+                errors[position] = format_errors(field_errors)
+                continue
+            rows.append(position)
+        return X[:len(rows)], rows, errors
+
+    def encode_categories(self, name, values):
+        """Map an array of labels of categorical column ``name`` to their training codes."""
+        classes, order = self._sorted_classes[name]
+        values = np.asarray(values).astype(object)
+        try:
+            idx = np.searchsorted(classes, values).clip(0, len(classes) - 1)
+        except TypeError:
+            # Labels not comparable with the classes (nulls, numbers): look them up one by one
+            codes = self._codes[name]
+            return np.array([codes.get(value, self.unknown_code) for value in values], dtype=np.float64)
+        known = classes[idx] == values
+        return np.where(known, order[idx], self.unknown_code)
+
+    def transform_columns(self, columns):
+        """Vectorize column arrays (a DataFrame or a dict of arrays) without per-row work.
+
+        Categorical columns may also be ``DictionaryColumn``s: only the distinct labels
+        are looked up, and null (-1) entries get the unknown category code.
+        """
+        n_rows = _column_length(columns[self.features[0]])
+        X = np.empty((n_rows, self.n_features), dtype=np.float64)
+        for i, name, codes in self._slots:
+            values = columns[name]
+            if isinstance(values, DictionaryColumn):
+                if codes is None:
+                    raise ValueError(f"Feature '{name}' must be numeric, got string column")
+                # The appended entry is what index -1 (null) picks up
+                dictionary_codes = np.append(self.encode_categories(name, values.dictionary), self.unknown_code)
+                X[:, i] = dictionary_codes[values.indices]
+            elif codes is None:
+                X[:, i] = np.asarray(values)
+            else:
+                X[:, i] = self.encode_categories(name, values)
+        return X
+
+    def transform_column_batch(self, columns):
+        """Vectorize a dict of columns, collecting per-row errors like ``transform_batch``.
+
+        Returns ``(X, rows, errors)`` with ``rows`` as an index array. A missing feature
+        column without a default raises ValueError; each field is checked against its
+        declaration with whole-column comparisons and only failing rows get messages.
+        """
+        columns = dict(columns)
+        n_rows = next((_column_length(values) for values in columns.values()), 0)
+        for spec in self._specs:
+            if spec.name not in columns:
+                if not spec.has_default:
+                    raise ValueError(f"Missing feature '{spec.name}'")
+                columns[spec.name] = np.full(n_rows, spec.default, dtype=object if spec.type == 'category' else None)
+        X = self.transform_columns(columns)
+
+        invalid = np.zeros(X.shape, dtype=bool)
+        for i, spec in enumerate(self._specs):
+            invalid[:, i] = spec.invalid_mask(X[:, i])
+        valid = ~invalid.any(axis=1)
+        if valid.all():
+            return X, np.arange(len(X)), {}
+        errors = {}
+        for position in np.flatnonzero(~valid):
+            field_errors = {}
+            for i in np.flatnonzero(invalid[position]):
+                spec = self._specs[i]
+                _, message = spec.coerce(_column_value(columns[spec.name], position))
+                field_errors[spec.name] = message or f"is invalid, got {float(X[position, i])!r}"
+            errors[int(position)] = format_errors(field_errors)
+        return X[valid], np.flatnonzero(valid), errors
+
+    def check_matrix(self, X):
+        """Validate an already-encoded n x n_features matrix, e.g. from the binary socket protocol.
+
+        Categorical columns hold their training codes (or the unknown code). Returns
+        ``(X, rows, errors)`` like ``transform_column_batch``; the whole matrix is checked
+        with a handful of array operations against bounds precompiled from the schema.
+        """
+        if self._matrix_checks is None:
+            self._matrix_checks = self._compile_matrix_checks()
+        low, high, integral, unknown_ok = self._matrix_checks
+        invalid = ~((X >= low) & (X <= high))
+        invalid |= integral & (X != np.round(X))
+        invalid &= ~(unknown_ok & (X == self.unknown_code))
+        valid = ~invalid.any(axis=1)
+        if valid.all():
+            return X, np.arange(len(X)), {}
+        errors = {}
+        for position in np.flatnonzero(~valid):
+            field_errors = {}
+            for i in np.flatnonzero(invalid[position]):
+                spec = self._specs[i]
+                value = float(X[position, i])
+                message = None if spec.type == 'category' else spec.coerce(value)[1]
+                field_errors[spec.name] = message or f"is invalid, got {value!r}"
+            errors[int(position)] = format_errors(field_errors)
+        return X[valid], np.flatnonzero(valid), errors
+
+    def _compile_matrix_checks(self):
+        """Per-column bounds for ``check_matrix``: ``(low, high, integral, unknown_ok)``.
+
+        NaN fails both bounds, and unbounded columns use the largest finite floats so
+        infinities fail too. Category codes must index a known class; columns declared
+        with ``unknown: encode`` also accept the unknown code.
+        """
+        finite = np.finfo(np.float64).max
+        low = np.full(self.n_features, -finite)
+        high = np.full(self.n_features, finite)
+        integral = np.zeros(self.n_features, dtype=bool)
+        unknown_ok = np.zeros(self.n_features, dtype=bool)
+        for i, spec in enumerate(self._specs):
+            if spec.type == 'category':
+                low[i], high[i] = 0, len(spec.codes) - 1
+                integral[i] = True
+                unknown_ok[i] = spec.encode_unknown
+                continue
+            if spec.type == 'boolean':
+                low[i], high[i] = 0, 1
+            if spec.min is not None:
+                low[i] = max(low[i], spec.min)
+            if spec.max is not None:
+                high[i] = min(high[i], spec.max)
+            integral[i] = spec.type in ('integer', 'boolean')
+        return low, high, integral, unknown_ok
+
+
+def _column_length(values):
+    """Number of rows of a column; a DictionaryColumn is a (dictionary, indices) pair, not its rows."""
+    if isinstance(values, DictionaryColumn):
+        return len(values.indices)
+    return len(values)
+
+
+def _column_value(values, position):
+    """The original label or number at ``position`` of a decoded column, for error messages."""
+    if isinstance(values, DictionaryColumn):
+        index = values.indices[position]
+        return values.dictionary[index] if index >= 0 else None
+    return values[position]
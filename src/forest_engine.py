@@ -0,0 +1,317 @@
+"""Flattened-array inference engine for the fitted RandomForestClassifier.
+
+The forest is exported once into contiguous NumPy arrays (split feature,
+threshold, left/right child and leaf value for every node of every tree) and rows
+are scored by walking all trees level by level with vectorized array lookups.
+This skips sklearn's per-call estimator validation and per-tree dispatch while
+reproducing ``predict_proba`` bit for bit:
+
+* inputs are rounded to float32 before comparing against the float64
+  thresholds, exactly as sklearn's tree code does;
+* leaf values are the per-tree class-1 probabilities sklearn returns;
+* tree outputs are summed sequentially in tree order and divided by the number
+  of trees, matching the serial accumulation in ``ForestClassifier``.
+
+The arrays can be saved as plain ``.npy`` files and loaded back memory-mapped,
+so several scoring processes share one copy of the trees in the page cache.
+
+``predict_proba_early_exit`` scores against a decision threshold instead: it
+evaluates trees in order and stops for a row once the lowest and highest leaf
+values of the remaining trees can no longer move the average across the
+threshold. The decision always matches full evaluation; the probability is
+exact only for rows that needed every tree. A single transaction is walked tree
+by tree in plain Python instead, checking the bounds after every tree.
+"""
+import os
+import json
+import shutil
+import hashlib
+import numpy as np
+
+# Arrays persisted by FlatForest.save, one .npy file each
+ARRAY_NAMES = ('feature', 'threshold', 'children', 'value', 'roots')
+
+
+class FlatForest:
+    """Array representation of a binary-class tree ensemble."""
+
+    # Rows scored per traversal block, sized to keep the working set in cache
+    BLOCK_ROWS = 128
+
+    # Fewest trees evaluated per early-exit pass, bounding the passes for rows near the threshold
+    EXIT_MIN_TREES = 8
+
+    # Inputs up to this many rows are early-exited row by row in plain Python: a tree
+    # walk there costs about a microsecond, while each vectorized pass costs as much as
+    # walking the whole forest, so only the per-row walk gains from skipping trees
+    SCALAR_EXIT_ROWS = 2
+
+    def __init__(self, feature, threshold, children, value, roots, max_depth):
+        self.feature = feature
+        self.threshold = threshold
+        # Interleaved children: children[2 * node] is the left child, children[2 * node + 1] the right
+        self.children = children
+        self.value = value
+        self.roots = roots
+        self.max_depth = int(max_depth)
+        self.n_trees = len(roots)
+        self._root_nodes = np.asarray(roots, dtype=np.intp)
+        self._exit_bounds = None
+        self._scalar_nodes = None
+
+    @classmethod
+    def from_sklearn(cls, forest):
+        """Export a fitted binary RandomForestClassifier."""
+        if not hasattr(forest, 'estimators_') or list(forest.classes_) != [0, 1]:
+            raise ValueError("Expected a fitted binary forest classifier with classes [0, 1]")
+
+        features, thresholds, lefts, rights, values, roots = [], [], [], [], [], []
+        offset, max_depth = 0, 0
+        for estimator in forest.estimators_:
+            tree = estimator.tree_
+            n_nodes = tree.node_count
+            is_leaf = tree.children_left < 0
+            own = np.arange(n_nodes, dtype=np.int64)
+
+            # Leaves point to themselves so every row can take exactly max_depth steps
+            features.append(np.where(is_leaf, 0, tree.feature))
+            thresholds.append(np.where(is_leaf, np.inf, tree.threshold))
+            lefts.append(np.where(is_leaf, own, tree.children_left) + offset)
+            rights.append(np.where(is_leaf, own, tree.children_right) + offset)
+            values.append(_leaf_probabilities(tree.value[:, 0, :]))
+            roots.append(offset)
+
+            offset += n_nodes
+            max_depth = max(max_depth, tree.max_depth)
+
+        index_dtype = np.int32 if 2 * offset < np.iinfo(np.int32).max else np.int64
+        children = np.stack([np.concatenate(lefts), np.concatenate(rights)], axis=1).ravel()
+        return cls(
+            feature=np.ascontiguousarray(np.concatenate(features), dtype=np.intp),
+            threshold=np.ascontiguousarray(np.concatenate(thresholds), dtype=np.float64),
+            children=np.ascontiguousarray(children, dtype=index_dtype),
+            value=np.ascontiguousarray(np.concatenate(values), dtype=np.float64),
+            roots=np.asarray(roots, dtype=index_dtype),
+            max_depth=max_depth
+        )
+
+    def save(self, path, **metadata):
+        """Write the arrays as .npy files plus a meta.json into the directory ``path``.
+
+        The export is built in a temporary directory and swapped in, so processes
+        that still have the previous arrays memory-mapped keep reading intact files.
+        """
+        tmp_path = f"{path}.tmp-{os.getpid()}"
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        os.makedirs(tmp_path)
+        for name in ARRAY_NAMES:
+            np.save(os.path.join(tmp_path, f"{name}.npy"), getattr(self, name))
+        meta = dict(metadata, max_depth=self.max_depth, n_trees=self.n_trees, n_nodes=self.n_nodes)
+        with open(os.path.join(tmp_path, 'meta.json'), 'w') as f:
+            json.dump(meta, f, indent=2)
+
+        old_path = f"{path}.old-{os.getpid()}"
+        if os.path.exists(path):
+            os.rename(path, old_path)
+        os.rename(tmp_path, path)
+        shutil.rmtree(old_path, ignore_errors=True)
+
+    @classmethod
+    def load(cls, path, mmap=True):
+        """Load a saved forest; with ``mmap`` the arrays stay file-backed and shared."""
+        with open(os.path.join(path, 'meta.json'), 'r') as f:
+            meta = json.load(f)
+        arrays = {
+            name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode='r' if mmap else None)
+            for name in ARRAY_NAMES
+        }
+        return cls(max_depth=meta['max_depth'], **arrays)
+
+    @staticmethod
+    def read_metadata(path):
+        """Return the saved meta.json, or None if there is no complete export at ``path``."""
+        try:
+            with open(os.path.join(path, 'meta.json'), 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    @property
+    def n_nodes(self):
+        return len(self.feature)
+
+    def prefault(self):
+        """Read every page of the arrays, so a memory-mapped forest is resident before the first request."""
+        for name in ARRAY_NAMES:
+            np.asarray(getattr(self, name)).view(np.uint8).max()
+
+    def apply(self, X):
+        """Return the global leaf index reached by every row in every tree, shape (n, n_trees)."""
+        # sklearn scores float32 inputs; float32 -> float64 comparison is exact
+        X = np.ascontiguousarray(X, dtype=np.float32).astype(np.float64)
+        return self._apply_rows(X, self._root_nodes)
+
+    def _apply_rows(self, X, root_nodes):
+        # Keep rows x trees per block constant when only some of the trees are walked
+        block_rows = self.BLOCK_ROWS * self.n_trees // max(len(root_nodes), 1)
+        if len(X) <= block_rows:
+            return self._apply_block(X, root_nodes)
+        return np.concatenate([
+            self._apply_block(X[start:start + block_rows], root_nodes)
+            for start in range(0, len(X), block_rows)
+        ])
+
+    def _apply_block(self, X, root_nodes):
+        n_rows, n_features = X.shape
+        flat_X = X.ravel()
+        row_offset = (np.arange(n_rows, dtype=np.intp) * n_features)[:, None]
+
+        nodes = np.broadcast_to(root_nodes, (n_rows, len(root_nodes)))
+        for _ in range(self.max_depth):
+            values = flat_X.take(row_offset + self.feature.take(nodes))
+            go_right = values > self.threshold.take(nodes)
+            nodes = self.children.take(2 * nodes + go_right)
+        return nodes
+
+    def predict_proba(self, X):
+        """Return the class-1 probability of every row, identical to sklearn's predict_proba[:, 1]."""
+        leaf_values = self.value.take(self.apply(X))
+        # Sequential accumulation in tree order, as in ForestClassifier.predict_proba
+        total = np.cumsum(leaf_values, axis=1)[:, -1]
+        return total / self.n_trees
+
+    def leaf_value_range(self):
+        """Return the lowest and highest leaf value of every tree."""
+        leaf = self.children[0::2] == np.arange(self.n_nodes)
+        starts = np.asarray(self.roots, dtype=np.intp)
+        lowest = np.minimum.reduceat(np.where(leaf, self.value, np.inf), starts)
+        highest = np.maximum.reduceat(np.where(leaf, self.value, -np.inf), starts)
+        return lowest, highest
+
+    def _early_exit_bounds(self):
+        if self._exit_bounds is None:
+            lowest, highest = self.leaf_value_range()
+            zero = np.zeros(1)
+            # Prefix sums over trees [0, k) and suffix sums over trees [k, n_trees)
+            prefix_low = np.concatenate([zero, np.cumsum(lowest)])
+            prefix_high = np.concatenate([zero, np.cumsum(highest)])
+            suffix_low = prefix_low[-1] - prefix_low
+            suffix_high = prefix_high[-1] - prefix_high
+            self._exit_bounds = (prefix_low, prefix_high, suffix_low, suffix_high,
+                                 # Best case of every split point k for each outcome:
+                                 # maxima before k plus minima after it never decreases with k,
+                                 # minima before k plus maxima after it never increases
+                                 prefix_high + suffix_low, -(prefix_low + suffix_high))
+        return self._exit_bounds
+
+    def predict_proba_early_exit(self, X, threshold):
+        """Score against ``threshold`` evaluating only the trees each row needs.
+
+        Returns ``(probabilities, trees_evaluated)``. ``probabilities >= threshold``
+        is the exact full-forest decision for every row. Rows that needed every
+        tree get the exact probability; the others get the mean of the trees
+        evaluated, clipped to the range the remaining trees allow.
+        """
+        X = np.ascontiguousarray(X, dtype=np.float32).astype(np.float64)
+        prefix_low, prefix_high, suffix_low, suffix_high, block_reach, approve_reach = self._early_exit_bounds()
+        n_rows, n_trees = len(X), self.n_trees
+        # Decide in sum space with a margin far above the rounding error of the sums
+        margin = 1e-9 * n_trees
+        block_total = threshold * n_trees + margin
+        approve_total = threshold * n_trees - margin
+        if n_rows <= self.SCALAR_EXIT_ROWS:
+            return self._early_exit_rows(X, block_total, approve_total)
+
+        totals = np.zeros(n_rows)
+        trees_evaluated = np.zeros(n_rows, dtype=np.int64)
+        active = np.arange(n_rows)
+        evaluated = 0
+        while len(active):
+            partial = totals[active]
+            # Walk every active row up to the earliest point where one could settle on
+            # the outcome its running mean points to (APPROVE before any tree is seen)
+            likely_block = partial >= threshold * evaluated if evaluated else np.zeros(len(active), dtype=bool)
+            earliest = np.where(
+                likely_block,
+                np.searchsorted(block_reach, block_total - partial + prefix_high[evaluated], 'left'),
+                np.searchsorted(approve_reach, partial - prefix_low[evaluated] - approve_total, 'right'))
+            stop = min(max(int(earliest.min()), evaluated + self.EXIT_MIN_TREES), n_trees)
+
+            leaves = self._apply_rows(X[active], self._root_nodes[evaluated:stop])
+            # Continue the running sums in tree order, as full evaluation does
+            totals[active] = np.cumsum(np.column_stack([partial, self.value.take(leaves)]), axis=1)[:, -1]
+            trees_evaluated[active] = stop
+            evaluated = stop
+            if evaluated == n_trees:
+                break
+            partial = totals[active]
+            settled = ((partial + suffix_low[evaluated] >= block_total) |
+                       (partial + suffix_high[evaluated] < approve_total))
+            active = active[~settled]
+
+        lower = (totals + suffix_low[trees_evaluated]) / n_trees
+        upper = (totals + suffix_high[trees_evaluated]) / n_trees
+        probabilities = np.clip(totals / trees_evaluated, lower, upper)
+        complete = trees_evaluated == n_trees
+        probabilities[complete] = totals[complete] / n_trees
+        return probabilities, trees_evaluated
+
+    def _early_exit_rows(self, X, block_total, approve_total):
+        """``predict_proba_early_exit`` for a few rows: walk trees one at a time, checking after each."""
+        feature, threshold, left, right, value, roots, suffix_low, suffix_high = self._scalar_arrays()
+        n_trees = self.n_trees
+        probabilities = np.empty(len(X))
+        trees_evaluated = np.empty(len(X), dtype=np.int64)
+        for i, x in enumerate(X.tolist()):
+            total = 0.0
+            evaluated = 0
+            for node in roots:
+                child = left[node]
+                while child != node:
+                    node = right[node] if x[feature[node]] > threshold[node] else child
+                    child = left[node]
+                # Sequential sum in tree order, as full evaluation does
+                total += value[node]
+                evaluated += 1
+                if total + suffix_low[evaluated] >= block_total or total + suffix_high[evaluated] < approve_total:
+                    break
+            if evaluated == n_trees:
+                probabilities[i] = total / n_trees
+            else:
+                lower = (total + suffix_low[evaluated]) / n_trees
+                upper = (total + suffix_high[evaluated]) / n_trees
+                probabilities[i] = min(max(total / evaluated, lower), upper)
+            trees_evaluated[i] = evaluated
+        return probabilities, trees_evaluated
+
+    def _scalar_arrays(self):
+        """The node arrays and exit bounds as Python lists, built on the first per-row early exit."""
+        if self._scalar_nodes is None:
+            _, _, suffix_low, suffix_high, _, _ = self._early_exit_bounds()
+            children = np.asarray(self.children)
+            self._scalar_nodes = (
+                np.asarray(self.feature).tolist(), np.asarray(self.threshold).tolist(),
+                children[0::2].tolist(), children[1::2].tolist(), np.asarray(self.value).tolist(),
+                np.asarray(self.roots).tolist(), suffix_low.tolist(), suffix_high.tolist()
+            )
+        return self._scalar_nodes
+
+
+def _leaf_probabilities(value):
+    """Per-node class-1 probability as returned by DecisionTreeClassifier.predict_proba."""
+    sums = value.sum(axis=1)
+    if np.all(np.isclose(sums, 1.0) | (sums == 0)):
+        # sklearn >= 1.4 stores class fractions and returns them unchanged
+        return value[:, 1].copy()
+    # Older releases store weighted counts and normalize at prediction time
+    sums[sums == 0.0] = 1.0
+    return value[:, 1] / sums
+
+
+def model_fingerprint(model_path):
+    """SHA-256 of a model artifact's bytes, identifying the forest that derived artifacts belong to."""
+    digest = hashlib.sha256()
+    with open(model_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
@@ -0,0 +1,203 @@
+"""Live decision counters backing the scoring API's /stats endpoint.
+
+Counters are updated at decision time, so reading them is O(1) regardless of how
+much history the audit log holds. They are persisted as periodic snapshots; on
+restart the last snapshot is loaded and only the decisions logged after it are
+replayed.
+
+Every decision gets a sequence number (the running total), which scoring code
+stores in the audit record. The snapshot remembers the sequence number it
+covers; the audit segment indexes record each segment's sequence range, so
+replay opens only the segments holding later decisions, and records still
+queued in the audit writer when the snapshot was taken are not counted twice.
+
+On the first start after upgrading from the single-file prediction log there is
+neither a snapshot nor an audit segment; the counters are then seeded once from
+that legacy log and snapshotted straight away, so it is never read again.
+
+The counters live in an anonymous shared memory block guarded by a process-shared
+lock, so pre-forked scoring workers all update the same totals.
+"""
+import os
+import json
+import mmap
+import threading
+import logging
+import multiprocessing
+import numpy as np
+
+from src.audit_segments import iter_decisions
+
+logger = logging.getLogger(__name__)
+
+STATS_SNAPSHOT_PATH = 'reports/stats_snapshot.json'
+
+# One JSON decision per line, written by the scoring API before the audit segments
+LEGACY_PREDICTIONS_LOG = 'reports/realtime_predictions.log'
+
+# Equal-width fraud probability buckets: [0.0, 0.1), [0.1, 0.2), ..., [0.9, 1.0]
+N_PROBABILITY_BUCKETS = 10
+
+
+class LiveStats:
+    """Process-shared decision counters with a fraud probability histogram."""
+
+    def __init__(self, n_buckets=N_PROBABILITY_BUCKETS):
+        self.n_buckets = n_buckets
+        # Layout: [total, blocked, histogram bucket 0 .. n_buckets - 1]
+        self._buffer = mmap.mmap(-1, 8 * (2 + n_buckets))
+        self._counts = np.frombuffer(self._buffer, dtype=np.int64)
+        self._histogram = self._counts[2:]
+        self._lock = multiprocessing.Lock()
+
+    @property
+    def total(self):
+        return int(self._counts[0])
+
+    @property
+    def blocked(self):
+        return int(self._counts[1])
+
+    def _bucket(self, probability):
+        return min(int(probability * self.n_buckets), self.n_buckets - 1)
+
+    def record(self, probability, blocked):
+        """Count one decision and return its sequence number."""
+        bucket = self._bucket(probability)
+        with self._lock:
+            self._counts[0] += 1
+            self._counts[1] += int(blocked)
+            self._histogram[bucket] += 1
+            return int(self._counts[0])
+
+    def record_many(self, probabilities, blocked):
+        """Count a scored batch and return the sequence number of its first decision."""
+        probabilities = np.asarray(probabilities, dtype=np.float64)
+        buckets = np.minimum((probabilities * self.n_buckets).astype(np.int64), self.n_buckets - 1)
+        counts = np.bincount(buckets, minlength=self.n_buckets)
+        n_blocked = int(np.count_nonzero(blocked))
+        with self._lock:
+            first_seq = int(self._counts[0]) + 1
+            self._counts[0] += len(probabilities)
+            self._counts[1] += n_blocked
+            self._histogram += counts
+            return first_seq
+
+    def _read(self):
+        with self._lock:
+            return self.total, self.blocked, self._histogram.tolist()
+
+    def summary(self):
+        """Return the counters in the /stats response format."""
+        total, blocked, histogram = self._read()
+        width = 1.0 / self.n_buckets
+        return {
+            'total_predictions': total,
+            'blocked': blocked,
+            'approved': total - blocked,
+            'block_rate': blocked / total if total > 0 else 0,
+            'probability_histogram': [
+                {'lower': round(i * width, 6), 'upper': round((i + 1) * width, 6), 'count': count}
+                for i, count in enumerate(histogram)
+            ]
+        }
+
+    def save_snapshot(self, path):
+        """Atomically persist the counters together with the sequence number they cover."""
+        total, blocked, histogram = self._read()
+        snapshot = {
+            'seq': total,
+            'total': total,
+            'blocked': blocked,
+            'histogram': histogram
+        }
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # Per process: pre-forked workers snapshot the same counters concurrently
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(snapshot, f)
+        os.replace(tmp_path, path)
+        return snapshot
+
+    def restore(self, path, reader, legacy_log=None):
+        """Resume from the last snapshot plus a replay of the decisions logged after it.
+
+        ``reader`` is the AuditReader of the audit log. Without a snapshot or any audit
+        segment, the counters are seeded from ``legacy_log`` instead, if given. Returns the
+        number of replayed decisions.
+        """
+        snapshot = None
+        if os.path.exists(path):
+            try:
+                with open(path, 'r') as f:
+                    snapshot = json.load(f)
+            except (OSError, ValueError) as e:
+                logger.warning(f"Ignoring unreadable stats snapshot {path}: {e}")
+
+        seq = 0
+        if snapshot is not None and len(snapshot.get('histogram', [])) == self.n_buckets:
+            seq = snapshot['seq']
+            with self._lock:
+                self._counts[0] = snapshot['total']
+                self._counts[1] = snapshot['blocked']
+                self._histogram[:] = snapshot['histogram']
+
+        if snapshot is None and legacy_log is not None and not reader.segments():
+            return self._seed(path, legacy_log)
+
+        replayed = 0
+        for decision in reader.decisions(after_seq=seq):
+            self.record(decision['fraud_probability'], decision['decision'] == 'BLOCK')
+            replayed += 1
+        return replayed
+
+    def _seed(self, path, legacy_log):
+        """Count the decisions of the legacy prediction log and snapshot them."""
+        seeded = 0
+        try:
+            with open(legacy_log, 'r', errors='replace') as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        # Headers and text lines of the simulation log
+                        continue
+                    for decision in iter_decisions(record):
+                        self.record(decision['fraud_probability'], decision['decision'] == 'BLOCK')
+                        seeded += 1
+        except FileNotFoundError:
+            return 0
+        # Seed once: from now on the snapshot covers these decisions
+        self.save_snapshot(path)
+        logger.info(f"Seeded stats with {seeded} decisions from legacy log {legacy_log}")
+        return seeded
+
+
+class SnapshotWriter:
+    """Background thread that snapshots LiveStats every ``interval`` seconds.
+
+    With pre-forked workers each worker runs one over the shared counters.
+    """
+
+    def __init__(self, stats, path, interval=30.0):
+        self.stats = stats
+        self.path = path
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='stats-snapshot', daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.stats.save_snapshot(self.path)
+            except Exception as e:
+                logger.error(f"Stats snapshot failed: {e}")
+
+    def close(self):
+        """Stop the thread and write a final snapshot."""
+        self._stop.set()
+        self._thread.join(self.interval)
+        self.stats.save_snapshot(self.path)
@@ -0,0 +1,252 @@
+"""Prometheus-style request metrics for the scoring service.
+
+All series are fixed up front - endpoints, stages, status classes and histogram
+buckets - so every counter has a known slot in one shared memory block. Recording
+a request takes a single process-shared lock acquisition and a handful of array
+increments; pre-forked workers update the same block, so any worker can answer
+a scrape for the whole pool.
+
+Exposed series (text exposition format 0.0.4):
+
+* ``fraud_requests_total{endpoint, code}`` and ``fraud_request_errors_total{endpoint}``
+* ``fraud_request_duration_seconds{endpoint}`` - end-to-end handler latency
+* ``fraud_stage_duration_seconds{endpoint, stage}`` - parse, preprocess, predict, audit
+* ``fraud_batch_size{endpoint}`` - transactions per scoring request
+* ``fraud_trees_evaluated`` - trees walked per scored transaction (early-exit scoring;
+  with the cascade, transactions settled by the first stage fall in the ``le="0"`` bucket)
+* ``fraud_requests_shed_total{endpoint, reason}`` - requests answered by the fallback
+  rules under overload; the shed rate is its rate over ``fraud_requests_total``
+"""
+import os
+import mmap
+import time
+import bisect
+import multiprocessing
+import numpy as np
+
+from src.admission import SHED_REASONS
+
+# Requests over the Unix-socket binary protocol are labelled with this pseudo-endpoint
+BINARY_ENDPOINT = 'unix_socket'
+ENDPOINTS = ('/predict', '/batch_predict', '/stream_predict', '/health', '/stats', '/metrics', BINARY_ENDPOINT)
+STAGES = ('parse', 'preprocess', 'predict', 'audit')
+STATUS_CLASSES = ('2xx', '3xx', '4xx', '5xx')
+# Endpoints whose model calls go through admission control
+ADMISSION_ENDPOINTS = ('/predict', '/batch_predict', BINARY_ENDPOINT)
+
+# Histogram upper bounds; an implicit +Inf bucket follows
+LATENCY_BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+BATCH_SIZE_BUCKETS = (1, 10, 100, 1000, 10000, 100000)
+TREES_BUCKETS = (0, 10, 25, 50, 75, 100, 150, 200, 300, 500, 1000)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Fallback start time where /proc is not available
+_IMPORTED_AT = time.time()
+
+
+def process_start_time():
+    """Wall-clock time this process started, so startup covers interpreter start and imports.
+
+    Read from /proc (Linux, 10 ms resolution); elsewhere the time this module was imported.
+    """
+    try:
+        with open('/proc/self/stat') as f:
+            # Fields after the parenthesised command name; starttime is field 22
+            start_ticks = int(f.read().rsplit(')', 1)[1].split()[19])
+        with open('/proc/uptime') as f:
+            uptime = float(f.read().split()[0])
+        return time.time() - (uptime - start_ticks / os.sysconf('SC_CLK_TCK'))
+    except (OSError, ValueError, IndexError):
+        return _IMPORTED_AT
+
+
+class RequestTimer:
+    """Accumulate wall time per stage of one request with perf_counter_ns checkpoints.
+
+    Each mark also keeps the stage's ``(stage, start_ns, end_ns)`` span for request tracing.
+    """
+
+    __slots__ = ('start_ns', 'stages', 'spans', '_last')
+
+    def __init__(self):
+        self.start_ns = self._last = time.perf_counter_ns()
+        self.stages = {}
+        self.spans = []
+
+    @property
+    def start(self):
+        """Start of the request as a perf_counter time in seconds."""
+        return self.start_ns / 1e9
+
+    def mark(self, stage):
+        """Charge the time since the previous mark to ``stage``."""
+        now = time.perf_counter_ns()
+        self.stages[stage] = self.stages.get(stage, 0.0) + (now - self._last) / 1e9
+        self.spans.append((stage, self._last, now))
+        self._last = now
+
+    def skip(self):
+        """Start the next stage now without charging the elapsed time to any stage."""
+        self._last = time.perf_counter_ns()
+
+    def elapsed(self):
+        return (time.perf_counter_ns() - self.start_ns) / 1e9
+
+
+class _Histogram:
+    """Offsets of one fixed-bucket histogram in the shared array: buckets, +Inf, sum."""
+
+    __slots__ = ('offset', 'bounds', 'sum_slot', 'size')
+
+    def __init__(self, offset, bounds):
+        self.offset = offset
+        self.bounds = bounds
+        self.sum_slot = offset + len(bounds) + 1
+        self.size = len(bounds) + 2
+
+    def slot(self, value):
+        return self.offset + bisect.bisect_left(self.bounds, value)
+
+
+class ServiceMetrics:
+    """Process-shared request counters and histograms."""
+
+    def __init__(self):
+        offset = 0
+        self._requests = {}
+        for endpoint in ENDPOINTS:
+            for status_class in STATUS_CLASSES:
+                self._requests[endpoint, status_class] = offset
+                offset += 1
+        self._shed = {}
+        for endpoint in ADMISSION_ENDPOINTS:
+            for reason in SHED_REASONS:
+                self._shed[endpoint, reason] = offset
+                offset += 1
+
+        def histogram(bounds):
+            nonlocal offset
+            h = _Histogram(offset, bounds)
+            offset += h.size
+            return h
+
+        self._latency = {endpoint: histogram(LATENCY_BUCKETS) for endpoint in ENDPOINTS}
+        self._stages = {(endpoint, stage): histogram(LATENCY_BUCKETS) for endpoint in ENDPOINTS for stage in STAGES}
+        self._batch_sizes = {endpoint: histogram(BATCH_SIZE_BUCKETS) for endpoint in ENDPOINTS}
+        self._trees = histogram(TREES_BUCKETS)
+
+        self._buffer = mmap.mmap(-1, 8 * offset)
+        # Plain float slots for the hot path, a NumPy view for rendering
+        self._slots = memoryview(self._buffer).cast('d')
+        self._values = np.frombuffer(self._buffer, dtype=np.float64)
+        self._lock = multiprocessing.Lock()
+
+    def observe(self, endpoint, status, timer, batch_size=None):
+        """Record one finished request: status, total latency, stage latencies and batch size."""
+        elapsed = timer.elapsed()
+        status_class = f"{status // 100}xx"
+        if status_class not in STATUS_CLASSES:
+            status_class = '5xx'
+        latency = self._latency[endpoint]
+        updates = [(self._requests[endpoint, status_class], 1.0),
+                   (latency.slot(elapsed), 1.0), (latency.sum_slot, elapsed)]
+        for stage, seconds in timer.stages.items():
+            h = self._stages.get((endpoint, stage))
+            if h is None:
+                # Traced-only stages such as response encoding
+                continue
+            updates.append((h.slot(seconds), 1.0))
+            updates.append((h.sum_slot, seconds))
+        if batch_size is not None:
+            h = self._batch_sizes[endpoint]
+            updates.append((h.slot(batch_size), 1.0))
+            updates.append((h.sum_slot, float(batch_size)))
+
+        values = self._slots
+        with self._lock:
+            for slot, amount in updates:
+                values[slot] += amount
+
+    def observe_shed(self, endpoint, reason):
+        """Count one request shed by admission control."""
+        slot = self._shed[endpoint, reason]
+        with self._lock:
+            self._slots[slot] += 1.0
+
+    def observe_trees(self, trees_evaluated):
+        """Record how many trees were walked for each transaction of one model call."""
+        trees_evaluated = np.asarray(trees_evaluated).ravel()
+        h = self._trees
+        counts = np.bincount(np.searchsorted(h.bounds, trees_evaluated, 'left'), minlength=h.size - 1)
+        total = float(trees_evaluated.sum())
+        with self._lock:
+            self._values[h.offset:h.sum_slot] += counts
+            self._values[h.sum_slot] += total
+
+    def tree_tiers(self):
+        """Transactions scored without any tree (settled by the cascade's first stage) vs by the forest."""
+        h = self._trees
+        with self._lock:
+            counts = self._values[h.offset:h.sum_slot].copy()
+        total = float(counts.sum())
+        first_stage = float(counts[0])
+        return {
+            'transactions': int(total),
+            'first_stage': int(first_stage),
+            'forest': int(total - first_stage),
+            'first_stage_fraction': first_stage / total if total else 0.0
+        }
+
+    def render(self, extra=()):
+        """Return all series in Prometheus text format; ``extra`` lines are appended as-is."""
+        with self._lock:
+            values = self._values.copy()
+
+        lines = ['# HELP fraud_requests_total Requests handled, by endpoint and status class.',
+                 '# TYPE fraud_requests_total counter']
+        for (endpoint, status_class), slot in self._requests.items():
+            lines.append(f'fraud_requests_total{{endpoint="{endpoint}",code="{status_class}"}} {values[slot]:.0f}')
+
+        lines += ['# HELP fraud_request_errors_total Requests answered with a 4xx or 5xx status.',
+                  '# TYPE fraud_request_errors_total counter']
+        for endpoint in ENDPOINTS:
+            errors = values[self._requests[endpoint, '4xx']] + values[self._requests[endpoint, '5xx']]
+            lines.append(f'fraud_request_errors_total{{endpoint="{endpoint}"}} {errors:.0f}')
+
+        lines += ['# HELP fraud_requests_shed_total Requests answered by fallback rules instead of the model.',
+                  '# TYPE fraud_requests_shed_total counter']
+        for (endpoint, reason), slot in self._shed.items():
+            lines.append(f'fraud_requests_shed_total{{endpoint="{endpoint}",reason="{reason}"}} {values[slot]:.0f}')
+
+        lines += _render_histograms(
+            'fraud_request_duration_seconds', 'End-to-end handler latency.',
+            [(f'endpoint="{endpoint}"', h) for endpoint, h in self._latency.items()], values)
+        lines += _render_histograms(
+            'fraud_stage_duration_seconds', 'Latency of each request stage.',
+            [(f'endpoint="{endpoint}",stage="{stage}"', h) for (endpoint, stage), h in self._stages.items()
+             if values[h.offset:h.sum_slot].any()], values)
+        lines += _render_histograms(
+            'fraud_batch_size', 'Transactions per scoring request.',
+            [(f'endpoint="{endpoint}"', h) for endpoint, h in self._batch_sizes.items()
+             if values[h.offset:h.sum_slot].any()], values)
+        if values[self._trees.offset:self._trees.sum_slot].any():
+            lines += _render_histograms(
+                'fraud_trees_evaluated', 'Trees evaluated per scored transaction.',
+                [('', self._trees)], values)
+        lines.extend(extra)
+        return '\n'.join(lines) + '\n'
+
+
+def _render_histograms(name, help_text, series, values):
+    lines = [f'# HELP {name} {help_text}', f'# TYPE {name} histogram']
+    for labels, h in series:
+        cumulative = np.cumsum(values[h.offset:h.sum_slot])
+        bucket_labels = f'{labels},' if labels else ''
+        for bound, count in zip(h.bounds, cumulative):
+            lines.append(f'{name}_bucket{{{bucket_labels}le="{bound}"}} {count:.0f}')
+        lines.append(f'{name}_bucket{{{bucket_labels}le="+Inf"}} {cumulative[-1]:.0f}')
+        series_labels = f'{{{labels}}}' if labels else ''
+        lines.append(f'{name}_sum{series_labels} {float(values[h.sum_slot])!r}')
+        lines.append(f'{name}_count{series_labels} {cumulative[-1]:.0f}')
+    return lines
@@ -0,0 +1,131 @@
+"""Micro-batching request coalescer for single-transaction scoring.
+
+Concurrent single-row requests are collected for up to ``max_wait`` seconds or
+``max_batch`` rows, scored with one matrix call and the probabilities are fanned
+back out to the waiting requests. This trades a small fixed delay for far fewer
+model invocations under concurrent load.
+
+Rows may carry their own scoring function (for example the model version that
+vectorized them); a batch never mixes rows bound to different functions.
+"""
+import queue
+import threading
+import time
+import logging
+from concurrent.futures import Future
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+class MicroBatcher:
+    """Coalesce single feature rows into batched ``predict_fn`` calls."""
+
+    def __init__(self, predict_fn, n_features, max_batch=32, max_wait=0.002):
+        self.predict_fn = predict_fn
+        self.n_features = n_features
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._requests = 0
+        self._batches = 0
+        # batch_sizes[n] = number of model calls that scored n rows
+        self._batch_sizes = [0] * (max_batch + 1)
+
+        self._thread = threading.Thread(target=self._run, name='micro-batcher', daemon=True)
+        self._thread.start()
+
+    def submit(self, row, predict_fn=None):
+        """Queue one feature row and return a Future for its fraud probability.
+
+        ``predict_fn`` overrides the batcher's default scoring function for this row.
+        """
+        future = Future()
+        self._queue.put((row, future, predict_fn or self.predict_fn))
+        return future
+
+    def predict(self, row, predict_fn=None, timeout=None):
+        """Score one feature row, waiting for the batch it joins."""
+        return self.submit(row, predict_fn).result(timeout)
+
+    def close(self):
+        """Score anything still queued and stop the worker."""
+        self._queue.put(_STOP)
+        self._thread.join()
+
+    def stats(self):
+        """Return achieved batching metrics."""
+        with self._lock:
+            sizes = {n: count for n, count in enumerate(self._batch_sizes) if count}
+            requests, batches = self._requests, self._batches
+        return {
+            'max_batch': self.max_batch,
+            'max_wait_ms': self.max_wait * 1000,
+            'requests': requests,
+            'batches': batches,
+            'avg_batch_size': requests / batches if batches else 0,
+            'batch_size_counts': sizes
+        }
+
+    def _run(self):
+        X = np.empty((self.max_batch, self.n_features), dtype=np.float64)
+        item = None
+        while True:
+            if item is None:
+                item = self._queue.get()
+            if item is _STOP:
+                return
+            futures = []
+            predict_fn = item[2]
+            deadline = time.monotonic() + self.max_wait
+            stop = False
+            # Collect rows until the batch is full or the oldest request has waited max_wait
+            while True:
+                row, future, _ = item
+                X[len(futures)] = row
+                futures.append(future)
+                item = None
+                if len(futures) >= self.max_batch:
+                    break
+                remaining = deadline - time.monotonic()
+                try:
+                    item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    item, stop = None, True
+                    break
+                if item[2] != predict_fn:
+                    # Bound to another model: it starts the next batch
+                    break
+            self._score(predict_fn, X[:len(futures)], futures)
+            if stop:
+                # Score any stragglers queued before shutdown one by one
+                while True:
+                    try:
+                        item = self._queue.get_nowait()
+                    except queue.Empty:
+                        return
+                    if item is _STOP:
+                        continue
+                    row, future, row_predict_fn = item
+                    self._score(row_predict_fn, np.asarray(row, dtype=np.float64).reshape(1, -1), [future])
+
+    def _score(self, predict_fn, X, futures):
+        try:
+            probabilities = predict_fn(X)
+        except Exception as e:
+            logger.error(f"Micro-batch scoring failed for {len(futures)} rows: {e}")
+            for future in futures:
+                future.set_exception(e)
+            return
+        with self._lock:
+            self._requests += len(futures)
+            self._batches += 1
+            self._batch_sizes[len(futures)] += 1
+        for future, probability in zip(futures, probabilities.tolist()):
+            future.set_result(probability)
@@ -0,0 +1,38 @@
+"""Serial fast path for small inputs to a parallel sklearn forest.
+
+The training scripts fit the forest with ``n_jobs=-1`` and that setting is
+persisted in the artifact, so every ``predict_proba`` call - even for one row -
+spins up joblib's parallel backend across all cores. ``DispatchingModel`` keeps
+two shallow copies of the fitted forest that share the same trees: a serial one
+for small inputs and a parallel one, with a configurable worker count, for large
+batches.
+"""
+import copy
+
+# Inputs with fewer rows than this are scored serially
+SERIAL_MAX_ROWS = 256
+
+
+class DispatchingModel:
+    """Route ``predict_proba`` to a serial or parallel copy of a forest by input size."""
+
+    def __init__(self, model, serial_max_rows=SERIAL_MAX_ROWS, n_jobs=None):
+        self.model = model
+        self.serial_max_rows = serial_max_rows
+
+        # Shallow copies share estimators_, so no tree is duplicated in memory
+        self.serial_model = copy.copy(model)
+        self.serial_model.n_jobs = None
+        self.parallel_model = copy.copy(model)
+        if n_jobs is not None:
+            self.parallel_model.n_jobs = n_jobs
+
+    @property
+    def n_jobs(self):
+        return self.parallel_model.n_jobs
+
+    def predict_proba(self, X):
+        """Score ``X`` serially if it is small, otherwise with the parallel backend."""
+        if len(X) < self.serial_max_rows:
+            return self.serial_model.predict_proba(X)
+        return self.parallel_model.predict_proba(X)
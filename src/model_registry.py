@@ -0,0 +1,250 @@
+"""Versioned model registry with an atomic current-version pointer.
+
+Layout::
+
+    models/registry/
+        CURRENT.json                 pointer: current version plus rollback history
+        CHALLENGER.json              pointer: version shadow-scored against the current one
+        versions/v0001/
+            model.joblib             fitted forest
+            feature_schema.json      vectorizer schema
+            metadata.json            threshold, training metrics, creation time
+            model.flat/              memory-mapped flat forest export
+            model.frc                compact artifact (see src/compact_model.py)
+            cascade.json             optional first-stage model and band (see src/cascade.py)
+
+Versions are immutable once published: they are assembled in a temporary
+directory, renamed into place and made read-only. Promoting or rolling back only
+rewrites the pointer file (atomically), so serving processes that watch it can
+load the new version in the background and swap it in. The challenger pointer
+works the same way for shadow scoring (see src/shadow_scoring.py).
+"""
+import os
+import json
+import stat
+import shutil
+import threading
+import logging
+from datetime import datetime
+
+from src.compact_model import export_compact_model
+from src.feature_vectorizer import FeatureVectorizer
+from src.forest_engine import FlatForest
+
+logger = logging.getLogger(__name__)
+
+REGISTRY_DIR = 'models/registry'
+POINTER_FILE = 'CURRENT.json'
+CHALLENGER_FILE = 'CHALLENGER.json'
+
+MODEL_FILE = 'model.joblib'
+SCHEMA_FILE = 'feature_schema.json'
+METADATA_FILE = 'metadata.json'
+FLAT_DIR = 'model.flat'
+COMPACT_FILE = 'model.frc'
+CASCADE_FILE = 'cascade.json'
+
+
+class ModelRegistry:
+    """Publish, promote and roll back immutable model versions."""
+
+    def __init__(self, root=REGISTRY_DIR):
+        self.root = root
+        self.versions_dir = os.path.join(root, 'versions')
+        self.pointer_path = os.path.join(root, POINTER_FILE)
+        self.challenger_path = os.path.join(root, CHALLENGER_FILE)
+
+    def versions(self):
+        """Return all published versions, oldest first."""
+        if not os.path.isdir(self.versions_dir):
+            return []
+        return sorted(v for v in os.listdir(self.versions_dir) if v.startswith('v') and '.tmp' not in v)
+
+    def version_path(self, version):
+        return os.path.join(self.versions_dir, version)
+
+    def metadata(self, version):
+        with open(os.path.join(self.version_path(version), METADATA_FILE), 'r') as f:
+            return json.load(f)
+
+    def _read_pointer(self, path=None):
+        try:
+            with open(path or self.pointer_path, 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def current_version(self):
+        """Return the version the pointer designates, or None for an empty registry."""
+        pointer = self._read_pointer()
+        return pointer['version'] if pointer else None
+
+    def challenger_version(self):
+        """Return the version designated for shadow scoring, or None."""
+        pointer = self._read_pointer(self.challenger_path)
+        return pointer['version'] if pointer else None
+
+    def _write_pointer(self, version, history, path=None):
+        path = path or self.pointer_path
+        os.makedirs(self.root, exist_ok=True)
+        tmp_path = f"{path}.tmp-{os.getpid()}"
+        with open(tmp_path, 'w') as f:
+            json.dump({
+                'version': version,
+                'history': history,
+                'updated_at': datetime.utcnow().isoformat()
+            }, f, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+
+    def promote(self, version):
+        """Make ``version`` current, remembering the previous one for rollback."""
+        if version not in self.versions():
+            raise ValueError(f"Unknown model version: {version}")
+        pointer = self._read_pointer()
+        history = pointer['history'] if pointer else []
+        if pointer and pointer['version'] != version:
+            history = history + [pointer['version']]
+        self._write_pointer(version, history)
+        logger.info(f"Model registry: {version} is now current")
+        return version
+
+    def rollback(self):
+        """Point back at the previously current version and return it."""
+        pointer = self._read_pointer()
+        if not pointer or not pointer['history']:
+            raise ValueError("No previous model version to roll back to")
+        history = list(pointer['history'])
+        version = history.pop()
+        self._write_pointer(version, history)
+        logger.info(f"Model registry: rolled back from {pointer['version']} to {version}")
+        return version
+
+    def set_challenger(self, version):
+        """Shadow-score ``version`` against the current version; None stops shadow scoring."""
+        if version is not None and version not in self.versions():
+            raise ValueError(f"Unknown model version: {version}")
+        self._write_pointer(version, [], self.challenger_path)
+        logger.info(f"Model registry: challenger is {version or 'none'}")
+        return version
+
+    def publish(self, model_path, schema_path, threshold, metrics=None, model=None, notes=None, activate=True,
+                X_check=None, cascade_path=None):
+        """Copy a trained model into a new immutable version and optionally promote it.
+
+        ``model`` is the fitted estimator, if already in memory, used for the flat and
+        compact exports. ``X_check`` adds real rows to the compact export's verification.
+        ``cascade_path`` is the first-stage cascade artifact trained with the model, if any.
+        """
+        os.makedirs(self.versions_dir, exist_ok=True)
+        tmp_path = os.path.join(self.versions_dir, f".tmp-{os.getpid()}")
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        os.makedirs(tmp_path)
+
+        shutil.copy(model_path, os.path.join(tmp_path, MODEL_FILE))
+        shutil.copy(schema_path, os.path.join(tmp_path, SCHEMA_FILE))
+        if cascade_path is not None:
+            shutil.copy(cascade_path, os.path.join(tmp_path, CASCADE_FILE))
+        if model is None:
+            # Imported here: the serving process only reads the registry
+            import joblib
+            model = joblib.load(model_path)
+        # Export the flat forest up front so serving never writes into a published version
+        source = os.stat(os.path.join(tmp_path, MODEL_FILE))
+        FlatForest.from_sklearn(model).save(
+            os.path.join(tmp_path, FLAT_DIR),
+            source_path=MODEL_FILE,
+            source_mtime=source.st_mtime,
+            source_size=source.st_size,
+            feature_names=[str(name) for name in getattr(model, 'feature_names_in_', [])]
+        )
+        try:
+            compact = export_compact_model(
+                model, FeatureVectorizer.from_schema(schema_path).to_schema(), threshold,
+                os.path.join(tmp_path, COMPACT_FILE), X_check=X_check,
+                source_path=os.path.join(tmp_path, MODEL_FILE)
+            )
+        except ValueError as e:
+            # Serving falls back to the joblib model for this version
+            logger.warning(f"Compact export skipped: {e}")
+            compact = None
+
+        metadata = {
+            'threshold': threshold,
+            'metrics': metrics or {},
+            'created_at': datetime.utcnow().isoformat(),
+            'source_model': model_path,
+            'compact_verification': compact['verification'] if compact else None,
+            'notes': notes
+        }
+        with open(os.path.join(tmp_path, METADATA_FILE), 'w') as f:
+            json.dump(metadata, f, indent=2)
+        _make_read_only(tmp_path)
+
+        # Claim the next version number; rename fails if another publisher got there first
+        while True:
+            existing = self.versions()
+            number = int(existing[-1][1:]) + 1 if existing else 1
+            version = f"v{number:04d}"
+            try:
+                os.rename(tmp_path, self.version_path(version))
+                break
+            except OSError:
+                if not os.path.exists(self.version_path(version)):
+                    raise
+        logger.info(f"Model registry: published {version}")
+
+        if activate:
+            self.promote(version)
+        return version
+
+
+def _make_read_only(path):
+    for directory, _, files in os.walk(path):
+        for name in files:
+            file_path = os.path.join(directory, name)
+            os.chmod(file_path, os.stat(file_path).st_mode & ~(stat.S_IWUSR | stat.S_IWGRP | stat.S_IWOTH))
+
+
+class RegistryWatcher:
+    """Poll a registry pointer and call ``on_change(version)`` when it moves.
+
+    ``read`` returns the pointer's version (default: the current version). With
+    ``optional``, a cleared pointer is reported as ``on_change(None)``; otherwise
+    an empty registry is ignored.
+    """
+
+    def __init__(self, registry, on_change, current=None, interval=2.0, read=None, optional=False):
+        self.registry = registry
+        self.on_change = on_change
+        self.interval = interval
+        self.read = read or registry.current_version
+        self.optional = optional
+        self._current = current
+        self._failed = None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='registry-watcher', daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                version = self.read()
+            except Exception as e:
+                logger.error(f"Registry poll failed: {e}")
+                continue
+            if version is None and not self.optional or version == self._current or version == self._failed:
+                continue
+            try:
+                self.on_change(version)
+                self._current = version
+                self._failed = None
+            except Exception as e:
+                # Keep serving the current model; retry only once the pointer moves again
+                logger.error(f"Failed to load model version {version}: {e}")
+                self._failed = version
+
+    def close(self):
+        self._stop.set()
+        self._thread.join(self.interval)
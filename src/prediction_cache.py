@@ -0,0 +1,76 @@
+"""Bounded LRU + TTL cache of fraud probabilities for repeated transactions.
+
+Gateway retries and duplicate submissions resend identical payloads within
+seconds. Entries are keyed on the vectorized feature row - the canonical form of
+the payload, independent of key order, extra fields or the transaction id - plus
+the model version and decision threshold, so a model swap or threshold change
+can never serve a stale decision.
+"""
+import time
+import threading
+from collections import OrderedDict
+
+
+class PredictionCache:
+    """Thread-safe LRU cache with a per-entry time to live."""
+
+    def __init__(self, max_entries=10000, ttl=30.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()  # key -> (expires_at, probability)
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._expirations = 0
+
+    @staticmethod
+    def key(row, version, threshold):
+        """Cache key for one feature row scored by ``version`` at ``threshold``."""
+        # Adding 0.0 folds -0.0 into 0.0 so equal values give equal bytes
+        return version, threshold, (row + 0.0).tobytes()
+
+    def get(self, key):
+        """Return the cached probability for ``key``, or None."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._misses += 1
+                return None
+            if entry[0] <= now:
+                del self._entries[key]
+                self._expirations += 1
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return entry[1]
+
+    def put(self, key, probability):
+        expires_at = time.monotonic() + self.ttl
+        with self._lock:
+            self._entries[key] = (expires_at, probability)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+
+    def clear(self):
+        """Drop every entry, e.g. after a model swap."""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                'max_entries': self.max_entries,
+                'ttl_seconds': self.ttl,
+                'size': len(self._entries),
+                'hits': self._hits,
+                'misses': self._misses,
+                'hit_rate': self._hits / lookups if lookups else 0.0,
+                'evictions': self._evictions,
+                'expirations': self._expirations
+            }
@@ -0,0 +1,191 @@
+"""Pre-fork multi-process HTTP server for the scoring API.
+
+The master process binds the listening socket once, then forks ``workers``
+processes that each run a threaded WSGI server on the inherited socket, so the
+kernel spreads connections across them. The application (including the
+memory-mapped model arrays) is loaded in the master before forking, so workers
+share it instead of each holding its own copy.
+
+The master must not run background threads when it forks: a child inherits
+locks a thread happened to hold, but not the thread that would release them.
+``before_fork`` is called once before the first fork to stop them (workers
+start their own), and ``worker_exit`` runs in each worker after it has
+drained, in place of the exit hooks a worker skips by leaving with
+``os._exit``.
+
+Signals handled by the master:
+
+* SIGHUP - graceful rolling restart: each worker is replaced by a fresh one and
+  then asked to finish its in-flight requests and exit;
+* SIGTERM / SIGINT - graceful shutdown of all workers, then the master exits.
+
+A worker that dies unexpectedly is restarted automatically.
+"""
+import os
+import gc
+import time
+import signal
+import socket
+import logging
+import threading
+from werkzeug.serving import make_server
+
+logger = logging.getLogger(__name__)
+
+# Seconds a worker gets to finish in-flight requests before it is killed
+GRACEFUL_TIMEOUT = 30.0
+
+# Workers dying faster than this after spawning are restarted with a delay
+MIN_WORKER_LIFETIME = 1.0
+
+
+class PreforkServer:
+    """Supervise a fixed pool of forked WSGI worker processes."""
+
+    def __init__(self, app, host='0.0.0.0', port=5000, workers=4, graceful_timeout=GRACEFUL_TIMEOUT,
+                 before_fork=None, worker_exit=None):
+        self.app = app
+        self.host = host
+        self.port = port
+        self.n_workers = workers
+        self.graceful_timeout = graceful_timeout
+        self.before_fork = before_fork
+        self.worker_exit = worker_exit
+
+        self.socket = None
+        self.workers = {}  # pid -> (worker index, start time)
+        self._stopping = False
+        self._reload_requested = False
+
+    def run(self):
+        """Bind, fork the workers and supervise them until shutdown."""
+        self.socket = socket.create_server((self.host, self.port), backlog=2048)
+        self.socket.set_inheritable(True)
+        logger.info(f"Master {os.getpid()} listening on {self.host}:{self.port} with {self.n_workers} workers")
+
+        signal.signal(signal.SIGTERM, self._handle_stop)
+        signal.signal(signal.SIGINT, self._handle_stop)
+        signal.signal(signal.SIGHUP, self._handle_reload)
+
+        if self.before_fork is not None:
+            self.before_fork()
+        # Keep the garbage collector from touching (and un-sharing) objects loaded before the fork
+        gc.freeze()
+        for index in range(self.n_workers):
+            self._spawn(index)
+
+        try:
+            while not self._stopping:
+                if self._reload_requested:
+                    self._reload_requested = False
+                    self._rolling_restart()
+                self._reap(respawn=True)
+                time.sleep(0.2)
+        finally:
+            self._stop_workers(list(self.workers))
+            self.socket.close()
+        logger.info("Master stopped")
+
+    def _handle_stop(self, signum, frame):
+        self._stopping = True
+
+    def _handle_reload(self, signum, frame):
+        self._reload_requested = True
+
+    def _spawn(self, index):
+        pid = os.fork()
+        if pid == 0:
+            code = 0
+            try:
+                self._worker_main(index)
+            except BaseException as e:
+                logger.error(f"Worker {index} crashed: {e}")
+                code = 1
+            finally:
+                # Shut the application down (audit flush) but never return into the master loop
+                if self.worker_exit is not None:
+                    try:
+                        self.worker_exit()
+                    except Exception as e:
+                        logger.error(f"Worker {index} shutdown failed: {e}")
+                        code = 1
+                os._exit(code)
+        self.workers[pid] = (index, time.monotonic())
+        logger.info(f"Started worker {index} (pid {pid})")
+        return pid
+
+    def _worker_main(self, index):
+        signal.signal(signal.SIGHUP, signal.SIG_IGN)
+        # Ctrl-C reaches the whole process group; let the master coordinate shutdown
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+        server = make_server(self.host, self.port, self.app, threaded=True, fd=self.socket.fileno())
+        # Let in-flight requests finish when the worker shuts down
+        server.daemon_threads = False
+        server.block_on_close = True
+
+        def stop(signum, frame):
+            threading.Thread(target=server.shutdown, daemon=True).start()
+
+        signal.signal(signal.SIGTERM, stop)
+        server.serve_forever()
+        server.server_close()
+
+    def _reap(self, respawn):
+        """Collect exited workers and optionally replace them."""
+        while self.workers:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if pid == 0:
+                return
+            if pid not in self.workers:
+                continue
+            index, started = self.workers.pop(pid)
+            if respawn and not self._stopping:
+                logger.warning(f"Worker {index} (pid {pid}) exited with status {status}, restarting")
+                if time.monotonic() - started < MIN_WORKER_LIFETIME:
+                    time.sleep(MIN_WORKER_LIFETIME)
+                self._spawn(index)
+
+    def _rolling_restart(self):
+        """Replace workers one at a time so the pool never stops accepting."""
+        logger.info("Rolling restart of workers")
+        for pid, (index, _) in list(self.workers.items()):
+            self._spawn(index)
+            self._stop_workers([pid])
+
+    def _stop_workers(self, pids):
+        """Ask workers to exit gracefully, killing any that outlive the timeout."""
+        for pid in pids:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        deadline = time.monotonic() + self.graceful_timeout
+        remaining = set(pids)
+        while remaining and time.monotonic() < deadline:
+            for pid in list(remaining):
+                try:
+                    done, _ = os.waitpid(pid, os.WNOHANG)
+                except ChildProcessError:
+                    done = pid
+                if done:
+                    remaining.discard(pid)
+                    self.workers.pop(pid, None)
+            time.sleep(0.05)
+        for pid in remaining:
+            logger.warning(f"Worker pid {pid} did not stop in {self.graceful_timeout}s, killing")
+            try:
+                os.kill(pid, signal.SIGKILL)
+                os.waitpid(pid, 0)
+            except (ProcessLookupError, ChildProcessError):
+                pass
+            self.workers.pop(pid, None)
+
+
+def serve(app, host='0.0.0.0', port=5000, workers=4, graceful_timeout=GRACEFUL_TIMEOUT, before_fork=None,
+          worker_exit=None):
+    """Run ``app`` under a pre-fork master until it receives SIGTERM or SIGINT."""
+    PreforkServer(app, host, port, workers, graceful_timeout, before_fork, worker_exit).run()
@@ -0,0 +1,220 @@
+"""Schema-compiled validation of transaction payloads.
+
+Each model feature is declared once - type, range, allowed categories, default -
+and the declarations are compiled into a single generated Python function per
+schema. The generated code checks every field inline, writes valid values
+straight into the caller's feature-matrix row and only leaves the fast path to
+build an error message, so a valid transaction costs about a microsecond and
+an invalid one reports every bad field, not just the first.
+
+Field types:
+
+* ``number``   - int or float, finite, within ``min``/``max``
+* ``integer``  - an int, or a float with an integral value, within ``min``/``max``
+* ``boolean``  - true/false or 0/1
+* ``category`` - one of the training labels; ``"unknown": "encode"`` maps other
+  labels to the unknown-category code instead of rejecting them
+
+Any field may have a ``default`` used when it is absent from the payload.
+Booleans are not accepted as numbers, and numeric strings are not accepted.
+"""
+import math
+import numbers
+import numpy as np
+
+# Declared fields of the transaction features the models are trained on
+TRANSACTION_FIELDS = {
+    'amount': {'type': 'number', 'min': 0},
+    'transaction_hour': {'type': 'integer', 'min': 0, 'max': 23},
+    'foreign_transaction': {'type': 'boolean', 'default': 0},
+    'location_mismatch': {'type': 'boolean', 'default': 0},
+    'device_trust_score': {'type': 'number', 'min': 0, 'max': 100},
+    'velocity_last_24h': {'type': 'integer', 'min': 0},
+    'cardholder_age': {'type': 'integer', 'min': 18, 'max': 120},
+    'merchant_category': {'type': 'category'}
+}
+
+FIELD_TYPES = ('number', 'integer', 'boolean', 'category')
+
+_MISSING = object()
+
+# Ints up to this magnitude convert to float64 exactly; larger ones take the slow
+# path, which rejects those too large for float64 instead of raising OverflowError
+_EXACT_INT = 2 ** 53
+
+
+class ValidationError(ValueError):
+    """A transaction failed validation; ``field_errors`` maps each bad field to its message."""
+
+    def __init__(self, field_errors):
+        self.field_errors = field_errors
+        super().__init__(format_errors(field_errors))
+
+
+def format_errors(field_errors):
+    return '; '.join(f"{name}: {message}" for name, message in field_errors.items())
+
+
+def default_fields(features, categorical):
+    """Fields for a schema without declarations: finite numbers and any category label."""
+    return {
+        name: {'type': 'category', 'unknown': 'encode'} if name in categorical else {'type': 'number'}
+        for name in features
+    }
+
+
+class FieldSpec:
+    """One declared field: the checks compiled inline, plus the slow path that explains failures."""
+
+    def __init__(self, name, spec, classes=None, unknown_code=-1):
+        self.name = name
+        self.type = spec.get('type', 'number')
+        if self.type not in FIELD_TYPES:
+            raise ValueError(f"Field '{name}' has unknown type {self.type!r}")
+        self.min = spec.get('min')
+        self.max = spec.get('max')
+        self.default = spec.get('default', _MISSING)
+        self.encode_unknown = spec.get('unknown', 'reject') == 'encode'
+        self.unknown_code = unknown_code
+        self.codes = {label: code for code, label in enumerate(classes or [])}
+
+    @property
+    def has_default(self):
+        return self.default is not _MISSING
+
+    def to_dict(self):
+        spec = {'type': self.type}
+        if self.min is not None:
+            spec['min'] = self.min
+        if self.max is not None:
+            spec['max'] = self.max
+        if self.has_default:
+            spec['default'] = self.default
+        if self.type == 'category' and self.encode_unknown:
+            spec['unknown'] = 'encode'
+        return spec
+
+    def _range_condition(self, var):
+        """Python source of the bounds check on ``var``, or None without bounds."""
+        terms = []
+        if self.min is not None:
+            terms.append(f"{var} >= {float(self.min)!r}")
+        if self.max is not None:
+            terms.append(f"{var} <= {float(self.max)!r}")
+        return ' and '.join(terms) or None
+
+    def fast_condition(self, var):
+        """Python source that is true when ``var`` is valid in its most common form."""
+        in_range = self._range_condition(var)
+        exact_int = f"t is int and {-_EXACT_INT} <= {var} <= {_EXACT_INT}"
+        if self.type == 'number':
+            # v - v == 0 rejects NaN and infinities
+            check = f"(t is float and {var} - {var} == 0 or {exact_int})"
+        elif self.type == 'integer':
+            check = exact_int
+        elif self.type == 'boolean':
+            return f"({var} is True or {var} is False or ((t is int or t is float) and ({var} == 0 or {var} == 1)))"
+        else:
+            raise ValueError("Categories are compiled as a dictionary lookup")
+        return f"{check} and {in_range}" if in_range else check
+
+    def coerce(self, value):
+        """Return ``(float value, None)`` or ``(None, message)`` for any input form (slow path)."""
+        if value is _MISSING:
+            return None, 'is required'
+        if isinstance(value, np.generic):
+            # NumPy scalars (columnar input, in-process callers) report as plain Python values
+            value = value.item()
+        if self.type == 'category':
+            try:
+                code = self.codes.get(value)
+            except TypeError:
+                return None, f"must be a category label, got {value!r}"
+            if code is not None:
+                return float(code), None
+            if self.encode_unknown:
+                return float(self.unknown_code), None
+            if not isinstance(value, str):
+                return None, f"must be a category label, got {value!r}"
+            return None, f"{value!r} is not one of {', '.join(map(str, self.codes))}"
+        if self.type == 'boolean':
+            if isinstance(value, (bool, np.bool_)) or (isinstance(value, numbers.Real) and value in (0, 1)):
+                return float(value), None
+            return None, f"must be true/false or 0/1, got {value!r}"
+
+        if isinstance(value, (bool, np.bool_)) or not isinstance(value, numbers.Real):
+            return None, f"must be {'an integer' if self.type == 'integer' else 'a number'}, got {value!r}"
+        try:
+            number = float(value)
+        except OverflowError:
+            return None, f"must be finite, got {value!r}"
+        if not math.isfinite(number):
+            return None, f"must be finite, got {value!r}"
+        if self.type == 'integer' and not number.is_integer():
+            return None, f"must be an integer, got {value!r}"
+        if self.min is not None and number < self.min:
+            return None, f"must be >= {self.min}, got {value!r}"
+        if self.max is not None and number > self.max:
+            return None, f"must be <= {self.max}, got {value!r}"
+        return number, None
+
+    def invalid_mask(self, column):
+        """Rows of an encoded float column that violate this field (vectorized)."""
+        if self.type == 'category':
+            if self.encode_unknown:
+                return np.zeros(len(column), dtype=bool)
+            return column == self.unknown_code
+        invalid = ~np.isfinite(column)
+        if self.type == 'integer':
+            invalid |= column != np.round(column)
+        elif self.type == 'boolean':
+            invalid |= (column != 0) & (column != 1)
+        if self.min is not None:
+            invalid |= column < self.min
+        if self.max is not None:
+            invalid |= column > self.max
+        return invalid
+
+
+def compile_validator(specs):
+    """Generate ``encode(record, out)`` for a list of FieldSpecs in feature-column order.
+
+    ``encode`` writes every valid field into ``out`` and returns None, or a dict of
+    field name to error message for the fields that failed.
+    """
+    namespace = {'_MISSING': _MISSING}
+    lines = ['def encode(record, out):', '    errors = None', '    get = record.get']
+    for i, spec in enumerate(specs):
+        namespace[f'spec_{i}'] = spec
+        default = '_MISSING'
+        if spec.has_default:
+            namespace[f'default_{i}'] = spec.default
+            default = f'default_{i}'
+        lines.append(f"    v = get({spec.name!r}, {default})")
+        if spec.type == 'category':
+            namespace[f'codes_{i}'] = spec.codes
+            # Only exact str labels take the fast path; anything else is explained below
+            lines += [
+                f"    code = codes_{i}.get(v) if v.__class__ is str else None",
+                "    if code is not None:",
+                f"        out[{i}] = code",
+            ]
+        else:
+            lines += [
+                "    t = v.__class__",
+                f"    if {spec.fast_condition('v')}:",
+                f"        out[{i}] = v",
+            ]
+        lines += [
+            "    else:",
+            f"        value, message = spec_{i}.coerce(v)",
+            "        if message is None:",
+            f"            out[{i}] = value",
+            "        else:",
+            "            if errors is None:",
+            "                errors = {}",
+            f"            errors[{spec.name!r}] = message",
+        ]
+    lines.append('    return errors')
+    exec(compile('\n'.join(lines), '<compiled transaction validator>', 'exec'), namespace)
+    return namespace['encode']
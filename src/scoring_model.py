@@ -0,0 +1,245 @@
+"""A loaded model version, ready to score.
+
+``ScoringModel`` bundles everything a request needs from one model version: the
+feature vectorizer, the inference engine and the decision threshold. The scoring
+API holds a single reference to the active bundle and requests read it once, so
+a new version is swapped in by replacing that reference and a request never
+mixes two versions.
+"""
+import os
+import logging
+import numpy as np
+
+from src.compact_model import CompactForest, export_compact_model
+from src.fallback_rules import RuleFallback
+from src.feature_vectorizer import FeatureVectorizer
+from src.forest_engine import FlatForest, model_fingerprint
+from src.model_dispatch import DispatchingModel, SERIAL_MAX_ROWS
+
+logger = logging.getLogger(__name__)
+
+# Smallest input scored with the vectorized early exit; below it the extra tree passes cost
+# more than they save. Inputs of up to FlatForest.SCALAR_EXIT_ROWS rows (a single /predict)
+# take the per-row early exit instead (see scripts/benchmark_inference.py)
+EARLY_EXIT_MIN_ROWS = 256
+
+# Synthetic transactions scored by warm_up before a version serves traffic
+WARM_UP_ROWS = 256
+
+
+def unpickle_model(model_path):
+    """Load a joblib model; joblib and sklearn are imported on first use, not at startup."""
+    import joblib
+    return joblib.load(model_path)
+
+
+def flat_export_is_current(meta, model_path):
+    """True if a flat export's metadata matches ``model_path`` and records the feature order."""
+    source = os.stat(model_path)
+    return (meta is not None and 'feature_names' in meta
+            and meta.get('source_mtime') == source.st_mtime and meta.get('source_size') == source.st_size)
+
+
+def load_flat_forest(model, model_path, flat_path):
+    """Memory-map the flat forest export of ``model_path``, re-exporting it if missing or stale."""
+    if not flat_export_is_current(FlatForest.read_metadata(flat_path), model_path):
+        source = os.stat(model_path)
+        FlatForest.from_sklearn(model).save(
+            flat_path,
+            source_path=model_path,
+            source_mtime=source.st_mtime,
+            source_size=source.st_size,
+            feature_names=[str(name) for name in getattr(model, 'feature_names_in_', [])]
+        )
+        logger.info(f"✓ Flat forest exported to {flat_path}")
+    return FlatForest.load(flat_path, mmap=True)
+
+
+def load_compact_forest(model_path, schema_path, threshold, compact_path):
+    """Map the compact artifact of ``model_path``, re-exporting it if missing or stale.
+
+    Only the header is read to check staleness - against the model file and the
+    schema embedded from ``schema_path`` - so an up-to-date artifact loads without
+    unpickling the joblib model.
+    """
+    source = os.stat(model_path)
+    meta = CompactForest.read_metadata(compact_path)
+    vectorizer = FeatureVectorizer.from_schema(schema_path)
+    if (meta is None or meta.get('source_mtime') != source.st_mtime or meta.get('source_size') != source.st_size
+            or 'source_sha256' not in meta or meta.get('schema') != vectorizer.to_schema()):
+        export_compact_model(unpickle_model(model_path), vectorizer.to_schema(), threshold, compact_path,
+                             source_path=model_path)
+        logger.info(f"✓ Compact model exported to {compact_path}")
+    return CompactForest.load(compact_path)
+
+
+class ScoringModel:
+    """One servable model version: vectorizer, engine and threshold.
+
+    ``model`` (the sklearn forest) is None when serving from a compact artifact. A
+    version loaded lazily from its flat export unpickles ``model_path`` on first
+    access to ``model`` instead.
+    """
+
+    def __init__(self, version, model, vectorizer, threshold, flat_forest=None,
+                 serial_max_rows=SERIAL_MAX_ROWS, n_jobs=None, metadata=None,
+                 early_exit=False, early_exit_min_rows=EARLY_EXIT_MIN_ROWS, compact_forest=None,
+                 model_path=None, cascade=None):
+        self.version = version
+        self._model = model
+        self.model_path = model_path
+        self.vectorizer = vectorizer
+        self.threshold = threshold
+        # Rules answering requests shed under overload; None if the schema lacks their features
+        self.fallback = RuleFallback.for_features(vectorizer.features)
+        self.flat_forest = flat_forest
+        self.compact_forest = compact_forest
+        self.metadata = metadata or {}
+        self.serial_max_rows = serial_max_rows
+        self.n_jobs = n_jobs
+        self._dispatching_model = None
+        # Early exit needs the flat engine's per-tree walk
+        self.early_exit = early_exit and flat_forest is not None
+        self.early_exit_min_rows = early_exit_min_rows
+        # Optional first-stage model settling confident rows before the forest (see src/cascade.py)
+        self.cascade = cascade
+
+    @classmethod
+    def load(cls, model_path, schema_path, flat_path, threshold, version, engine='flat',
+             serial_max_rows=SERIAL_MAX_ROWS, n_jobs=None, metadata=None,
+             early_exit=False, early_exit_min_rows=EARLY_EXIT_MIN_ROWS, lazy=False):
+        """Load a model artifact and its schema; the flat engine falls back to sklearn on failure.
+
+        With ``lazy`` and an up-to-date flat export, the flat forest is mapped and the
+        joblib model is not unpickled (nor sklearn imported) until something needs it.
+        """
+        if lazy and engine == 'flat':
+            meta = FlatForest.read_metadata(flat_path)
+            if flat_export_is_current(meta, model_path):
+                vectorizer = FeatureVectorizer.from_schema(schema_path)
+                if meta['feature_names'] and meta['feature_names'] != vectorizer.features:
+                    raise ValueError(f"Model feature order {meta['feature_names']} does not match schema"
+                                     f" {vectorizer.features}")
+                return cls(version, None, vectorizer, threshold, FlatForest.load(flat_path, mmap=True),
+                           serial_max_rows, n_jobs, metadata, early_exit, early_exit_min_rows,
+                           model_path=model_path)
+            logger.info(f"Flat export {flat_path} is missing or stale, loading {model_path}")
+
+        model = unpickle_model(model_path)
+        vectorizer = FeatureVectorizer.from_schema(schema_path)
+        vectorizer.check_model(model)
+
+        flat_forest = None
+        if engine == 'flat':
+            try:
+                flat_forest = load_flat_forest(model, model_path, flat_path)
+            except Exception as e:
+                logger.warning(f"Flat forest export failed, using sklearn predict_proba: {e}")
+        return cls(version, model, vectorizer, threshold, flat_forest, serial_max_rows, n_jobs, metadata,
+                   early_exit, early_exit_min_rows, model_path=model_path)
+
+    @classmethod
+    def load_compact(cls, compact_path, version, threshold=None, metadata=None, model_path=None, schema_path=None):
+        """Serve a compact artifact on its own: schema and (unless given) threshold come from its header.
+
+        With ``model_path`` and ``schema_path`` the artifact is re-exported first if it is missing or stale.
+        """
+        if model_path is not None:
+            compact_forest = load_compact_forest(model_path, schema_path, threshold, compact_path)
+        else:
+            compact_forest = CompactForest.load(compact_path)
+        vectorizer = FeatureVectorizer.from_dict(compact_forest.schema)
+        if threshold is None:
+            threshold = compact_forest.threshold_value
+        return cls(version, None, vectorizer, threshold, metadata=metadata, compact_forest=compact_forest)
+
+    @property
+    def model(self):
+        """The sklearn forest, unpickled on first access if the version was loaded lazily."""
+        if self._model is None and self.model_path is not None:
+            model = unpickle_model(self.model_path)
+            self.vectorizer.check_model(model)
+            self._model = model
+        return self._model
+
+    @property
+    def dispatching_model(self):
+        if self._dispatching_model is None and self.model is not None:
+            self._dispatching_model = DispatchingModel(self.model, self.serial_max_rows, self.n_jobs)
+        return self._dispatching_model
+
+    @property
+    def engine(self):
+        if self.compact_forest is not None:
+            return 'compact'
+        return 'flat' if self.flat_forest is not None else 'sklearn'
+
+    @property
+    def fingerprint(self):
+        """SHA-256 of the joblib artifact this version was built from, or None if unknown."""
+        if self.compact_forest is not None:
+            return self.compact_forest.metadata.get('source_sha256')
+        if self.model_path is not None:
+            return model_fingerprint(self.model_path)
+        return None
+
+    @property
+    def partial_scoring(self):
+        """True if rows may be scored with fewer than all trees (early exit or cascade)."""
+        return self.early_exit or self.cascade is not None
+
+    @property
+    def n_trees(self):
+        if self.compact_forest is not None:
+            return self.compact_forest.n_trees
+        if self.flat_forest is not None:
+            return self.flat_forest.n_trees
+        return len(self.model.estimators_)
+
+    def predict_probabilities(self, X):
+        """Return the fraud probability for every row of a feature matrix.
+
+        Exact for the flat and sklearn engines; the compact engine is within
+        the tolerance verified when it was exported.
+        """
+        if self.compact_forest is not None:
+            return self.compact_forest.predict_proba(X)
+        if self.flat_forest is not None:
+            return self.flat_forest.predict_proba(X)
+        return self.dispatching_model.predict_proba(X)[:, 1]
+
+    def score(self, X):
+        """Return ``(probabilities, trees_evaluated)`` for the decision against ``threshold``.
+
+        With a cascade, rows the first stage settles skip the forest (0 trees) and
+        report a probability on the correct side of the threshold. With early exit,
+        single rows and inputs of at least ``early_exit_min_rows`` rows stop walking
+        trees once each row's decision is settled; their probabilities are then
+        estimates on the correct side of the threshold. Small batches in between,
+        where the extra passes cost more than the trees they skip, are evaluated in full.
+        """
+        if self.cascade is not None:
+            return self.cascade.score(X, self._score_forest, self.threshold)
+        return self._score_forest(X)
+
+    def _score_forest(self, X):
+        if self.early_exit and (len(X) <= self.flat_forest.SCALAR_EXIT_ROWS or len(X) >= self.early_exit_min_rows):
+            return self.flat_forest.predict_proba_early_exit(X, self.threshold)
+        return self.predict_probabilities(X), np.full(len(X), self.n_trees)
+
+    def warm_up(self, n_rows=WARM_UP_ROWS):
+        """Run synthetic transactions through vectorizing and scoring before serving traffic.
+
+        Faults in every page of a memory-mapped forest and exercises the single-row
+        and batch paths (and early exit), so page faults and lazy setup do not land
+        on the first requests.
+        """
+        forest = self.compact_forest if self.compact_forest is not None else self.flat_forest
+        if forest is not None:
+            forest.prefault()
+        records = self.vectorizer.synthetic_records(n_rows)
+        self.score(self.vectorizer.transform(records[0]))
+        X, _, _ = self.vectorizer.transform_batch(records)
+        self.score(X)
+        if self.early_exit:
+            self.flat_forest.predict_proba_early_exit(X, self.threshold)
@@ -0,0 +1,1065 @@
+"""Transport-independent core of the real-time scoring service.
+
+``ScoringService`` owns the serving state - the model registry and active model
+version, the live decision counters and the background audit writer - and
+implements the request contract of ``/health``, ``/predict``, ``/batch_predict``,
+``/stream_predict``, ``/stats`` and ``/metrics`` on already-parsed payloads. Each handler
+returns a ``(body, status)`` pair (streams yield NDJSON bytes, and columnar
+batches return encoded bytes with their content type), so the Flask app (``scripts/scoring_api.py``) and the
+asyncio app (``scripts/scoring_asgi.py``) are thin adapters over the same code. Binary frames from the
+Unix-socket listener (``src/binary_server.py``) are answered by ``predict_binary``.
+
+Configuration is read from environment variables with the defaults below.
+"""
+import os
+import json
+import time
+import logging
+import warnings
+from datetime import datetime
+import numpy as np
+
+from src import binary_protocol, columnar_codec
+from src.columnar_codec import DictionaryColumn
+from src.feature_vectorizer import FEATURE_SCHEMA_PATH
+from src.request_validator import ValidationError
+from src.admission import AdmissionController
+from src.audit_logger import AuditLogger
+from src.audit_segments import SegmentedLog, AuditReader, AUDIT_DIR
+from src.live_stats import LiveStats, SnapshotWriter, STATS_SNAPSHOT_PATH, LEGACY_PREDICTIONS_LOG
+from src.metrics import ServiceMetrics, RequestTimer, process_start_time, BINARY_ENDPOINT
+from src.micro_batcher import MicroBatcher
+from src.tracing import Tracer
+from src.prediction_cache import PredictionCache
+from src.shadow_scoring import ShadowScorer
+from src.model_dispatch import SERIAL_MAX_ROWS
+from src.model_registry import (
+    ModelRegistry, RegistryWatcher, REGISTRY_DIR, MODEL_FILE, SCHEMA_FILE, FLAT_DIR, COMPACT_FILE, CASCADE_FILE
+)
+from src.scoring_model import ScoringModel, EARLY_EXIT_MIN_ROWS
+from src.cascade import Cascade
+
+logger = logging.getLogger(__name__)
+
+# Configuration
+MODEL_PATH = 'models/baseline_model.joblib'
+OPTIMAL_THRESHOLD = 0.29
+
+# Versioned model registry; MODEL_PATH is only used while the registry is empty.
+# The current-version pointer is polled and new versions are swapped in live.
+MODEL_REGISTRY_DIR = os.environ.get('MODEL_REGISTRY_DIR', REGISTRY_DIR)
+MODEL_WATCH_INTERVAL = float(os.environ.get('MODEL_WATCH_INTERVAL', 2.0))
+
+# Inference engine: 'flat' (exported array forest), 'compact' (memory-mapped compact
+# artifact, loaded without unpickling the model) or 'sklearn' (predict_proba)
+SCORING_ENGINE = os.environ.get('SCORING_ENGINE', 'flat')
+
+# Flat forest export, memory-mapped so pre-forked workers share one copy in the page cache
+FLAT_MODEL_PATH = 'models/baseline_model.flat'
+
+# Compact artifact of MODEL_PATH, used by the 'compact' engine while the registry is empty
+COMPACT_MODEL_PATH = 'models/baseline_model.frc'
+
+# Fast startup: the flat engine maps its up-to-date export without unpickling the joblib
+# model (or importing sklearn); the model is only loaded if something needs it later
+SCORING_FAST_STARTUP = os.environ.get('SCORING_FAST_STARTUP', '0') == '1'
+
+# sklearn engine: inputs below SCORING_SERIAL_MAX_ROWS skip joblib dispatch,
+# larger batches use SCORING_N_JOBS workers (unset = the artifact's n_jobs)
+SCORING_SERIAL_MAX_ROWS = int(os.environ.get('SCORING_SERIAL_MAX_ROWS', SERIAL_MAX_ROWS))
+SCORING_N_JOBS = int(os.environ['SCORING_N_JOBS']) if os.environ.get('SCORING_N_JOBS') else None
+
+# Optional early-exit scoring (flat engine): stop walking trees once the decision is
+# settled. Early-exited probabilities are estimates on the right side of the threshold.
+# Single transactions exit on a per-row walk; batches of more than two rows but fewer than
+# SCORING_EARLY_EXIT_MIN_ROWS are evaluated in full, which is faster at that size
+SCORING_EARLY_EXIT = os.environ.get('SCORING_EARLY_EXIT', '0') == '1'
+SCORING_EARLY_EXIT_MIN_ROWS = int(os.environ.get('SCORING_EARLY_EXIT_MIN_ROWS', EARLY_EXIT_MIN_ROWS))
+
+# Optional two-tier cascade (see src/cascade.py): the version's first-stage model, trained
+# by scripts/train.py, settles confident rows and only its uncertain band reaches the forest.
+# Versions without a first-stage artifact are scored by the forest alone
+SCORING_CASCADE = os.environ.get('SCORING_CASCADE', '0') == '1'
+
+# First-stage artifact of MODEL_PATH, used while the registry is empty
+CASCADE_MODEL_PATH = 'models/baseline_model.cascade.json'
+
+# Audit writer: bounded queue, group commit on size or time, fsync policy
+AUDIT_QUEUE_SIZE = int(os.environ.get('AUDIT_QUEUE_SIZE', 10000))
+AUDIT_BATCH_SIZE = int(os.environ.get('AUDIT_BATCH_SIZE', 256))
+AUDIT_FLUSH_INTERVAL = float(os.environ.get('AUDIT_FLUSH_INTERVAL', 0.05))
+AUDIT_FSYNC = os.environ.get('AUDIT_FSYNC', 'interval')
+AUDIT_BLOCK_TIMEOUT = float(os.environ.get('AUDIT_BLOCK_TIMEOUT', 0.0))
+
+# Audit log segments (see src/audit_segments.py): each process appends to its own segment,
+# sealed and gzipped at AUDIT_SEGMENT_MB or AUDIT_SEGMENT_MINUTES, whichever comes first.
+# Sealed segments are deleted beyond AUDIT_RETENTION_MB on disk or AUDIT_RETENTION_DAYS of age
+AUDIT_LOG_DIR = os.environ.get('AUDIT_LOG_DIR', AUDIT_DIR)
+AUDIT_SEGMENT_MB = float(os.environ.get('AUDIT_SEGMENT_MB', 64))
+AUDIT_SEGMENT_MINUTES = float(os.environ.get('AUDIT_SEGMENT_MINUTES', 60))
+AUDIT_RETENTION_MB = float(os.environ.get('AUDIT_RETENTION_MB', 1024))
+AUDIT_RETENTION_DAYS = float(os.environ.get('AUDIT_RETENTION_DAYS', 30))
+
+# Live /stats counters are snapshotted periodically and replayed from the log tail on restart
+STATS_SNAPSHOT_INTERVAL = float(os.environ.get('STATS_SNAPSHOT_INTERVAL', 30.0))
+
+# Optional coalescing of concurrent /predict calls into one model call
+MICRO_BATCH_ENABLED = os.environ.get('MICRO_BATCH_ENABLED', '0') == '1'
+MICRO_BATCH_MAX_SIZE = int(os.environ.get('MICRO_BATCH_MAX_SIZE', 32))
+MICRO_BATCH_MAX_WAIT_MS = float(os.environ.get('MICRO_BATCH_MAX_WAIT_MS', 2.0))
+
+# Optional cache of /predict probabilities for retried or duplicate payloads (0 entries = off)
+PREDICTION_CACHE_SIZE = int(os.environ.get('PREDICTION_CACHE_SIZE', 0))
+PREDICTION_CACHE_TTL = float(os.environ.get('PREDICTION_CACHE_TTL', 30.0))
+
+# Optional admission control for /predict and /batch_predict model calls (0 = off): at most
+# ADMISSION_MAX_CONCURRENT per process, ADMISSION_MAX_QUEUED more waiting, none admitted
+# later than ADMISSION_DEADLINE_MS after arrival. Shed requests get a rule-based decision
+# marked degraded (see src/fallback_rules.py)
+ADMISSION_MAX_CONCURRENT = int(os.environ.get('ADMISSION_MAX_CONCURRENT', 0))
+ADMISSION_MAX_QUEUED = int(os.environ.get('ADMISSION_MAX_QUEUED', 64))
+ADMISSION_DEADLINE_MS = float(os.environ.get('ADMISSION_DEADLINE_MS', 250.0))
+
+# Optional shadow scoring (see src/shadow_scoring.py): the registry's challenger version
+# (manage_models.py challenger) is loaded in the background and scores the traffic the
+# champion model answered, on one worker thread that queues at most SHADOW_MAX_QUEUED
+# requests and scores for at most SHADOW_MAX_BUSY of its wall time. Side-by-side records
+# go to SHADOW_LOG
+SHADOW_SCORING = os.environ.get('SHADOW_SCORING', '0') == '1'
+SHADOW_LOG = os.environ.get('SHADOW_LOG', 'reports/shadow_predictions.log')
+SHADOW_MAX_QUEUED = int(os.environ.get('SHADOW_MAX_QUEUED', 256))
+SHADOW_MAX_BUSY = float(os.environ.get('SHADOW_MAX_BUSY', 0.1))
+
+# Optional request tracing of /predict and /batch_predict (see src/tracing.py): a
+# TRACE_SAMPLE_RATE fraction of requests plus every request slower than TRACE_SLOW_MS is
+# exported to TRACE_EXPORT_PATH, rotated at TRACE_MAX_BYTES with TRACE_BACKUPS old files.
+# Pre-forked workers write to their own file, suffixed with the worker pid
+TRACING_ENABLED = os.environ.get('TRACING_ENABLED', '0') == '1'
+TRACE_SAMPLE_RATE = float(os.environ.get('TRACE_SAMPLE_RATE', 0.01))
+TRACE_SLOW_MS = float(os.environ.get('TRACE_SLOW_MS', 50.0))
+TRACE_EXPORT_PATH = os.environ.get('TRACE_EXPORT_PATH', 'reports/traces.otlp.jsonl')
+TRACE_MAX_BYTES = int(os.environ.get('TRACE_MAX_BYTES', 10 * 1024 * 1024))
+TRACE_BACKUPS = int(os.environ.get('TRACE_BACKUPS', 5))
+
+# /stream_predict scores NDJSON input in chunks of this many lines
+STREAM_CHUNK_SIZE = int(os.environ.get('STREAM_CHUNK_SIZE', 1000))
+STREAM_MAX_LINE_BYTES = int(os.environ.get('STREAM_MAX_LINE_BYTES', 1024 * 1024))
+STREAM_READ_BYTES = 64 * 1024
+
+# Features are vectorized as plain arrays in the schema's (training) column order
+warnings.filterwarnings('ignore', message='X does not have valid feature names')
+
+
+class ServiceOverloaded(Exception):
+    """A request was shed and the model's schema has no features for the fallback rules."""
+
+
+class ScoringService:
+    """Model, counters and audit trail behind the scoring endpoints."""
+
+    def __init__(self, micro_batching=MICRO_BATCH_ENABLED):
+        self.micro_batching = micro_batching
+        self.registry = ModelRegistry(MODEL_REGISTRY_DIR)
+
+        # Startup phases in seconds; imports_s and ready_s count from process start
+        self.started_at = process_start_time()
+        self.startup = {'imports_s': round(time.time() - self.started_at, 3)}
+
+        # The active model version; requests read this reference once and use it throughout.
+        # It is only set once warmed up, so /health reports ready after the warm-up pass.
+        self.scoring_model = None
+        try:
+            start = time.perf_counter()
+            scoring_model = self.load_scoring_model(self.registry.current_version())
+            loaded = time.perf_counter()
+            scoring_model.warm_up()
+            self.startup['load_s'] = round(loaded - start, 4)
+            self.startup['warm_up_s'] = round(time.perf_counter() - loaded, 4)
+            self.scoring_model = scoring_model
+            logger.info(f"✓ Model {scoring_model.version} loaded"
+                        f" ({scoring_model.engine} engine, threshold {scoring_model.threshold})")
+        except Exception as e:
+            logger.error(f"✗ Failed to load model: {e}")
+
+        # Request counters and latency histograms, shared with pre-forked workers
+        self.metrics = ServiceMetrics()
+
+        # Resume decision counters from the last snapshot plus the decisions logged since,
+        # or from the pre-segment prediction log on the first start after upgrading
+        self.live_stats = LiveStats()
+        try:
+            replayed = self.live_stats.restore(STATS_SNAPSHOT_PATH, AuditReader(AUDIT_LOG_DIR),
+                                               LEGACY_PREDICTIONS_LOG)
+            logger.info(f"✓ Stats restored: {self.live_stats.total} decisions ({replayed} replayed from log)")
+        except Exception as e:
+            logger.error(f"✗ Failed to restore stats: {e}")
+
+        self.micro_batcher = self._start_micro_batcher()
+        self.prediction_cache = self._start_prediction_cache()
+        self.admission = self._start_admission()
+        self.audit_logger = self._start_audit_logger()
+        self.tracer = self._start_tracer()
+        self.snapshot_writer = SnapshotWriter(self.live_stats, STATS_SNAPSHOT_PATH, STATS_SNAPSHOT_INTERVAL)
+        self.model_watcher = self._start_model_watcher()
+        self.shadow_scorer, self.challenger_watcher = self._start_shadow_scorer()
+
+        if self.scoring_model is not None:
+            self.startup['ready_s'] = round(time.time() - self.started_at, 3)
+            logger.info(f"✓ Ready {self.startup['ready_s']}s after process start"
+                        f" (imports {self.startup['imports_s']}s, load {self.startup['load_s']}s,"
+                        f" warm-up {self.startup['warm_up_s']}s)")
+
+    def load_scoring_model(self, version):
+        """Load a registry version, or the unversioned MODEL_PATH artifact if ``version`` is None."""
+        scoring_model = self._load_model(version)
+        if SCORING_CASCADE:
+            scoring_model.cascade = self._load_cascade(version, scoring_model)
+        return scoring_model
+
+    def _load_model(self, version):
+        if SCORING_ENGINE == 'compact':
+            try:
+                return self._load_compact_model(version)
+            except Exception as e:
+                logger.warning(f"Compact model unavailable for {version or 'unversioned'}, loading joblib: {e}")
+        if version is None:
+            return ScoringModel.load(
+                MODEL_PATH, FEATURE_SCHEMA_PATH, FLAT_MODEL_PATH, OPTIMAL_THRESHOLD, 'unversioned',
+                SCORING_ENGINE, SCORING_SERIAL_MAX_ROWS, SCORING_N_JOBS,
+                early_exit=SCORING_EARLY_EXIT, early_exit_min_rows=SCORING_EARLY_EXIT_MIN_ROWS,
+                lazy=SCORING_FAST_STARTUP
+            )
+        path = self.registry.version_path(version)
+        metadata = self.registry.metadata(version)
+        return ScoringModel.load(
+            os.path.join(path, MODEL_FILE), os.path.join(path, SCHEMA_FILE), os.path.join(path, FLAT_DIR),
+            metadata['threshold'], version, SCORING_ENGINE, SCORING_SERIAL_MAX_ROWS, SCORING_N_JOBS, metadata,
+            SCORING_EARLY_EXIT, SCORING_EARLY_EXIT_MIN_ROWS, lazy=SCORING_FAST_STARTUP
+        )
+
+    def _load_compact_model(self, version):
+        if version is None:
+            return ScoringModel.load_compact(COMPACT_MODEL_PATH, 'unversioned', OPTIMAL_THRESHOLD,
+                                             model_path=MODEL_PATH, schema_path=FEATURE_SCHEMA_PATH)
+        metadata = self.registry.metadata(version)
+        return ScoringModel.load_compact(os.path.join(self.registry.version_path(version), COMPACT_FILE),
+                                         version, metadata['threshold'], metadata)
+
+    def _load_cascade(self, version, scoring_model):
+        """The version's first-stage cascade, or None (logged) if it has none or it was tuned for another model."""
+        if version is None:
+            path = CASCADE_MODEL_PATH
+        else:
+            path = os.path.join(self.registry.version_path(version), CASCADE_FILE)
+        if not os.path.exists(path):
+            logger.warning(f"No cascade artifact for {version or 'unversioned'} ({path}); scoring with the forest only")
+            return None
+        fingerprint = scoring_model.fingerprint
+        if fingerprint is None:
+            logger.warning(f"Model {version or 'unversioned'} has no fingerprint to check the cascade against;"
+                           " scoring with the forest only")
+            return None
+        try:
+            cascade = Cascade.load(path, scoring_model.vectorizer.features, fingerprint)
+        except ValueError as e:
+            logger.error(f"✗ Cascade of {version or 'unversioned'} refused, scoring with the forest only: {e}")
+            return None
+        if cascade.threshold != scoring_model.threshold:
+            logger.warning(f"Cascade band of {version or 'unversioned'} was tuned for threshold {cascade.threshold},"
+                           f" serving threshold is {scoring_model.threshold}")
+        return cascade
+
+    def activate_version(self, version):
+        """Load and warm a new model version off the request path, then swap it in."""
+        candidate = self.load_scoring_model(version)
+        candidate.warm_up()
+        previous = self.scoring_model
+        # A single reference assignment: in-flight requests finish on the version they started with
+        self.scoring_model = candidate
+        if self.prediction_cache is not None:
+            # Keys carry the version, so this only frees the old version's entries early
+            self.prediction_cache.clear()
+        logger.info(f"✓ Model {version} active ({candidate.engine} engine, threshold {candidate.threshold}),"
+                    f" replacing {previous.version if previous is not None else 'none'}")
+
+    def _start_model_watcher(self):
+        """Watch the registry pointer for promotions and rollbacks."""
+        current = self.scoring_model.version if self.scoring_model is not None else None
+        return RegistryWatcher(self.registry, self.activate_version, current=current, interval=MODEL_WATCH_INTERVAL)
+
+    def _start_shadow_scorer(self, challenger=None):
+        """Start the shadow worker and the watcher that loads the registry's challenger, if enabled."""
+        if not SHADOW_SCORING:
+            return None, None
+        logger.info(f"✓ Shadow scoring enabled ({SHADOW_MAX_QUEUED} queued, {SHADOW_MAX_BUSY:.0%} busy) -> {SHADOW_LOG}")
+        shadow_scorer = ShadowScorer(challenger, SHADOW_LOG, SHADOW_MAX_QUEUED, SHADOW_MAX_BUSY,
+                                     overloaded=self._champion_saturated)
+        # The challenger loads on the first poll, off the startup path
+        watcher = RegistryWatcher(self.registry, self.activate_challenger,
+                                  current=challenger.version if challenger is not None else None,
+                                  interval=MODEL_WATCH_INTERVAL, read=self.registry.challenger_version, optional=True)
+        return shadow_scorer, watcher
+
+    def _champion_saturated(self):
+        admission = self.admission
+        return admission is not None and admission.saturated()
+
+    def activate_challenger(self, version):
+        """Load and warm the challenger version for shadow scoring, or stop shadowing for None."""
+        shadow_scorer = self.shadow_scorer
+        if version is None:
+            shadow_scorer.challenger = None
+            logger.info("✓ Shadow scoring stopped: no challenger")
+            return
+        candidate = self.load_scoring_model(version)
+        candidate.warm_up()
+        shadow_scorer.challenger = candidate
+        logger.info(f"✓ Challenger {version} shadow scoring ({candidate.engine} engine, threshold {candidate.threshold})")
+
+    def _shadow_score(self, scorer, X, probabilities, blocked, trees, timer, first_seq, transaction_ids):
+        """Hand a champion model call to the shadow worker; ``timer``'s last span is its inference.
+
+        ``trees`` is the number of trees evaluated per row: rows the cascade or early exit
+        scored with fewer than all trees are rescored exactly by the worker before comparing.
+        """
+        shadow_scorer = self.shadow_scorer
+        if shadow_scorer is None or shadow_scorer.challenger is None:
+            return
+        _, start_ns, end_ns = timer.spans[-1]
+        partial = trees < scorer.n_trees if scorer.partial_scoring else None
+        shadow_scorer.submit(scorer, X, probabilities, blocked, (end_ns - start_ns) / 1e9, first_seq, transaction_ids,
+                             partial)
+
+    def _start_micro_batcher(self):
+        """Start the /predict coalescer if it is enabled."""
+        if not self.micro_batching or self.scoring_model is None:
+            return None
+        logger.info(f"✓ Micro-batching enabled (max {MICRO_BATCH_MAX_SIZE} rows / {MICRO_BATCH_MAX_WAIT_MS} ms)")
+        # Rows are submitted with their own model version's scoring function
+        return MicroBatcher(
+            self.scoring_model.predict_probabilities,
+            self.scoring_model.vectorizer.n_features,
+            max_batch=MICRO_BATCH_MAX_SIZE,
+            max_wait=MICRO_BATCH_MAX_WAIT_MS / 1000
+        )
+
+    def _start_prediction_cache(self):
+        """Create the /predict result cache if it is enabled."""
+        if PREDICTION_CACHE_SIZE <= 0:
+            return None
+        logger.info(f"✓ Prediction cache enabled ({PREDICTION_CACHE_SIZE} entries, TTL {PREDICTION_CACHE_TTL}s)")
+        return PredictionCache(PREDICTION_CACHE_SIZE, PREDICTION_CACHE_TTL)
+
+    def _start_admission(self):
+        """Create the model-call admission controller if it is enabled."""
+        if ADMISSION_MAX_CONCURRENT <= 0:
+            return None
+        logger.info(f"✓ Admission control enabled ({ADMISSION_MAX_CONCURRENT} concurrent,"
+                    f" {ADMISSION_MAX_QUEUED} queued, {ADMISSION_DEADLINE_MS} ms deadline)")
+        return AdmissionController(ADMISSION_MAX_CONCURRENT, ADMISSION_MAX_QUEUED, ADMISSION_DEADLINE_MS / 1000)
+
+    def _start_audit_logger(self):
+        """Start the background audit writer on this process's own segments."""
+        segments = SegmentedLog(
+            AUDIT_LOG_DIR,
+            max_bytes=int(AUDIT_SEGMENT_MB * 1024 * 1024),
+            max_age=AUDIT_SEGMENT_MINUTES * 60,
+            retention_bytes=int(AUDIT_RETENTION_MB * 1024 * 1024),
+            retention_age=AUDIT_RETENTION_DAYS * 86400
+        )
+        # Seal what crashed workers left behind, and expire by the current limits
+        segments.recover()
+        return AuditLogger(
+            max_queue=AUDIT_QUEUE_SIZE,
+            batch_size=AUDIT_BATCH_SIZE,
+            flush_interval=AUDIT_FLUSH_INTERVAL,
+            fsync=AUDIT_FSYNC,
+            block_timeout=AUDIT_BLOCK_TIMEOUT,
+            writer=segments
+        )
+
+    def _start_tracer(self, path=TRACE_EXPORT_PATH):
+        """Start the trace exporter if tracing is enabled."""
+        if not TRACING_ENABLED:
+            return None
+        logger.info(f"✓ Tracing enabled ({TRACE_SAMPLE_RATE:.2%} sampled, all over {TRACE_SLOW_MS} ms) -> {path}")
+        return Tracer(path, TRACE_SAMPLE_RATE, TRACE_SLOW_MS / 1000, TRACE_MAX_BYTES, TRACE_BACKUPS)
+
+    def restart_in_worker(self):
+        """Give a forked worker its own background threads; threads do not survive fork.
+
+        The counters are shared, so each worker's snapshots cover all workers' decisions.
+        """
+        self.micro_batcher = self._start_micro_batcher()
+        self.prediction_cache = self._start_prediction_cache()
+        self.admission = self._start_admission()
+        self.audit_logger = self._start_audit_logger()
+        # Rotation is not safe across processes, so each worker exports to its own file
+        root, ext = os.path.splitext(TRACE_EXPORT_PATH)
+        self.tracer = self._start_tracer(f"{root}-{os.getpid()}{ext}")
+        self.snapshot_writer = SnapshotWriter(self.live_stats, STATS_SNAPSHOT_PATH, STATS_SNAPSHOT_INTERVAL)
+        self.model_watcher = self._start_model_watcher()
+        if self.shadow_scorer is not None:
+            # Keep the challenger the master loaded; its memory-mapped forest is shared
+            self.shadow_scorer, self.challenger_watcher = self._start_shadow_scorer(self.shadow_scorer.challenger)
+
+    def stop_background(self):
+        """Stop this process's background threads, e.g. in a pre-fork master before it forks.
+
+        A forked child inherits no threads but does inherit every lock a thread held at
+        the time; workers start their own threads in ``restart_in_worker``.
+        """
+        self.model_watcher.close()
+        if self.shadow_scorer is not None:
+            self.challenger_watcher.close()
+            self.shadow_scorer.close()
+        if self.micro_batcher is not None:
+            self.micro_batcher.close()
+        self.audit_logger.close()
+        if self.tracer is not None:
+            self.tracer.close()
+        if self.snapshot_writer is not None:
+            # Writes a final snapshot
+            self.snapshot_writer.close()
+            self.snapshot_writer = None
+
+    def close(self):
+        """Flush the audit trail, then snapshot counters that cover all of it."""
+        snapshot_writer = self.snapshot_writer
+        self.stop_background()
+        if snapshot_writer is None:
+            # A pre-fork master: its workers have exited, so the counters are final
+            self.live_stats.save_snapshot(STATS_SNAPSHOT_PATH)
+
+    def log_prediction(self, transaction_id, input_data, prediction, probability, decision, scorer, seq=None, cached=False,
+                       shed_reason=None):
+        """Queue prediction for the audit trail."""
+        log_entry = {
+            'timestamp': datetime.utcnow().isoformat(),
+            'seq': seq,
+            'transaction_id': transaction_id,
+            'fraud_probability': float(probability),
+            'decision': decision,
+            'threshold': scorer.threshold,
+            'model_version': scorer.version,
+            'features': input_data
+        }
+        if cached:
+            log_entry['cached'] = True
+        if shed_reason is not None:
+            mark_degraded(log_entry, scorer, shed_reason)
+        self.audit_logger.submit(log_entry)
+        return log_entry
+
+    def log_batch_prediction(self, transactions, rows, results, scorer, first_seq=None, shed_reason=None):
+        """Queue a scored batch for the audit trail as one grouped record."""
+        scored = set(rows)
+        log_entry = {
+            'timestamp': datetime.utcnow().isoformat(),
+            'first_seq': first_seq,
+            'batch_size': len(results),
+            'threshold': scorer.threshold,
+            'model_version': scorer.version,
+            'predictions': [
+                dict(results[position], features=transactions[position]) for position in rows
+            ],
+            'errors': [result for position, result in enumerate(results) if position not in scored]
+        }
+        if shed_reason is not None:
+            mark_degraded(log_entry, scorer, shed_reason)
+        self.audit_logger.submit(log_entry)
+        return log_entry
+
+    def log_columnar_batch(self, columns, rows, probabilities, decisions, errors, scorer, first_seq=None,
+                           shed_reason=None):
+        """Queue a columnar batch for the audit trail as one record that keeps the column layout.
+
+        Columns may be arrays, DictionaryColumns or already-converted lists.
+        """
+        logged_columns = {}
+        for name, values in columns.items():
+            if isinstance(values, DictionaryColumn):
+                values = np.append(values.dictionary, None)[values.indices]
+            logged_columns[name] = values if isinstance(values, list) else values.tolist()
+        log_entry = {
+            'timestamp': datetime.utcnow().isoformat(),
+            'first_seq': first_seq,
+            'batch_size': len(rows) + len(errors),
+            'threshold': scorer.threshold,
+            'model_version': scorer.version,
+            'columns': logged_columns,
+            'scores': {
+                'row': rows.tolist(),
+                'fraud_probability': probabilities.tolist(),
+                'decision': decisions.tolist()
+            },
+            'errors': [{'row': position, 'error': message} for position, message in errors.items()]
+        }
+        if shed_reason is not None:
+            mark_degraded(log_entry, scorer, shed_reason)
+        self.audit_logger.submit(log_entry)
+        return log_entry
+
+    def health(self):
+        """Health check: 200 once a warmed-up model is serving, 503 before that."""
+        timer = RequestTimer()
+        scorer = self.scoring_model
+        status = 200 if scorer is not None else 503
+        result = {
+            'status': 'healthy' if scorer is not None else 'unavailable',
+            'model_loaded': scorer is not None,
+            'model_version': scorer.version if scorer is not None else None,
+            'engine': scorer.engine if scorer is not None else None,
+            'startup': self.startup,
+            'timestamp': datetime.utcnow().isoformat()
+        }, status
+        self.metrics.observe('/health', status, timer)
+        return result
+
+    def record_first_prediction(self, status):
+        """Note how long after process start the first request was scored."""
+        if status == 200 and 'first_prediction_s' not in self.startup:
+            self.startup['first_prediction_s'] = round(time.time() - self.started_at, 3)
+            logger.info(f"✓ First prediction {self.startup['first_prediction_s']}s after process start")
+
+    def finish_trace(self, endpoint, status, timer):
+        """End the request's trace once its response is encoded.
+
+        Returns the W3C ``traceresponse`` header value carrying the trace id, or None
+        when tracing is off.
+        """
+        tracer = self.tracer
+        if tracer is None:
+            return None
+        return tracer.finish(endpoint, status, timer)
+
+    def predict(self, data, timer=None):
+        """Score a single transaction for fraud risk.
+
+        ``timer`` is the request's RequestTimer when the caller already timed parsing.
+        """
+        timer = timer or RequestTimer()
+        body, status = self._predict(data, timer)
+        self.metrics.observe('/predict', status, timer, batch_size=1 if status == 200 else None)
+        self.record_first_prediction(status)
+        return body, status
+
+    def _predict(self, data, timer):
+        try:
+            if not data:
+                return {'error': 'No JSON data provided'}, 400
+            if not isinstance(data, dict):
+                return {'error': 'Expected transaction object'}, 400
+
+            transaction_id = data.get('transaction_id', 'unknown')
+
+            scorer = self.scoring_model
+            if scorer is None:
+                return {'error': 'Model not loaded'}, 500
+
+            # Validate straight into the feature row
+            try:
+                X = scorer.vectorizer.transform(data)
+            except ValidationError as e:
+                return {'error': 'Invalid transaction features', 'field_errors': e.field_errors}, 400
+            except Exception as e:
+                logger.error(f"Preprocessing error: {e}")
+                return {'error': 'Invalid transaction features'}, 400
+            timer.mark('preprocess')
+
+            # Predict, unless an identical feature row was scored recently
+            cache = self.prediction_cache
+            probability = None
+            trees_evaluated = 0
+            if cache is not None:
+                cache_key = cache.key(X[0], scorer.version, scorer.threshold)
+                probability = cache.get(cache_key)
+            cached = probability is not None
+            shed_reason = None
+            if not cached:
+                micro_batcher = self.micro_batcher
+                if micro_batcher is not None and micro_batcher.n_features == scorer.vectorizer.n_features:
+                    def score_forest(X):
+                        return (np.array([micro_batcher.predict(X[0], scorer.predict_probabilities)]),
+                                np.array([scorer.n_trees]))
+
+                    def score(X):
+                        # Rows the cascade's first stage settles do not wait for a micro-batch
+                        if scorer.cascade is not None:
+                            return scorer.cascade.score(X, score_forest, scorer.threshold)
+                        return score_forest(X)
+                else:
+                    score = scorer.score
+                probabilities, trees, shed_reason = self._score_admitted(X, scorer, timer, '/predict', score)
+                probability, trees_evaluated = float(probabilities[0]), int(trees[0])
+                if shed_reason is None:
+                    self.metrics.observe_trees(trees_evaluated)
+                    if cache is not None:
+                        cache.put(cache_key, probability)
+            threshold = scorer.threshold if shed_reason is None else scorer.fallback.block_score
+            decision = 'BLOCK' if probability >= threshold else 'APPROVE'
+            confidence = max(probability, 1 - probability)
+            timer.mark('predict')
+
+            # Count and log
+            seq = self.live_stats.record(probability, decision == 'BLOCK')
+            if not cached and shed_reason is None:
+                self._shadow_score(scorer, X, np.array([probability]), np.array([decision == 'BLOCK']),
+                                   np.array([trees_evaluated]), timer, seq, [transaction_id])
+            self.log_prediction(transaction_id, data, 1 if decision == 'BLOCK' else 0, probability, decision, scorer, seq,
+                                cached, shed_reason)
+            timer.mark('audit')
+
+            logger.info(f"Transaction {transaction_id}: {decision} (prob={probability:.4f})")
+
+            result = {
+                'transaction_id': transaction_id,
+                'fraud_probability': float(probability),
+                'decision': decision,
+                'confidence': float(confidence),
+                'threshold': scorer.threshold,
+                'model_version': scorer.version,
+                'timestamp': datetime.utcnow().isoformat()
+            }
+            if scorer.partial_scoring:
+                result['trees_evaluated'] = trees_evaluated
+            if shed_reason is not None:
+                mark_degraded(result, scorer, shed_reason)
+            return result, 200
+
+        except ServiceOverloaded as e:
+            return {'error': 'Service overloaded, retry later', 'reason': str(e)}, 503
+        except Exception as e:
+            logger.error(f"Prediction error: {e}")
+            return {'error': str(e)}, 500
+
+    def batch_predict(self, data, timer=None):
+        """Score multiple transactions with a single model call."""
+        timer = timer or RequestTimer()
+        body, status = self._batch_predict(data, timer)
+        self.metrics.observe('/batch_predict', status, timer,
+                             batch_size=len(data) if status == 200 else None)
+        self.record_first_prediction(status)
+        return body, status
+
+    def _batch_predict(self, data, timer):
+        try:
+            if not isinstance(data, list):
+                return {'error': 'Expected list of transactions'}, 400
+
+            scorer = self.scoring_model
+            if scorer is None:
+                return {'error': 'Model not loaded'}, 500
+
+            results, n_invalid, trees_evaluated, shed_reason = self._score_records(data, scorer, timer, '/batch_predict')
+
+            logger.info(f"Batch prediction completed: {len(results)} transactions ({n_invalid} invalid)")
+
+            body = {
+                'count': len(results),
+                'model_version': scorer.version,
+                'results': results,
+                'timestamp': datetime.utcnow().isoformat()
+            }
+            if scorer.partial_scoring:
+                body['trees_evaluated'] = trees_evaluated
+            if shed_reason is not None:
+                mark_degraded(body, scorer, shed_reason)
+            return body, 200
+
+        except ServiceOverloaded as e:
+            return {'error': 'Service overloaded, retry later', 'reason': str(e)}, 503
+        except Exception as e:
+            logger.error(f"Batch prediction error: {e}")
+            return {'error': str(e)}, 500
+
+    def batch_predict_columnar(self, payload, timer=None):
+        """Score a columnar frame (see src/columnar_codec.py), returning ``(body, status, content_type)``.
+
+        The response frame has a float64 ``fraud_probability`` column (NaN for rejected
+        rows) and a dictionary-encoded ``decision`` column (null for rejected rows), with
+        per-row errors, threshold and model version in its metadata. Failures of the
+        whole request are answered in JSON.
+        """
+        timer = timer or RequestTimer()
+        body, status, content_type, n_rows = self._batch_predict_columnar(payload, timer)
+        self.metrics.observe('/batch_predict', status, timer, batch_size=n_rows)
+        self.record_first_prediction(status)
+        return body, status, content_type
+
+    def _batch_predict_columnar(self, payload, timer):
+        n_rows = None
+        try:
+            scorer = self.scoring_model
+            if scorer is None:
+                return json.dumps({'error': 'Model not loaded'}).encode(), 500, 'application/json', n_rows
+
+            try:
+                timer.skip()
+                columns, metadata = columnar_codec.decode(payload)
+                timer.mark('parse')
+                X, rows, errors = scorer.vectorizer.transform_column_batch(columns)
+                timer.mark('preprocess')
+            except ValueError as e:
+                return json.dumps({'error': str(e)}).encode(), 400, 'application/json', n_rows
+            n_rows = metadata['n_rows']
+
+            if len(rows):
+                probabilities, trees, shed_reason = self._score_admitted(X, scorer, timer, '/batch_predict')
+            else:
+                probabilities, trees, shed_reason = np.empty(0), np.empty(0, dtype=np.int64), None
+            if shed_reason is None:
+                blocked = probabilities >= scorer.threshold
+                self.metrics.observe_trees(trees)
+            else:
+                blocked = probabilities >= scorer.fallback.block_score
+            timer.mark('predict')
+            first_seq = self.live_stats.record_many(probabilities, blocked)
+            if shed_reason is None and len(rows):
+                self._shadow_score(scorer, X, probabilities, blocked, trees, timer, first_seq,
+                                   lambda: _column_values(columns, 'transaction_id', rows))
+
+            all_probabilities = np.full(n_rows, np.nan)
+            all_probabilities[rows] = probabilities
+            decision_indices = np.full(n_rows, -1, dtype=np.int32)
+            decision_indices[rows] = blocked
+            frame_metadata = {'threshold': scorer.threshold}
+            if scorer.partial_scoring:
+                frame_metadata['trees_evaluated'] = int(trees.sum())
+            if shed_reason is not None:
+                mark_degraded(frame_metadata, scorer, shed_reason)
+            body = columnar_codec.encode(
+                {
+                    'fraud_probability': all_probabilities,
+                    'decision': DictionaryColumn(['APPROVE', 'BLOCK'], decision_indices)
+                },
+                count=n_rows,
+                model_version=scorer.version,
+                errors=[{'row': position, 'error': message} for position, message in errors.items()],
+                timestamp=datetime.utcnow().isoformat(),
+                **frame_metadata
+            )
+            timer.mark('encode')
+
+            self.log_columnar_batch(columns, rows, probabilities, np.where(blocked, 'BLOCK', 'APPROVE'),
+                                    errors, scorer, first_seq, shed_reason)
+            timer.mark('audit')
+
+            logger.info(f"Columnar batch prediction completed: {n_rows} transactions ({len(errors)} invalid)")
+            return body, 200, columnar_codec.CONTENT_TYPE, n_rows
+
+        except ServiceOverloaded as e:
+            body = {'error': 'Service overloaded, retry later', 'reason': str(e)}
+            return json.dumps(body).encode(), 503, 'application/json', n_rows
+        except Exception as e:
+            logger.error(f"Batch prediction error: {e}")
+            return json.dumps({'error': str(e)}).encode(), 500, 'application/json', n_rows
+
+    def predict_binary(self, frame, timer=None):
+        """Answer one binary frame of the Unix-socket protocol (see src/binary_protocol.py) with a response frame.
+
+        SCORE frames are validated, scored through admission control, counted, audited
+        and shadow-scored like a columnar /batch_predict; SCHEMA frames return what a
+        client needs to encode rows for the active model version.
+        """
+        timer = timer or RequestTimer()
+        body, status, n_rows = self._predict_binary(frame, timer)
+        self.metrics.observe(BINARY_ENDPOINT, status, timer, batch_size=n_rows)
+        self.record_first_prediction(status)
+        return body
+
+    def _predict_binary(self, frame, timer):
+        request_id = 0
+        try:
+            scorer = self.scoring_model
+            try:
+                kind, n_rows, request_id, payload = binary_protocol.parse_header(frame)
+                if kind not in (binary_protocol.SCORE, binary_protocol.SCHEMA):
+                    raise ValueError(f"Unknown request kind {kind}")
+                if scorer is None:
+                    return binary_protocol.encode_error_response(
+                        request_id, binary_protocol.STATUS_ERROR, 'Model not loaded'), 500, None
+                if kind == binary_protocol.SCHEMA:
+                    body = dict(scorer.vectorizer.to_schema(), threshold=scorer.threshold,
+                                model_version=scorer.version)
+                    return binary_protocol.encode_json_response(request_id, body), 200, None
+                transaction_ids, X = binary_protocol.decode_score_request(n_rows, payload,
+                                                                          scorer.vectorizer.n_features)
+                timer.mark('parse')
+                X_valid, rows, errors = scorer.vectorizer.check_matrix(X)
+                timer.mark('preprocess')
+            except ValueError as e:
+                return binary_protocol.encode_error_response(
+                    request_id, binary_protocol.STATUS_BAD_REQUEST, e), 400, None
+
+            if len(rows):
+                probabilities, trees, shed_reason = self._score_admitted(X_valid, scorer, timer, BINARY_ENDPOINT)
+            else:
+                probabilities, trees, shed_reason = np.empty(0), np.empty(0, dtype=np.int64), None
+            if shed_reason is None:
+                blocked = probabilities >= scorer.threshold
+                self.metrics.observe_trees(trees)
+            else:
+                blocked = probabilities >= scorer.fallback.block_score
+            timer.mark('predict')
+            first_seq = self.live_stats.record_many(probabilities, blocked)
+            if shed_reason is None and len(rows):
+                self._shadow_score(scorer, X_valid, probabilities, blocked, trees, timer, first_seq,
+                                   lambda: transaction_ids[rows].tolist())
+
+            all_probabilities = np.full(n_rows, np.nan)
+            all_probabilities[rows] = probabilities
+            decisions = np.full(n_rows, binary_protocol.DECISION_INVALID, dtype=np.uint8)
+            decisions[rows] = blocked
+            flags = binary_protocol.FLAG_DEGRADED if shed_reason is not None else 0
+            body = binary_protocol.encode_score_response(request_id, all_probabilities, decisions, flags, errors)
+            timer.mark('encode')
+
+            self.log_columnar_batch(_binary_audit_columns(scorer.vectorizer, transaction_ids, X), rows,
+                                    probabilities, np.where(blocked, 'BLOCK', 'APPROVE'), errors, scorer,
+                                    first_seq, shed_reason)
+            timer.mark('audit')
+            return body, 200, n_rows
+
+        except ServiceOverloaded as e:
+            return binary_protocol.encode_error_response(
+                request_id, binary_protocol.STATUS_OVERLOADED, f"Service overloaded, retry later: {e}"), 503, None
+        except Exception as e:
+            logger.error(f"Binary prediction error: {e}")
+            return binary_protocol.encode_error_response(request_id, binary_protocol.STATUS_ERROR, e), 500, None
+
+    def _score_records(self, data, scorer, timer, endpoint=None, parse_errors=None):
+        """Score a list of transactions with one model call, count and audit them as one record.
+
+        Returns the per-transaction results in input order, the number of invalid ones,
+        the total number of trees evaluated and the shed reason (None if the model scored).
+        The model call goes through admission control when ``endpoint`` is given.
+        ``parse_errors`` maps positions that could not be decoded to their error message.
+        """
+        # Validate the whole payload into one feature matrix
+        X, rows, errors = scorer.vectorizer.transform_batch(data)
+        if parse_errors:
+            errors.update(parse_errors)
+        timer.mark('preprocess')
+
+        # Predict all valid rows at once
+        if rows:
+            probabilities, trees, shed_reason = self._score_admitted(X, scorer, timer, endpoint)
+        else:
+            probabilities, trees, shed_reason = np.empty(0), np.empty(0, dtype=np.int64), None
+        if shed_reason is None:
+            blocked = probabilities >= scorer.threshold
+            self.metrics.observe_trees(trees)
+        else:
+            blocked = probabilities >= scorer.fallback.block_score
+        decisions = np.where(blocked, 'BLOCK', 'APPROVE')
+        timer.mark('predict')
+        first_seq = self.live_stats.record_many(probabilities, blocked)
+        if shed_reason is None and rows:
+            self._shadow_score(scorer, X, probabilities, blocked, trees, timer, first_seq,
+                               lambda: [data[position].get('transaction_id', 'unknown') for position in rows])
+
+        results = [None] * len(data)
+        for position, probability, decision in zip(rows, probabilities.tolist(), decisions.tolist()):
+            results[position] = {
+                'transaction_id': data[position].get('transaction_id', 'unknown'),
+                'fraud_probability': probability,
+                'decision': decision,
+                'confidence': max(probability, 1 - probability)
+            }
+        for position, message in errors.items():
+            transaction = data[position]
+            results[position] = {
+                'transaction_id': transaction.get('transaction_id', 'unknown') if isinstance(transaction, dict) else 'unknown',
+                'error': message
+            }
+
+        # Log the whole batch as one audit record
+        timer.skip()
+        self.log_batch_prediction(data, rows, results, scorer, first_seq, shed_reason)
+        timer.mark('audit')
+        return results, len(errors), int(trees.sum()), shed_reason
+
+    def _score_admitted(self, X, scorer, timer, endpoint=None, score=None):
+        """Score ``X`` with the model, through admission control for ``endpoint`` if it is enabled.
+
+        Returns ``(probabilities, trees_evaluated, shed_reason)``. A request that is not
+        admitted before its deadline is scored by the model's fallback rules instead, with
+        ``shed_reason`` saying why; without fallback rules it raises ServiceOverloaded.
+        """
+        score = score or scorer.score
+        admission = self.admission
+        if admission is None or endpoint is None:
+            return (*score(X), None)
+        shed_reason = admission.acquire(timer.start)
+        if shed_reason is None:
+            try:
+                probabilities, trees = score(X)
+            finally:
+                admission.release()
+            return probabilities, trees, None
+        self.metrics.observe_shed(endpoint, shed_reason)
+        if scorer.fallback is None:
+            raise ServiceOverloaded(shed_reason)
+        return scorer.fallback.score(X), np.zeros(len(X), dtype=np.int64), shed_reason
+
+    def score_ndjson_chunk(self, lines, scorer, timer):
+        """Score one chunk of NDJSON lines and return the results as NDJSON bytes, in input order."""
+        timer.skip()
+        data, parse_errors = [], {}
+        for position, line in enumerate(lines):
+            try:
+                data.append(json.loads(line))
+            except ValueError as e:
+                data.append(None)
+                parse_errors[position] = f'Invalid JSON: {e}'
+        timer.mark('parse')
+        results, _, _, _ = self._score_records(data, scorer, timer, parse_errors=parse_errors)
+        return ''.join(json.dumps(result) + '\n' for result in results).encode()
+
+    def stream_predict(self, chunks):
+        """Score an NDJSON byte stream in STREAM_CHUNK_SIZE-line chunks, yielding NDJSON results per chunk.
+
+        Results for a chunk are produced as soon as it is complete, so memory use
+        is bounded by the chunk size however long the stream is. The whole
+        stream is scored by the model version active when it started.
+        """
+        timer = RequestTimer()
+        scorer = self.scoring_model
+        if scorer is None:
+            self.metrics.observe('/stream_predict', 500, timer)
+            yield b'{"error": "Model not loaded"}\n'
+            return
+        splitter = NDJSONSplitter()
+        lines, total = [], 0
+        try:
+            for chunk in chunks:
+                lines.extend(splitter.feed(chunk))
+                while len(lines) >= STREAM_CHUNK_SIZE:
+                    yield self.score_ndjson_chunk(lines[:STREAM_CHUNK_SIZE], scorer, timer)
+                    total += STREAM_CHUNK_SIZE
+                    del lines[:STREAM_CHUNK_SIZE]
+            lines.extend(splitter.close())
+            if lines:
+                yield self.score_ndjson_chunk(lines, scorer, timer)
+                total += len(lines)
+            logger.info(f"Stream prediction completed: {total} transactions")
+        except ValueError as e:
+            logger.error(f"Stream prediction error: {e}")
+            yield json.dumps({'error': str(e)}).encode() + b'\n'
+        finally:
+            # The 200 status went out with the first chunk
+            self.metrics.observe('/stream_predict', 200, timer, batch_size=total)
+            self.record_first_prediction(200 if total else None)
+
+    def stats(self):
+        """Prediction statistics from the live counters."""
+        timer = RequestTimer()
+        body, status = self._stats()
+        self.metrics.observe('/stats', status, timer)
+        return body, status
+
+    def _stats(self):
+        try:
+            summary = self.live_stats.summary()
+            summary['audit_log'] = self.audit_logger.stats()
+            if self.micro_batcher is not None:
+                summary['micro_batching'] = self.micro_batcher.stats()
+            if self.prediction_cache is not None:
+                summary['prediction_cache'] = self.prediction_cache.stats()
+            if self.admission is not None:
+                summary['admission'] = self.admission.stats()
+            if self.shadow_scorer is not None:
+                summary['shadow'] = self.shadow_scorer.stats()
+            if self.tracer is not None:
+                summary['tracing'] = self.tracer.stats()
+            scorer = self.scoring_model
+            if scorer is not None and scorer.cascade is not None:
+                summary['cascade'] = {**scorer.cascade.stats(), **self.metrics.tree_tiers()}
+            summary['timestamp'] = datetime.utcnow().isoformat()
+            return summary, 200
+
+        except Exception as e:
+            logger.error(f"Stats error: {e}")
+            return {'error': str(e)}, 500
+
+    def metrics_text(self):
+        """Prometheus exposition of the request metrics, decision counters and serving model."""
+        timer = RequestTimer()
+        scorer = self.scoring_model
+        extra = [
+            '# HELP fraud_decisions_total Decisions made since the counters were started or restored.',
+            '# TYPE fraud_decisions_total counter',
+            f'fraud_decisions_total{{decision="BLOCK"}} {self.live_stats.blocked}',
+            f'fraud_decisions_total{{decision="APPROVE"}} {self.live_stats.total - self.live_stats.blocked}',
+            '# HELP fraud_model_info Model version serving in the process that answered.',
+            '# TYPE fraud_model_info gauge'
+        ]
+        if scorer is not None:
+            extra.append(f'fraud_model_info{{version="{scorer.version}",engine="{scorer.engine}",'
+                         f'threshold="{scorer.threshold}"}} 1')
+        extra += ['# HELP fraud_startup_seconds Startup phases: imports, ready and first prediction since process'
+                  ' start; load and warm-up durations.',
+                  '# TYPE fraud_startup_seconds gauge']
+        extra += [f'fraud_startup_seconds{{phase="{phase[:-2]}"}} {seconds}' for phase, seconds in self.startup.items()]
+        body = self.metrics.render(extra)
+        self.metrics.observe('/metrics', 200, timer)
+        return body, 200
+
+
+def _column_values(columns, name, rows):
+    """Values of a decoded column at ``rows`` as a list, or None if the frame lacks it."""
+    values = columns.get(name)
+    if values is None:
+        return None
+    if isinstance(values, DictionaryColumn):
+        values = np.append(values.dictionary, None)[values.indices]
+    return values[rows].tolist()
+
+
+def _binary_audit_columns(vectorizer, transaction_ids, X):
+    """Columns of a binary request as lists for the audit trail, with category codes turned back into labels."""
+    columns = {'transaction_id': transaction_ids.tolist()}
+    for name, values in zip(vectorizer.features, X.T.tolist()):
+        classes = vectorizer.categorical.get(name)
+        if classes is not None:
+            # Codes that name no class (unknown or rejected) are logged as null
+            values = [classes[int(code)] if 0 <= code < len(classes) else None for code in values]
+        columns[name] = values
+    return columns
+
+
+def mark_degraded(entry, scorer, shed_reason):
+    """Flag a response or audit record as decided by the fallback rules, not the model."""
+    entry['degraded'] = True
+    entry['fallback_reason'] = shed_reason
+    entry['threshold'] = scorer.fallback.block_score
+    return entry
+
+
+class NDJSONSplitter:
+    """Split a byte stream into non-blank NDJSON lines, holding at most one partial line."""
+
+    def __init__(self, max_line_bytes=STREAM_MAX_LINE_BYTES):
+        self.max_line_bytes = max_line_bytes
+        self._partial = b''
+
+    def feed(self, chunk):
+        """Return the complete lines ending in ``chunk``."""
+        if b'\n' not in chunk:
+            self._partial += chunk
+            self._check_partial()
+            return []
+        lines = (self._partial + chunk).split(b'\n')
+        self._partial = lines.pop()
+        self._check_partial()
+        return [line for line in lines if line.strip()]
+
+    def close(self):
+        """Return the final line if the stream did not end with a newline."""
+        line, self._partial = self._partial, b''
+        return [line] if line.strip() else []
+
+    def _check_partial(self):
+        if len(self._partial) > self.max_line_bytes:
+            raise ValueError(f"NDJSON line longer than {self.max_line_bytes} bytes")
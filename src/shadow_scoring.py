@@ -0,0 +1,291 @@
+"""Shadow scoring of live traffic with a challenger model.
+
+The champion answers every request as before. Afterwards the request hands its
+feature matrix and the champion's probabilities to a bounded queue, and one
+background thread scores them with the challenger. Each request gets one
+challenger call, the same shape the champion was called with, so the two
+latencies are comparable. A side-by-side record is then appended to the shadow
+log. Nothing on the request path waits for the challenger.
+
+Shadow work is shed rather than allowed to slow the champion down:
+
+* ``overload``   - the champion's admission control is saturated
+* ``queue_full`` - the worker is already ``max_queue`` requests behind
+* ``schema``     - the challenger's feature layout differs from the champion's
+
+The worker also paces itself to spend at most ``max_busy`` of wall time
+scoring, rescoring included. The rest of the CPU, and the GIL, stays with the
+request threads.
+
+Probability deltas are taken against the champion's exact probabilities: rows
+its cascade or early exit settled with fewer than all trees only carry a
+probability on the right side of the threshold, so when a call has such rows
+the worker rescores it with the full champion forest first. That full rescore
+is also the champion latency compared with the challenger's, which always scores
+in full; the served latency is kept alongside. Decisions are compared as served.
+
+Agreement, probability deltas and both models' latencies are aggregated per
+process for /stats; ``scripts/shadow_report.py`` summarizes the shadow log.
+"""
+import queue
+import threading
+import time
+import logging
+from collections import deque
+from datetime import datetime
+import numpy as np
+
+from src.audit_logger import AuditLogger
+
+logger = logging.getLogger(__name__)
+
+# Reasons shadow work is shed
+SHED_OVERLOAD = 'overload'
+SHED_QUEUE_FULL = 'queue_full'
+SHED_SCHEMA = 'schema'
+SHADOW_SHED_REASONS = (SHED_OVERLOAD, SHED_QUEUE_FULL, SHED_SCHEMA)
+
+# Upper bounds of the |challenger - champion| probability histogram
+DELTA_BUCKETS = (0.001, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+# Most recent calls kept for the latency percentiles in /stats
+LATENCY_WINDOW = 10000
+
+_STOP = object()
+
+
+def _percentiles_ms(seconds):
+    if not seconds:
+        return None
+    values = np.asarray(seconds) * 1000
+    return {
+        'p50': float(np.percentile(values, 50)),
+        'p95': float(np.percentile(values, 95)),
+        'p99': float(np.percentile(values, 99)),
+        'max': float(values.max())
+    }
+
+
+class ShadowComparison:
+    """Running agreement, probability-delta and latency statistics, champion vs challenger."""
+
+    def __init__(self, latency_window=LATENCY_WINDOW):
+        self.calls = 0
+        self.rows = 0
+        self.decisions = {'both_approve': 0, 'both_block': 0, 'champion_only_block': 0, 'challenger_only_block': 0}
+        self.delta_sum = 0.0
+        self.abs_delta_sum = 0.0
+        self.max_abs_delta = 0.0
+        self.delta_counts = np.zeros(len(DELTA_BUCKETS), dtype=np.int64)
+        self.champion_latency = deque(maxlen=latency_window)
+        self.challenger_latency = deque(maxlen=latency_window)
+        self.served_latency = deque(maxlen=latency_window)
+
+    def add(self, champion_probabilities, champion_blocked, challenger_probabilities, challenger_blocked,
+            champion_seconds, challenger_seconds, served_seconds=None):
+        """Fold in one call: aligned probability and decision arrays plus each model's latency.
+
+        ``champion_seconds`` is the champion's full-forest latency, comparable with the
+        challenger's; ``served_seconds`` the latency it answered with, if different.
+        """
+        delta = np.asarray(challenger_probabilities, dtype=np.float64) - champion_probabilities
+        abs_delta = np.abs(delta)
+        champion_blocked = np.asarray(champion_blocked, dtype=bool)
+        challenger_blocked = np.asarray(challenger_blocked, dtype=bool)
+        both = int(np.count_nonzero(champion_blocked & challenger_blocked))
+        champion_only = int(np.count_nonzero(champion_blocked)) - both
+        challenger_only = int(np.count_nonzero(challenger_blocked)) - both
+
+        self.calls += 1
+        self.rows += len(delta)
+        self.decisions['both_block'] += both
+        self.decisions['champion_only_block'] += champion_only
+        self.decisions['challenger_only_block'] += challenger_only
+        self.decisions['both_approve'] += len(delta) - both - champion_only - challenger_only
+        if len(delta):
+            self.delta_sum += float(delta.sum())
+            self.abs_delta_sum += float(abs_delta.sum())
+            self.max_abs_delta = max(self.max_abs_delta, float(abs_delta.max()))
+            buckets = np.minimum(np.searchsorted(DELTA_BUCKETS, abs_delta), len(DELTA_BUCKETS) - 1)
+            self.delta_counts += np.bincount(buckets, minlength=len(DELTA_BUCKETS))
+        self.champion_latency.append(champion_seconds)
+        self.challenger_latency.append(challenger_seconds)
+        self.served_latency.append(champion_seconds if served_seconds is None else served_seconds)
+
+    def summary(self):
+        rows = self.rows
+        agreed = self.decisions['both_approve'] + self.decisions['both_block']
+        return {
+            'calls': self.calls,
+            'rows': rows,
+            'agreement_rate': agreed / rows if rows else None,
+            'decisions': dict(self.decisions),
+            'probability_delta': {
+                'mean': self.delta_sum / rows if rows else None,
+                'mean_abs': self.abs_delta_sum / rows if rows else None,
+                'max_abs': self.max_abs_delta,
+                'abs_histogram': {f"le_{bound}": int(count)
+                                  for bound, count in zip(DELTA_BUCKETS, np.cumsum(self.delta_counts))}
+            },
+            'latency_ms': {
+                'champion': _percentiles_ms(self.champion_latency),
+                'challenger': _percentiles_ms(self.challenger_latency),
+                # As served, with the cascade or early exit if the champion uses them
+                'champion_served': _percentiles_ms(self.served_latency)
+            }
+        }
+
+
+def same_layout(champion, challenger):
+    """True if a feature matrix built for ``champion`` can be scored by ``challenger`` as is."""
+    a, b = champion.vectorizer, challenger.vectorizer
+    return a.features == b.features and a.categorical == b.categorical and a.unknown_code == b.unknown_code
+
+
+class ShadowScorer:
+    """Bounded background worker scoring champion traffic with a swappable challenger."""
+
+    def __init__(self, challenger, log_path, max_queue=256, max_busy=0.1, overloaded=None):
+        # The challenger ScoringModel, or None while no challenger is designated; swapped by reference
+        self.challenger = challenger
+        self.max_queue = max_queue
+        self.max_busy = max_busy
+        self.overloaded = overloaded
+        self.log = AuditLogger(log_path)
+
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._lock = threading.Lock()
+        self._comparison = ShadowComparison()
+        self._submitted = 0
+        self._shed = dict.fromkeys(SHADOW_SHED_REASONS, 0)
+        self._failed = 0
+        self._layouts = {}
+        self._closed = False
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='shadow-scorer', daemon=True)
+        self._thread.start()
+
+    def submit(self, champion, X, probabilities, blocked, champion_seconds, first_seq=None, transaction_ids=None,
+               partial=None):
+        """Queue one champion model call for shadow scoring; never blocks.
+
+        ``probabilities`` and ``blocked`` are the champion's results for the rows of ``X``
+        and ``champion_seconds`` its inference time. ``transaction_ids`` lists the rows'
+        ids, or is a callable returning them that the worker evaluates. ``partial`` marks
+        the rows scored with fewer than all trees, whose probabilities the worker
+        recomputes exactly. Returns False if the call was shed or there is no challenger
+        to compare with.
+        """
+        challenger = self.challenger
+        if challenger is None or self._closed or challenger.version == champion.version:
+            return False
+        with self._lock:
+            self._submitted += 1
+        if self.overloaded is not None and self.overloaded():
+            return self._reject(SHED_OVERLOAD)
+        key = (champion.version, challenger.version)
+        layout = self._layouts.get(key)
+        if layout is None:
+            layout = self._layouts[key] = same_layout(champion, challenger)
+            if not layout:
+                logger.warning(f"Challenger {challenger.version} has a different feature layout than"
+                               f" {champion.version}; not shadow scoring")
+        if not layout:
+            return self._reject(SHED_SCHEMA)
+        try:
+            self._queue.put_nowait((champion, challenger, X, probabilities, blocked, champion_seconds, first_seq,
+                                    transaction_ids, partial))
+        except queue.Full:
+            return self._reject(SHED_QUEUE_FULL)
+        return True
+
+    def _reject(self, reason):
+        with self._lock:
+            self._shed[reason] += 1
+        return False
+
+    def close(self, timeout=5.0):
+        """Stop the worker, dropping queued work, and flush the shadow log."""
+        if self._closed:
+            return
+        self._closed = True
+        self._stop.set()
+        try:
+            self._queue.put_nowait(_STOP)
+        except queue.Full:
+            pass
+        self._thread.join(timeout)
+        self.log.close()
+
+    def stats(self):
+        """Shadow counters and champion/challenger comparison of this process for /stats."""
+        challenger = self.challenger
+        with self._lock:
+            shed = sum(self._shed.values())
+            return {
+                'challenger_version': challenger.version if challenger is not None else None,
+                'max_queued': self.max_queue,
+                'max_busy': self.max_busy,
+                'queued': self._queue.qsize(),
+                'submitted': self._submitted,
+                'shed': dict(self._shed),
+                'shed_rate': shed / self._submitted if self._submitted else 0.0,
+                'failed': self._failed,
+                **self._comparison.summary()
+            }
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is _STOP or self._stop.is_set():
+                return
+            (champion, challenger, X, champion_probabilities, champion_blocked, champion_seconds, first_seq,
+             transaction_ids, partial) = item
+            busy = 0.0
+            try:
+                rescored = 0
+                full_seconds = champion_seconds
+                if partial is not None and partial.any():
+                    start = time.perf_counter()
+                    champion_probabilities = champion.predict_probabilities(X)
+                    full_seconds = time.perf_counter() - start
+                    busy += full_seconds
+                    rescored = int(np.count_nonzero(partial))
+                start = time.perf_counter()
+                probabilities = challenger.predict_probabilities(X)
+                elapsed = time.perf_counter() - start
+                busy += elapsed
+                blocked = probabilities >= challenger.threshold
+                with self._lock:
+                    self._comparison.add(champion_probabilities, champion_blocked, probabilities, blocked,
+                                         full_seconds, elapsed, champion_seconds)
+                self.log.submit({
+                    'timestamp': datetime.utcnow().isoformat(),
+                    'first_seq': first_seq,
+                    'rows': len(X),
+                    'transaction_ids': transaction_ids() if callable(transaction_ids) else transaction_ids,
+                    'champion': {
+                        'model_version': champion.version,
+                        'threshold': champion.threshold,
+                        'fraud_probability': np.asarray(champion_probabilities).tolist(),
+                        'decision': np.where(champion_blocked, 'BLOCK', 'APPROVE').tolist(),
+                        'latency_ms': champion_seconds * 1000,
+                        # Full-forest latency, rescored above if any rows were served from a partial score
+                        'full_latency_ms': full_seconds * 1000,
+                        'rescored_rows': rescored
+                    },
+                    'challenger': {
+                        'model_version': challenger.version,
+                        'threshold': challenger.threshold,
+                        'fraud_probability': probabilities.tolist(),
+                        'decision': np.where(blocked, 'BLOCK', 'APPROVE').tolist(),
+                        'latency_ms': elapsed * 1000
+                    }
+                })
+            except Exception as e:
+                with self._lock:
+                    self._failed += 1
+                logger.error(f"Shadow scoring with {challenger.version} failed: {e}")
+            # Pace the worker: rescoring and scoring take at most max_busy of its wall time
+            if self.max_busy < 1:
+                self._stop.wait(busy * (1 / self.max_busy - 1))
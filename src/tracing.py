@@ -0,0 +1,164 @@
+"""Sampled request tracing with asynchronous export to rotating OTLP JSON files.
+
+Every request's RequestTimer already records its stages as nanosecond spans (see
+src/metrics.py), so tracing a request costs nothing until it finishes. The
+tracer then keeps the request if it was slow (always) or if it falls within the
+sample rate, and answers with a W3C ``traceresponse`` header so the client can
+quote the trace id. Kept traces are handed to the same bounded-queue group
+writer as the audit trail (src/audit_logger.py), which encodes each batch as
+OTLP/JSON (the OpenTelemetry protocol's JSON encoding, one export request per
+line, as written by the collector's file exporter) and appends it to a
+size-rotated file. Traces are dropped rather than delaying requests when the
+queue is full.
+
+Each trace is a server span for the request with one child span per stage:
+
+* ``json.decode``     - request body parsing
+* ``preprocess``      - validation and vectorization
+* ``inference``       - admission and the model call
+* ``audit``           - counting and queueing the audit record
+* ``response.encode`` - response serialization
+
+Time outside the stages (reading the body, waiting for a worker thread) only
+shows in the server span.
+"""
+import os
+import json
+import random
+import threading
+import time
+
+from src.audit_logger import AuditLogger, RotatingFile
+
+SERVICE_NAME = 'fraud-scoring-api'
+
+# RequestTimer stage -> span name
+SPAN_NAMES = {
+    'parse': 'json.decode',
+    'preprocess': 'preprocess',
+    'predict': 'inference',
+    'audit': 'audit',
+    'encode': 'response.encode'
+}
+
+# OTLP span kinds and status codes
+SPAN_KIND_INTERNAL = 1
+SPAN_KIND_SERVER = 2
+STATUS_OK = 1
+STATUS_ERROR = 2
+
+
+def _attribute(key, value):
+    """One OTLP key/value attribute."""
+    if isinstance(value, bool):
+        return {'key': key, 'value': {'boolValue': value}}
+    if isinstance(value, int):
+        # 64-bit integers are strings in OTLP/JSON
+        return {'key': key, 'value': {'intValue': str(value)}}
+    return {'key': key, 'value': {'stringValue': str(value)}}
+
+
+class Tracer:
+    """Tail-sampling tracer: decides per finished request, exports kept traces in the background."""
+
+    def __init__(self, path, sample_rate=0.01, slow_threshold=0.05, max_bytes=10 * 1024 * 1024, backups=5,
+                 max_queue=10000, batch_size=256, flush_interval=1.0):
+        self.path = path
+        self.sample_rate = sample_rate
+        self.slow_threshold = slow_threshold
+        self._slow_ns = int(slow_threshold * 1e9)
+        # perf_counter_ns -> Unix time in nanoseconds, fixed once so spans stay monotonic
+        self._epoch_offset_ns = time.time_ns() - time.perf_counter_ns()
+        self._resource = {'attributes': [_attribute('service.name', SERVICE_NAME),
+                                         _attribute('process.pid', os.getpid())]}
+
+        self._lock = threading.Lock()
+        self._finished = 0
+        self._sampled = 0
+        self._slow = 0
+
+        # Traces are not durable records: no fsync, and never block the request
+        self._exporter = AuditLogger(
+            max_queue=max_queue, batch_size=batch_size, flush_interval=flush_interval, fsync='never',
+            writer=RotatingFile(path, max_bytes, backups), encode=self._encode, name='trace-exporter'
+        )
+
+    def finish(self, endpoint, status, timer):
+        """Close the trace of a finished request; returns its ``traceresponse`` header value."""
+        end_ns = time.perf_counter_ns()
+        trace_id = f"{random.getrandbits(128):032x}"
+        span_id = f"{random.getrandbits(64):016x}"
+        slow = end_ns - timer.start_ns >= self._slow_ns
+        sampled = slow or random.random() < self.sample_rate
+        with self._lock:
+            self._finished += 1
+            if sampled:
+                self._sampled += 1
+                self._slow += slow
+        if sampled:
+            self._exporter.submit((trace_id, span_id, endpoint, status, timer.start_ns, end_ns,
+                                   tuple(timer.spans), slow))
+        return f"00-{trace_id}-{span_id}-{'01' if sampled else '00'}"
+
+    def flush(self, timeout=5.0):
+        """Block until every trace queued before this call has been written."""
+        return self._exporter.flush(timeout)
+
+    def close(self, timeout=5.0):
+        """Export outstanding traces and stop the exporter thread."""
+        self._exporter.close(timeout)
+
+    def stats(self):
+        """Tracing counters of this process for /stats."""
+        exporter = self._exporter.stats()
+        with self._lock:
+            return {
+                'sample_rate': self.sample_rate,
+                'slow_threshold_ms': self.slow_threshold * 1000,
+                'finished': self._finished,
+                'sampled': self._sampled,
+                'slow': self._slow,
+                'exported': exporter['written'],
+                'dropped': exporter['dropped'],
+                'write_errors': exporter['write_errors'],
+                'path': self.path
+            }
+
+    def _spans(self, trace):
+        """OTLP spans of one kept trace: the server span, then one child per stage."""
+        trace_id, span_id, endpoint, status, start_ns, end_ns, stages, slow = trace
+        offset = self._epoch_offset_ns
+        spans = [{
+            'traceId': trace_id,
+            'spanId': span_id,
+            'name': f"POST {endpoint}",
+            'kind': SPAN_KIND_SERVER,
+            'startTimeUnixNano': str(start_ns + offset),
+            'endTimeUnixNano': str(end_ns + offset),
+            'attributes': [
+                _attribute('http.route', endpoint),
+                _attribute('http.response.status_code', status),
+                _attribute('sampling.slow', slow)
+            ],
+            'status': {'code': STATUS_ERROR if status >= 500 else STATUS_OK}
+        }]
+        for i, (stage, stage_start, stage_end) in enumerate(stages, 1):
+            spans.append({
+                'traceId': trace_id,
+                'spanId': f"{span_id[:12]}{i:04x}",
+                'parentSpanId': span_id,
+                'name': SPAN_NAMES.get(stage, stage),
+                'kind': SPAN_KIND_INTERNAL,
+                'startTimeUnixNano': str(stage_start + offset),
+                'endTimeUnixNano': str(stage_end + offset)
+            })
+        return spans
+
+    def _encode(self, batch):
+        """One OTLP/JSON export request line holding every span of ``batch``."""
+        spans = [span for trace in batch for span in self._spans(trace)]
+        request = {'resourceSpans': [{
+            'resource': self._resource,
+            'scopeSpans': [{'scope': {'name': __name__}, 'spans': spans}]
+        }]}
+        return (json.dumps(request, separators=(',', ':')) + '\n').encode('utf-8')
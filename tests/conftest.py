@@ -0,0 +1,34 @@
+"""Shared fixtures: tests import ``src`` from the repository root."""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.feature_vectorizer import FeatureVectorizer
+from src.request_validator import TRANSACTION_FIELDS
+
+FEATURES = ['amount', 'transaction_hour', 'foreign_transaction', 'location_mismatch', 'device_trust_score',
+            'velocity_last_24h', 'cardholder_age', 'merchant_category']
+CATEGORIES = ['Clothing', 'Electronics', 'Food', 'Grocery', 'Travel']
+
+
+@pytest.fixture
+def vectorizer():
+    """The serving schema: declared transaction fields and the training merchant categories."""
+    return FeatureVectorizer(FEATURES, {'merchant_category': CATEGORIES}, fields=TRANSACTION_FIELDS)
+
+
+@pytest.fixture
+def transaction():
+    return {
+        'amount': 120.5,
+        'transaction_hour': 14,
+        'foreign_transaction': 0,
+        'location_mismatch': 1,
+        'device_trust_score': 72.0,
+        'velocity_last_24h': 3,
+        'cardholder_age': 41,
+        'merchant_category': 'Food'
+    }
@@ -0,0 +1,42 @@
+import threading
+import time
+
+from src.audit_logger import AuditLogger
+
+
+def test_submit_after_close_is_dropped(tmp_path):
+    log = AuditLogger(str(tmp_path / 'audit.jsonl'))
+    log.close()
+    assert log.submit({'n': 1}) is False
+    assert log.stats()['dropped'] == 1
+
+
+def test_submit_racing_close_is_written_or_counted_as_dropped(tmp_path):
+    path = tmp_path / 'audit.jsonl'
+    log = AuditLogger(str(path))
+    # Stall the enqueue after submit() has seen the logger open
+    entered, release = threading.Event(), threading.Event()
+    put_nowait = log._queue.put_nowait
+
+    def stalled_put_nowait(item):
+        entered.set()
+        release.wait(5)
+        put_nowait(item)
+
+    log._queue.put_nowait = stalled_put_nowait
+    accepted = []
+    submitter = threading.Thread(target=lambda: accepted.append(log.submit({'n': 1})))
+    submitter.start()
+    entered.wait(5)
+    closer = threading.Thread(target=log.close)
+    closer.start()
+    time.sleep(0.1)
+    release.set()
+    submitter.join(5)
+    closer.join(10)
+
+    written = len(path.read_text().splitlines())
+    stats = log.stats()
+    assert stats['queued'] == 0
+    assert written + stats['dropped'] == 1
+    assert accepted == [written == 1]
@@ -0,0 +1,51 @@
+import json
+import os
+import subprocess
+import sys
+
+from src.audit_segments import SegmentedLog, AuditReader
+
+RECORD = {'timestamp': '2026-10-16T10:00:00', 'seq': 7, 'transaction_id': 'tx-1',
+          'fraud_probability': 0.1, 'decision': 'APPROVE'}
+
+
+def _dead_pid():
+    process = subprocess.Popen([sys.executable, '-c', 'pass'])
+    process.wait()
+    return process.pid
+
+
+def _write_segment(directory, pid, content):
+    path = os.path.join(directory, f"audit-20261016T100000-{pid}-0000.jsonl")
+    with open(path, 'w') as f:
+        f.write(content)
+    return path
+
+
+def test_recover_seals_orphaned_segments_of_dead_writers(tmp_path):
+    directory = str(tmp_path)
+    orphan = _write_segment(directory, _dead_pid(), json.dumps(RECORD) + '\n{"torn')
+    live = _write_segment(directory, os.getppid(), json.dumps(RECORD) + '\n')
+
+    log = SegmentedLog(directory)
+    log.recover().join()
+
+    assert not os.path.exists(orphan)
+    assert os.path.exists(live)
+    indexes = AuditReader(directory).indexes()
+    assert len(indexes) == 1
+    assert indexes[0]['records'] == 1
+    assert indexes[0]['first_seq'] == indexes[0]['last_seq'] == 7
+    assert log.stats()['sealed'] == 1
+
+
+def test_recover_applies_retention(tmp_path):
+    directory = str(tmp_path)
+    _write_segment(directory, _dead_pid(), json.dumps(RECORD) + '\n')
+
+    # Expire everything older than a second: the recovered segment is from the past
+    log = SegmentedLog(directory, retention_age=1.0)
+    log.recover().join()
+
+    assert os.listdir(directory) == []
+    assert log.stats()['expired'] == 1
@@ -0,0 +1,104 @@
+import socket
+import struct
+
+import numpy as np
+import pytest
+
+from src import binary_protocol
+from src.binary_protocol import BinaryProtocolError, BinaryScoringClient
+from src.binary_server import BinaryScoringServer, bind_unix_socket
+
+
+def test_score_request_round_trip():
+    X = np.arange(6, dtype=np.float64).reshape(2, 3)
+    frame = binary_protocol.encode_score_request(X, [11, 12], request_id=7)
+    kind, n_rows, request_id, body = binary_protocol.parse_header(frame[4:])
+    assert (kind, n_rows, request_id) == (binary_protocol.SCORE, 2, 7)
+    transaction_ids, decoded = binary_protocol.decode_score_request(n_rows, body, 3)
+    assert transaction_ids.tolist() == [11, 12]
+    np.testing.assert_array_equal(decoded, X)
+
+
+def test_score_request_with_wrong_feature_count_is_rejected():
+    frame = binary_protocol.encode_score_request(np.zeros((2, 3)))
+    _, n_rows, _, body = binary_protocol.parse_header(frame[4:])
+    with pytest.raises(ValueError, match='Expected 2 rows of 4 features'):
+        binary_protocol.decode_score_request(n_rows, body, 4)
+
+
+def test_score_response_round_trip_with_row_errors():
+    frame = binary_protocol.encode_score_response(
+        3, [0.1, np.nan], [binary_protocol.DECISION_APPROVE, binary_protocol.DECISION_INVALID], 0,
+        {1: 'amount: is required'})
+    status, n_rows, request_id, body = binary_protocol.parse_header(frame[4:])
+    assert (status, n_rows, request_id) == (binary_protocol.STATUS_OK, 2, 3)
+    results, errors = binary_protocol.decode_score_response(n_rows, body)
+    assert results['fraud_probability'][0] == 0.1
+    assert results['decision'].tolist() == [binary_protocol.DECISION_APPROVE, binary_protocol.DECISION_INVALID]
+    assert errors == {1: 'amount: is required'}
+
+
+def test_unsupported_version_is_rejected():
+    frame = bytearray(binary_protocol.encode_schema_request())
+    frame[4] = binary_protocol.PROTOCOL_VERSION + 1
+    with pytest.raises(ValueError, match='version'):
+        binary_protocol.parse_header(frame[4:])
+
+
+def test_read_frame_handles_eof_and_bad_lengths():
+    a, b = socket.socketpair()
+    with a, b:
+        a.sendall(binary_protocol.encode_schema_request(5))
+        assert binary_protocol.parse_header(binary_protocol.read_frame(b))[2] == 5
+        a.sendall(struct.pack('<I', 2))
+        with pytest.raises(ValueError, match='Invalid frame length'):
+            binary_protocol.read_frame(b)
+        a.close()
+        assert binary_protocol.read_frame(b) is None
+
+
+class EchoService:
+    """Answers SCHEMA with two features and scores each row with its first feature."""
+
+    def predict_binary(self, frame):
+        kind, n_rows, request_id, body = binary_protocol.parse_header(frame)
+        if kind == binary_protocol.SCHEMA:
+            return binary_protocol.encode_json_response(request_id, {
+                'features': ['amount', 'category'], 'categorical': {'category': ['Food', 'Travel']},
+                'unknown_category_code': -1
+            })
+        try:
+            _, X = binary_protocol.decode_score_request(n_rows, body, 2)
+        except ValueError as e:
+            return binary_protocol.encode_error_response(request_id, binary_protocol.STATUS_BAD_REQUEST, e)
+        probabilities = X[:, 0]
+        return binary_protocol.encode_score_response(request_id, probabilities, probabilities >= 0.5, 0)
+
+
+def test_client_and_server_over_a_unix_socket(tmp_path):
+    path = str(tmp_path / 'scoring.sock')
+    server = BinaryScoringServer(EchoService(), bind_unix_socket(path)).start()
+    try:
+        with BinaryScoringClient(path) as client:
+            X = client.encode([{'amount': 0.9, 'category': 'Travel'}, {'amount': 0.1, 'category': 'Toys'}])
+            assert X.tolist() == [[0.9, 1.0], [0.1, -1.0]]
+            results, errors = client.score(X, [1, 2])
+            assert results['decision'].tolist() == [1, 0]
+            assert errors == {}
+            with pytest.raises(BinaryProtocolError) as info:
+                client.score(np.zeros((1, 3)))
+            assert info.value.status == binary_protocol.STATUS_BAD_REQUEST
+    finally:
+        server.close()
+
+
+def test_bind_replaces_a_stale_socket_but_not_a_live_one(tmp_path):
+    path = str(tmp_path / 'scoring.sock')
+    stale = bind_unix_socket(path)
+    stale.close()
+    live = bind_unix_socket(path)
+    try:
+        with pytest.raises(OSError, match='Another server'):
+            bind_unix_socket(path)
+    finally:
+        live.close()
@@ -0,0 +1,38 @@
+import numpy as np
+import pytest
+
+from src.cascade import Cascade, FirstStage
+from src.forest_engine import model_fingerprint
+
+
+def _cascade():
+    return Cascade(FirstStage(['a', 'b'], [1.0, -1.0], 0.0), 0.2, np.inf, 0.29)
+
+
+def test_saved_cascade_records_the_model_fingerprint(tmp_path):
+    model_path = tmp_path / 'model.joblib'
+    model_path.write_bytes(b'forest')
+    path = str(tmp_path / 'cascade.json')
+    _cascade().save(path, str(model_path))
+
+    loaded = Cascade.load(path, ['a', 'b'], model_fingerprint(str(model_path)))
+    assert loaded.model_fingerprint == model_fingerprint(str(model_path))
+    assert loaded.high == np.inf
+
+
+def test_cascade_for_another_model_is_refused(tmp_path):
+    model_path = tmp_path / 'model.joblib'
+    model_path.write_bytes(b'forest')
+    path = str(tmp_path / 'cascade.json')
+    _cascade().save(path, str(model_path))
+
+    model_path.write_bytes(b'retrained forest')
+    with pytest.raises(ValueError, match='was tuned for model'):
+        Cascade.load(path, ['a', 'b'], model_fingerprint(str(model_path)))
+
+
+def test_cascade_without_a_fingerprint_is_refused(tmp_path):
+    path = str(tmp_path / 'cascade.json')
+    _cascade().save(path)
+    with pytest.raises(ValueError, match='unknown'):
+        Cascade.load(path, ['a', 'b'], 'f' * 64)
@@ -0,0 +1,68 @@
+import json
+import struct
+
+import numpy as np
+import pytest
+
+from src import columnar_codec
+from src.columnar_codec import DictionaryColumn
+
+
+def _frame(metadata, data=b''):
+    """A frame with hand-written metadata, for malformed-input tests."""
+    meta = json.dumps(metadata).encode()
+    header = struct.pack('<4sI', columnar_codec.MAGIC, len(meta)) + meta
+    return header + b'\0' * (-len(header) % 8) + data
+
+
+def test_round_trip_numeric_and_string_columns():
+    frame = columnar_codec.encode({
+        'amount': np.array([1.5, 2.5, 3.5]),
+        'hour': np.array([1, 2, 3], dtype=np.int32),
+        'category': ['Food', 'Travel', 'Food']
+    }, request_id='r1')
+    columns, metadata = columnar_codec.decode(frame)
+
+    assert metadata == {'request_id': 'r1', 'n_rows': 3}
+    assert columns['amount'].tolist() == [1.5, 2.5, 3.5]
+    assert columns['hour'].dtype == np.dtype('<i4')
+    category = columns['category']
+    assert isinstance(category, DictionaryColumn)
+    assert category.dictionary[category.indices].tolist() == ['Food', 'Travel', 'Food']
+
+
+def test_numeric_columns_are_views_of_the_payload():
+    frame = bytearray(columnar_codec.encode({'amount': np.arange(4.0)}))
+    columns, _ = columnar_codec.decode(frame)
+    assert not columns['amount'].flags.owndata
+
+
+def test_null_dictionary_entries_survive():
+    frame = columnar_codec.encode({'category': DictionaryColumn(['Food'], np.array([0, -1]))})
+    columns, _ = columnar_codec.decode(frame)
+    assert columns['category'].indices.tolist() == [0, -1]
+
+
+def test_encode_rejects_ragged_columns():
+    with pytest.raises(ValueError, match='rows'):
+        columnar_codec.encode({'a': [1.0, 2.0], 'b': [1.0]})
+
+
+@pytest.mark.parametrize('payload, message', [
+    (b'FRC', 'Truncated'),
+    (b'NOPE\0\0\0\0', 'bad magic'),
+    (_frame({'columns': []}), 'metadata'),
+    (_frame(['not', 'an', 'object']), 'metadata'),
+    (_frame({'n_rows': -1, 'columns': []}), 'n_rows'),
+    (_frame({'n_rows': 1, 'columns': {}}), 'must be a list'),
+    (_frame({'n_rows': 1, 'columns': [{'dtype': '<f8'}]}), "'name'"),
+    (_frame({'n_rows': 1, 'columns': [{'name': 'a'}]}), "'dtype'"),
+    (_frame({'n_rows': 1, 'columns': [{'name': 'a', 'dtype': 'dict'}]}), "'dictionary'"),
+    (_frame({'n_rows': 1, 'columns': [{'name': 'a', 'dtype': '<U4'}]}), 'Unsupported dtype'),
+    (_frame({'n_rows': 2, 'columns': [{'name': 'a', 'dtype': '<f8'}]}, b'\0' * 8), 'Truncated data'),
+    (_frame({'n_rows': 1, 'columns': [{'name': 'a', 'dtype': 'dict', 'dictionary': ['x']}]},
+            struct.pack('<i', 3) + b'\0' * 4), 'out of range'),
+])
+def test_decode_rejects_malformed_frames_with_value_error(payload, message):
+    with pytest.raises(ValueError, match=message):
+        columnar_codec.decode(payload)
@@ -0,0 +1,83 @@
+import numpy as np
+import pytest
+
+from src import columnar_codec
+
+
+def test_transform_encodes_categories_in_schema_order(vectorizer, transaction):
+    X = vectorizer.transform(transaction)
+    assert X.shape == (1, 8)
+    assert X[0].tolist() == [120.5, 14, 0, 1, 72.0, 3, 41, 2]
+
+
+def test_transform_batch_collects_row_errors(vectorizer, transaction):
+    bad = dict(transaction, transaction_hour=25)
+    X, rows, errors = vectorizer.transform_batch([transaction, bad, 'nope'])
+    assert rows == [0]
+    assert len(X) == 1
+    assert 'transaction_hour' in errors[1]
+    assert errors[2] == 'Expected transaction object'
+
+
+def test_column_batch_matches_row_path(vectorizer, transaction):
+    records = [transaction, dict(transaction, merchant_category='Travel', amount=9.0)]
+    columns = {name: [record[name] for record in records] for name in vectorizer.features}
+    X, rows, errors = vectorizer.transform_column_batch(columns)
+    assert errors == {}
+    assert rows.tolist() == [0, 1]
+    np.testing.assert_array_equal(X, vectorizer.transform_many(records))
+
+
+def test_column_batch_with_string_first_column_fills_defaults(vectorizer, transaction):
+    # A dictionary-encoded first column is a (dictionary, indices) pair: its row count
+    # must come from the indices, not len() of the pair
+    records = [dict(transaction, transaction_id=f"tx-{i}", amount=float(i)) for i in range(5)]
+    names = ['transaction_id'] + [name for name in vectorizer.features
+                                  if name not in ('foreign_transaction', 'location_mismatch')]
+    frame = columnar_codec.encode({name: np.array([record[name] for record in records]) for name in names})
+    columns, _ = columnar_codec.decode(frame)
+    assert isinstance(columns['transaction_id'], columnar_codec.DictionaryColumn)
+
+    X, rows, errors = vectorizer.transform_column_batch(columns)
+    assert errors == {}
+    assert rows.tolist() == list(range(5))
+    assert X[:, 2].tolist() == [0] * 5
+    assert X[:, 0].tolist() == [0.0, 1.0, 2.0, 3.0, 4.0]
+
+
+def test_column_batch_reports_invalid_rows(vectorizer, transaction):
+    columns = {name: np.array([transaction[name]] * 3) for name in vectorizer.features}
+    columns['cardholder_age'] = np.array([41, 12, 41])
+    columns['merchant_category'] = np.array(['Food', 'Food', 'Casino'])
+    X, rows, errors = vectorizer.transform_column_batch(columns)
+    assert rows.tolist() == [0]
+    assert 'cardholder_age' in errors[1]
+    assert "'Casino' is not one of" in errors[2]
+
+
+def test_column_batch_missing_required_feature(vectorizer, transaction):
+    columns = {name: [transaction[name]] for name in vectorizer.features if name != 'amount'}
+    with pytest.raises(ValueError, match="Missing feature 'amount'"):
+        vectorizer.transform_column_batch(columns)
+
+
+def test_check_matrix_rejects_out_of_range_values_and_codes(vectorizer, transaction):
+    X = np.repeat(vectorizer.transform(transaction), 5, axis=0)
+    X[1, 0] = np.nan
+    X[2, 1] = 3.5
+    X[3, 7] = 9
+    X[4, 7] = vectorizer.unknown_code
+    _, rows, errors = vectorizer.check_matrix(X)
+    assert rows.tolist() == [0]
+    assert 'amount' in errors[1]
+    assert 'transaction_hour: must be an integer' in errors[2]
+    assert 'merchant_category' in errors[3] and 'merchant_category' in errors[4]
+
+
+def test_check_matrix_accepts_unknown_code_when_encoded():
+    from src.feature_vectorizer import FeatureVectorizer
+    vectorizer = FeatureVectorizer(['amount', 'merchant_category'], {'merchant_category': ['A', 'B']})
+    X = np.array([[1.0, -1.0], [1.0, 1.0], [1.0, 2.0]])
+    _, rows, errors = vectorizer.check_matrix(X)
+    assert rows.tolist() == [0, 1]
+    assert list(errors) == [2]
@@ -0,0 +1,34 @@
+import numpy as np
+import pytest
+from sklearn.ensemble import RandomForestClassifier
+
+from src.forest_engine import FlatForest
+
+
+@pytest.fixture(scope='module')
+def forest_and_rows():
+    rng = np.random.RandomState(0)
+    X = rng.normal(size=(600, 5))
+    y = (X[:, 0] + 0.5 * X[:, 1] + rng.normal(scale=0.5, size=600) > 1).astype(int)
+    model = RandomForestClassifier(n_estimators=30, max_depth=6, random_state=0).fit(X, y)
+    return FlatForest.from_sklearn(model), rng.normal(size=(200, 5))
+
+
+@pytest.mark.parametrize('threshold', [0.1, 0.3, 0.5])
+def test_single_row_early_exit_matches_full_evaluation(forest_and_rows, threshold):
+    forest, X = forest_and_rows
+    full = forest.predict_proba(X)
+    scored = [forest.predict_proba_early_exit(row[np.newaxis, :], threshold) for row in X]
+    probabilities, trees = (np.concatenate(parts) for parts in zip(*scored))
+
+    assert np.array_equal(probabilities >= threshold, full >= threshold)
+    complete = trees == forest.n_trees
+    assert np.array_equal(probabilities[complete], full[complete])
+    assert trees.min() < forest.n_trees
+
+
+def test_single_rows_and_batches_agree_on_decisions(forest_and_rows):
+    forest, X = forest_and_rows
+    batch, _ = forest.predict_proba_early_exit(X, 0.3)
+    single = np.array([forest.predict_proba_early_exit(row[np.newaxis, :], 0.3)[0][0] for row in X])
+    assert np.array_equal(batch >= 0.3, single >= 0.3)
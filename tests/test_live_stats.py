@@ -0,0 +1,44 @@
+import json
+
+from src.audit_segments import AuditReader
+from src.live_stats import LiveStats
+
+LEGACY_LINES = [
+    'REAL-TIME FRAUD PREDICTION LOG',
+    json.dumps({'transaction_id': 'tx-1', 'fraud_probability': 0.05, 'decision': 'APPROVE'}),
+    json.dumps({'transaction_id': 'tx-2', 'fraud_probability': 0.95, 'decision': 'BLOCK'}),
+]
+
+
+def _legacy_log(tmp_path):
+    path = tmp_path / 'realtime_predictions.log'
+    path.write_text('\n'.join(LEGACY_LINES) + '\n')
+    return str(path)
+
+
+def test_first_restore_seeds_from_the_legacy_log_once(tmp_path):
+    snapshot = str(tmp_path / 'snapshot.json')
+    reader = AuditReader(str(tmp_path / 'audit'))
+    legacy_log = _legacy_log(tmp_path)
+
+    stats = LiveStats()
+    assert stats.restore(snapshot, reader, legacy_log) == 2
+    assert (stats.total, stats.blocked) == (2, 1)
+
+    # The seed was snapshotted: a restart resumes from it instead of reading the log again
+    with open(legacy_log, 'a') as f:
+        f.write(LEGACY_LINES[2] + '\n')
+    restarted = LiveStats()
+    assert restarted.restore(snapshot, reader, legacy_log) == 0
+    assert (restarted.total, restarted.blocked) == (2, 1)
+
+
+def test_legacy_log_is_ignored_once_audit_segments_exist(tmp_path):
+    audit = tmp_path / 'audit'
+    audit.mkdir()
+    record = {'timestamp': '2026-10-16T10:00:00', 'seq': 1, 'fraud_probability': 0.5, 'decision': 'BLOCK'}
+    (audit / 'audit-20261016T100000-1-0000.jsonl').write_text(json.dumps(record) + '\n')
+
+    stats = LiveStats()
+    assert stats.restore(str(tmp_path / 'snapshot.json'), AuditReader(str(audit)), _legacy_log(tmp_path)) == 1
+    assert (stats.total, stats.blocked) == (1, 1)
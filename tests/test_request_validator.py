@@ -0,0 +1,82 @@
+import numpy as np
+import pytest
+
+from src.request_validator import FieldSpec, ValidationError, compile_validator, format_errors
+
+CLASSES = ['Food', 'Travel']
+
+
+def _encoder(fields, classes=None):
+    specs = [FieldSpec(name, spec, classes if spec.get('type') == 'category' else None)
+             for name, spec in fields.items()]
+    encode = compile_validator(specs)
+
+    def run(record):
+        out = np.full(len(specs), np.nan)
+        return encode(record, out), out
+
+    return run
+
+
+def test_valid_record_is_written_in_field_order():
+    run = _encoder({'amount': {'type': 'number', 'min': 0}, 'hour': {'type': 'integer', 'max': 23},
+                    'foreign': {'type': 'boolean'}, 'category': {'type': 'category'}}, CLASSES)
+    errors, out = run({'amount': 12.5, 'hour': 7, 'foreign': True, 'category': 'Travel'})
+    assert errors is None
+    assert out.tolist() == [12.5, 7.0, 1.0, 1.0]
+
+
+def test_every_invalid_field_is_reported():
+    run = _encoder({'amount': {'type': 'number', 'min': 0}, 'hour': {'type': 'integer', 'max': 23},
+                    'category': {'type': 'category'}}, CLASSES)
+    errors, _ = run({'amount': -1, 'hour': 24, 'category': 'Toys'})
+    assert set(errors) == {'amount', 'hour', 'category'}
+    assert errors['amount'] == 'must be >= 0, got -1'
+    assert errors['category'] == "'Toys' is not one of Food, Travel"
+
+
+@pytest.mark.parametrize('value, valid', [
+    (3, True), (3.0, True), (np.int64(3), True), (3.5, False), (True, False), ('3', False), (None, False),
+    (10 ** 400, False),
+])
+def test_integer_field(value, valid):
+    errors, out = _encoder({'n': {'type': 'integer'}})({'n': value})
+    assert (errors is None) == valid
+    if valid:
+        assert out[0] == 3.0
+
+
+@pytest.mark.parametrize('value', [float('nan'), float('inf'), 10 ** 400, False, '1.5'])
+def test_number_field_rejects_non_finite_bools_and_strings(value):
+    errors, _ = _encoder({'x': {'type': 'number'}})({'x': value})
+    assert 'x' in errors
+
+
+def test_missing_field_uses_default_or_is_required():
+    run = _encoder({'flag': {'type': 'boolean', 'default': 0}, 'amount': {'type': 'number'}})
+    errors, out = run({})
+    assert errors == {'amount': 'is required'}
+    assert out[0] == 0.0
+
+
+def test_unknown_category_is_encoded_when_declared():
+    run = _encoder({'category': {'type': 'category', 'unknown': 'encode'}}, CLASSES)
+    errors, out = run({'category': 'Toys'})
+    assert errors is None
+    assert out[0] == -1.0
+
+
+def test_invalid_mask_matches_the_row_checks():
+    spec = FieldSpec('hour', {'type': 'integer', 'min': 0, 'max': 23})
+    column = np.array([0.0, 23.0, 24.0, 1.5, np.nan, -1.0])
+    assert spec.invalid_mask(column).tolist() == [False, False, True, True, True, True]
+
+
+def test_unknown_field_type_is_rejected():
+    with pytest.raises(ValueError, match='unknown type'):
+        FieldSpec('x', {'type': 'date'})
+
+
+def test_validation_error_formats_all_fields():
+    error = ValidationError({'a': 'is required', 'b': 'must be finite, got nan'})
+    assert str(error) == format_errors(error.field_errors) == 'a: is required; b: must be finite, got nan'
@@ -0,0 +1,62 @@
+import time
+
+import numpy as np
+
+from src.shadow_scoring import ShadowScorer
+
+
+class FixedModel:
+    """Scores every row with the first feature as its exact probability."""
+
+    def __init__(self, version, vectorizer, threshold=0.5):
+        self.version = version
+        self.vectorizer = vectorizer
+        self.threshold = threshold
+
+    def predict_probabilities(self, X):
+        return X[:, 0].copy()
+
+
+def test_deltas_use_exact_champion_probabilities_for_partially_scored_rows(tmp_path, vectorizer):
+    champion = FixedModel('v1', vectorizer)
+    challenger = FixedModel('v2', vectorizer)
+    shadow = ShadowScorer(challenger, str(tmp_path / 'shadow.jsonl'), max_busy=1.0)
+    X = np.zeros((3, vectorizer.n_features))
+    X[:, 0] = [0.1, 0.2, 0.9]
+    # The cascade settled the first two rows, clipping them to just under the threshold
+    served = np.array([0.49, 0.49, 0.9])
+    blocked = served >= 0.5
+    assert shadow.submit(champion, X, served, blocked, 0.001, partial=np.array([True, True, False]))
+    # close() drops queued work: wait for the worker first
+    deadline = time.monotonic() + 5
+    while shadow.stats()['rows'] == 0 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    shadow.close()
+
+    stats = shadow.stats()
+    assert stats['rows'] == 3
+    assert stats['agreement_rate'] == 1.0
+    assert stats['probability_delta']['max_abs'] == 0.0
+
+
+class SlowModel(FixedModel):
+    def predict_probabilities(self, X):
+        time.sleep(0.02)
+        return super().predict_probabilities(X)
+
+
+def test_champion_latency_is_the_full_rescore_when_rows_were_partial(tmp_path, vectorizer):
+    champion = SlowModel('v1', vectorizer)
+    shadow = ShadowScorer(FixedModel('v2', vectorizer), str(tmp_path / 'shadow.jsonl'), max_busy=1.0)
+    X = np.zeros((2, vectorizer.n_features))
+    X[:, 0] = [0.1, 0.9]
+    assert shadow.submit(champion, X, np.array([0.49, 0.9]), np.array([False, True]), 0.001,
+                         partial=np.array([True, False]))
+    deadline = time.monotonic() + 5
+    while shadow.stats()['rows'] == 0 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    shadow.close()
+
+    latency = shadow.stats()['latency_ms']
+    assert latency['champion']['max'] >= 20
+    assert latency['champion_served']['max'] == 1.0